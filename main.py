@@ -7,6 +7,7 @@ RandomCAD 主入口文件
 import sys
 import os
 import logging
+import multiprocessing
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
@@ -48,4 +49,5 @@ def main():
 
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # 打包后进程池工作进程需要
     main()
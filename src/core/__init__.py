@@ -2,11 +2,22 @@
 
 from .cad_connection import CADConnection
 from .generator import RandomAggregateGenerator
-from .shapes import generate_random_polygon, generate_circle, generate_ellipse
+from .shapes import (
+    generate_random_polygon, generate_circle, generate_ellipse,
+    generate_random_polygons_batch, generate_circles_batch, generate_ellipses_batch
+)
 from .collision import check_collision_hierarchical, GPUDistanceCalculator
 from .group_manager import GroupManager
 from .quadtree import Quadtree
+from .array_quadtree import ArrayQuadtree
 from .kd_tree import KDTree
+from .strtree_index import STRtreeIndex
+from .grid_index import GridIndex
+from .free_space import FreeSpaceSampler
+from .densification import GravityDensifier
+from .relaxation import MonteCarloRelaxer
+from .checkpoint import save_checkpoint, load_checkpoint
+from .aggregate_store import AggregateStore
 from .spatial_index import SpatialIndex
 
 __all__ = [
@@ -15,10 +26,22 @@ __all__ = [
     'generate_random_polygon',
     'generate_circle',
     'generate_ellipse',
+    'generate_random_polygons_batch',
+    'generate_circles_batch',
+    'generate_ellipses_batch',
     'check_collision_hierarchical',
     'GPUDistanceCalculator',
     'GroupManager',
     'Quadtree',
+    'ArrayQuadtree',
     'KDTree',
+    'STRtreeIndex',
+    'GridIndex',
+    'FreeSpaceSampler',
+    'GravityDensifier',
+    'MonteCarloRelaxer',
+    'save_checkpoint',
+    'load_checkpoint',
+    'AggregateStore',
     'SpatialIndex'
 ]
@@ -0,0 +1,588 @@
+# core/aggregate_store.py
+
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Iterator, Sequence, Tuple
+
+import numpy as np
+
+from .collision import make_primitive
+
+try:
+    import shapely
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logging.warning("Shapely未安装，骨料存储的几何重建功能将受限")
+
+
+SHAPE_KINDS = ("polygon", "circle", "ellipse")
+
+# 各形状在 shape_params 中的列含义，整数参数在还原 shape_info 时转换为 int
+_SHAPE_PARAM_FIELDS = {
+    "polygon": ("size", "sides", "irregularity", "spikiness"),
+    "circle": ("radius", "segments"),
+    "ellipse": ("major_axis", "minor_axis", "rotation", "segments"),
+}
+_INT_PARAMS = {"sides", "segments"}
+
+# 每个骨料一行的列数组（不含偏移量和扁平坐标）
+_COLUMNS = ("centers", "radii", "areas", "group_ids", "itz_thickness", "bounds", "shape_kinds", "shape_params",
+            "analytic")
+
+
+def to_cad_point_array(coords: np.ndarray) -> List[float]:
+    """
+    把 (k, 2) 坐标数组转换为 CAD 绘图所需的 [x, y, 0.0, ...] 扁平列表
+    
+    Args:
+        coords: 坐标数组
+    
+    Returns:
+        List[float]: 扁平点列表
+    """
+    coords = np.asarray(coords, dtype=float)
+    return np.column_stack([coords, np.zeros(len(coords))]).ravel().tolist()
+
+
+class AggregateRecord(dict):
+    """
+    空间索引中的骨料记录
+    
+    只保存中心、半径、面积、组ID、ITZ厚度、占据范围边界和解析图元等轻量字段，
+    points、shape_info、shapely_obj、shapely_itz 在读取时从所属存储按需获取，
+    几何对象由存储的 LRU 缓存提供，不随记录常驻内存。
+    """
+    
+    __slots__ = ('_store',)
+    
+    _LAZY_KEYS = ('points', 'shape_info', 'shapely_obj', 'shapely_itz')
+    
+    def __init__(self, store: "AggregateStore", data: Dict[str, Any]):
+        super().__init__(data)
+        self._store = store
+    
+    def _lazy(self, key: str) -> Any:
+        index = dict.__getitem__(self, 'id')
+        if key == 'points':
+            return [tuple(p) for p in self._store.points(index).tolist()]
+        if key == 'shape_info':
+            return self._store.shape_info(index)
+        polygon, itz_polygon = self._store.geometry(index)
+        return polygon if key == 'shapely_obj' else itz_polygon
+    
+    def __getitem__(self, key: str) -> Any:
+        if key in self._LAZY_KEYS and not dict.__contains__(self, key):
+            return self._lazy(key)
+        return dict.__getitem__(self, key)
+    
+    def get(self, key: str, default: Any = None) -> Any:
+        if key in self._LAZY_KEYS and not dict.__contains__(self, key):
+            return self._lazy(key)
+        return dict.get(self, key, default)
+    
+    def __contains__(self, key: object) -> bool:
+        return key in self._LAZY_KEYS or dict.__contains__(self, key)
+
+
+class AggregateStore:
+    """
+    列式骨料存储
+    
+    每个骨料的中心、半径、面积、组ID、ITZ厚度、占据范围（含ITZ）边界和形状参数
+    分别存放在按倍数扩容的 NumPy 数组中，轮廓坐标存放在一个扁平坐标缓冲区中，
+    通过偏移量索引。Shapely 对象不随骨料保存，需要时由坐标向量化重建
+    （ITZ 按生成时相同的 buffer 参数重新生成，结果一致）。
+    
+    按下标访问或迭代时返回与旧版 generated_aggregates 兼容的骨料字典，
+    导出和绘图等批量操作应直接使用列数组。精确碰撞检测所需的单个骨料几何
+    通过 geometry() 获取，最近使用的几何对象（已 prepare）保存在容量有限的
+    LRU 缓存中，因此常驻内存的几何对象数量与骨料总数无关。
+    """
+    
+    def __init__(self, initial_capacity: int = 1024, cache_size: int = 4096):
+        """
+        Args:
+            initial_capacity: 初始容量（骨料数）
+            cache_size: 几何缓存容量（骨料数），为0时不缓存
+        """
+        self.initial_capacity = max(1, initial_capacity)
+        self.cache_size = max(0, cache_size)
+        self._geometry_cache: "OrderedDict[int, Tuple[Any, Any]]" = OrderedDict()
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._allocate(self.initial_capacity)
+    
+    def _allocate(self, capacity: int) -> None:
+        """
+        分配空的列数组
+        """
+        self._size = 0
+        self._coord_count = 0
+        self._centers = np.empty((capacity, 2), dtype=float)
+        self._radii = np.empty(capacity, dtype=float)
+        self._areas = np.empty(capacity, dtype=float)
+        self._group_ids = np.empty(capacity, dtype=np.int32)
+        self._itz_thickness = np.empty(capacity, dtype=float)
+        self._bounds = np.empty((capacity, 4), dtype=float)
+        self._shape_kinds = np.empty(capacity, dtype=np.int8)
+        self._shape_params = np.empty((capacity, 4), dtype=float)
+        self._analytic = np.empty(capacity, dtype=bool)
+        self._offsets = np.zeros(capacity + 1, dtype=np.int64)
+        self._coords = np.empty((capacity * 16, 2), dtype=float)
+    
+    def _ensure_capacity(self, size: int, coord_count: int) -> None:
+        """
+        容量不足时按倍数扩容
+        """
+        capacity = self._radii.shape[0]
+        if size > capacity:
+            new_capacity = capacity
+            while new_capacity < size:
+                new_capacity *= 2
+            for name in ("_centers", "_radii", "_areas", "_group_ids", "_itz_thickness",
+                         "_bounds", "_shape_kinds", "_shape_params", "_analytic"):
+                old = getattr(self, name)
+                new = np.empty((new_capacity,) + old.shape[1:], dtype=old.dtype)
+                new[:self._size] = old[:self._size]
+                setattr(self, name, new)
+            offsets = np.zeros(new_capacity + 1, dtype=np.int64)
+            offsets[:self._size + 1] = self._offsets[:self._size + 1]
+            self._offsets = offsets
+        
+        coord_capacity = self._coords.shape[0]
+        if coord_count > coord_capacity:
+            while coord_capacity < coord_count:
+                coord_capacity *= 2
+            coords = np.empty((coord_capacity, 2), dtype=float)
+            coords[:self._coord_count] = self._coords[:self._coord_count]
+            self._coords = coords
+    
+    def append(self, agg_data: Dict[str, Any]) -> int:
+        """
+        追加一个骨料
+        
+        Args:
+            agg_data: 骨料数据字典（center、radius、area、points、shape_info、group_id、
+                      itz_thickness，可选 shapely_obj / shapely_itz 用于计算边界，
+                      可选 primitive 表示可走解析碰撞检测）
+        
+        Returns:
+            int: 骨料在存储中的编号
+        """
+        points = np.asarray([(p[0], p[1]) for p in agg_data["points"]], dtype=float).reshape(-1, 2)
+        index = self._size
+        end = self._coord_count + len(points)
+        self._ensure_capacity(index + 1, end)
+        
+        self._coords[self._coord_count:end] = points
+        self._coord_count = end
+        self._offsets[index + 1] = end
+        
+        itz_thickness = agg_data.get("itz_thickness", 0.0)
+        footprint = agg_data.get("shapely_itz")
+        if footprint is None:
+            footprint = agg_data.get("shapely_obj")
+        if footprint is not None:
+            self._bounds[index] = footprint.bounds
+        elif len(points):
+            self._bounds[index] = (points[:, 0].min() - itz_thickness, points[:, 1].min() - itz_thickness,
+                                   points[:, 0].max() + itz_thickness, points[:, 1].max() + itz_thickness)
+        else:
+            self._bounds[index] = np.nan
+        
+        shape_info = agg_data.get("shape_info") or {}
+        kind = shape_info.get("shape", "polygon")
+        fields = _SHAPE_PARAM_FIELDS.get(kind, ())
+        self._shape_kinds[index] = SHAPE_KINDS.index(kind) if kind in SHAPE_KINDS else -1
+        self._shape_params[index] = 0.0
+        for column, field in enumerate(fields):
+            self._shape_params[index, column] = shape_info.get(field, 0.0)
+        # 贴边裁剪后的圆/椭圆没有解析图元，移动后也不能恢复
+        self._analytic[index] = agg_data.get("primitive") is not None
+        
+        self._centers[index] = agg_data["center"]
+        self._radii[index] = agg_data["radius"]
+        self._areas[index] = agg_data["area"]
+        self._group_ids[index] = agg_data["group_id"]
+        self._itz_thickness[index] = itz_thickness
+        self._size = index + 1
+        return index
+    
+    def extend(self, aggregates: Sequence[Dict[str, Any]]) -> None:
+        """
+        追加多个骨料
+        """
+        for agg_data in aggregates:
+            self.append(agg_data)
+    
+    def translate(self, index: int, dx: float, dy: float) -> None:
+        """
+        平移第 index 个骨料（轮廓坐标、中心和边界），并使其缓存的几何失效
+        
+        Args:
+            index: 骨料编号
+            dx, dy: 平移量
+        """
+        index = self._check_index(index)
+        self._coords[self._offsets[index]:self._offsets[index + 1]] += (dx, dy)
+        self._centers[index] += (dx, dy)
+        self._bounds[index] += (dx, dy, dx, dy)
+        with self._cache_lock:
+            self._geometry_cache.pop(index, None)
+    
+    def rotate(self, index: int, angle: float, bounds: Optional[Tuple[float, float, float, float]] = None) -> None:
+        """
+        绕中心旋转第 index 个骨料，并使其缓存的几何失效
+        
+        椭圆的 rotation 形状参数同步更新。
+        
+        Args:
+            index: 骨料编号
+            angle: 旋转角度（弧度，逆时针）
+            bounds: 旋转后占据范围（含ITZ）的边界，默认由轮廓边界外扩ITZ厚度估计（不小于实际边界）
+        """
+        index = self._check_index(index)
+        cos_a, sin_a = np.cos(angle), np.sin(angle)
+        center = self._centers[index]
+        coords = self._coords[self._offsets[index]:self._offsets[index + 1]]
+        relative = coords - center
+        coords[:, 0] = center[0] + relative[:, 0] * cos_a - relative[:, 1] * sin_a
+        coords[:, 1] = center[1] + relative[:, 0] * sin_a + relative[:, 1] * cos_a
+        if bounds is None and len(coords):
+            itz_thickness = self._itz_thickness[index]
+            bounds = (coords[:, 0].min() - itz_thickness, coords[:, 1].min() - itz_thickness,
+                      coords[:, 0].max() + itz_thickness, coords[:, 1].max() + itz_thickness)
+        if bounds is not None:
+            self._bounds[index] = bounds
+        if self._shape_kinds[index] == SHAPE_KINDS.index("ellipse"):
+            column = _SHAPE_PARAM_FIELDS["ellipse"].index("rotation")
+            self._shape_params[index, column] = (self._shape_params[index, column] + angle) % (2 * np.pi)
+        with self._cache_lock:
+            self._geometry_cache.pop(index, None)
+    
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """
+        导出全部列数组的副本（供检查点等持久化使用），可由 load_arrays 还原
+        
+        Returns:
+            Dict[str, np.ndarray]: 列名到数组的映射，包含各列、offsets 和 coords
+        """
+        arrays = {name: getattr(self, "_" + name)[:self._size].copy() for name in _COLUMNS}
+        arrays["offsets"] = self.offsets.copy()
+        arrays["coords"] = self.coords.copy()
+        return arrays
+    
+    def load_arrays(self, arrays: Dict[str, np.ndarray]) -> None:
+        """
+        清空存储并从 to_arrays 导出的列数组还原
+        
+        Args:
+            arrays: 列名到数组的映射
+        """
+        size = len(arrays["radii"])
+        coord_count = len(arrays["coords"])
+        offsets = np.asarray(arrays["offsets"], dtype=np.int64)
+        if len(offsets) != size + 1 or offsets[-1] != coord_count:
+            raise ValueError("列数组长度不一致")
+        self.clear()
+        self._ensure_capacity(size, coord_count)
+        for name in _COLUMNS:
+            getattr(self, "_" + name)[:size] = arrays[name]
+        self._offsets[:size + 1] = offsets
+        self._coords[:coord_count] = arrays["coords"]
+        self._size = size
+        self._coord_count = coord_count
+    
+    def clear(self) -> None:
+        """
+        清空存储并释放扩容后的数组和几何缓存
+        """
+        self._allocate(self.initial_capacity)
+        with self._cache_lock:
+            self._geometry_cache.clear()
+            self.cache_hits = 0
+            self.cache_misses = 0
+    
+    def __len__(self) -> int:
+        return self._size
+    
+    @property
+    def centers(self) -> np.ndarray:
+        """中心坐标 (N, 2)"""
+        return self._centers[:self._size]
+    
+    @property
+    def radii(self) -> np.ndarray:
+        """外接半径 (N,)"""
+        return self._radii[:self._size]
+    
+    @property
+    def areas(self) -> np.ndarray:
+        """面积 (N,)"""
+        return self._areas[:self._size]
+    
+    @property
+    def group_ids(self) -> np.ndarray:
+        """组ID (N,)"""
+        return self._group_ids[:self._size]
+    
+    @property
+    def itz_thickness(self) -> np.ndarray:
+        """ITZ厚度 (N,)"""
+        return self._itz_thickness[:self._size]
+    
+    @property
+    def bounds(self) -> np.ndarray:
+        """占据范围（含ITZ）边界 (N, 4)"""
+        return self._bounds[:self._size]
+    
+    @property
+    def coords(self) -> np.ndarray:
+        """扁平轮廓坐标 (M, 2)"""
+        return self._coords[:self._coord_count]
+    
+    @property
+    def offsets(self) -> np.ndarray:
+        """第 i 个骨料的坐标为 coords[offsets[i]:offsets[i + 1]]，长度 N + 1"""
+        return self._offsets[:self._size + 1]
+    
+    @property
+    def nbytes(self) -> int:
+        """已分配数组占用的字节数"""
+        return sum(a.nbytes for a in (self._centers, self._radii, self._areas, self._group_ids,
+                                      self._itz_thickness, self._bounds, self._shape_kinds,
+                                      self._shape_params, self._offsets, self._coords))
+    
+    def _check_index(self, index: int) -> int:
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError("骨料编号超出范围")
+        return index
+    
+    def points(self, index: int) -> np.ndarray:
+        """
+        第 index 个骨料的轮廓坐标 (k, 2)（视图，不复制）
+        """
+        index = self._check_index(index)
+        return self._coords[self._offsets[index]:self._offsets[index + 1]]
+    
+    def shape_info(self, index: int) -> Dict[str, Any]:
+        """
+        还原第 index 个骨料的形状信息字典
+        """
+        index = self._check_index(index)
+        kind_code = int(self._shape_kinds[index])
+        if kind_code < 0:
+            return {}
+        kind = SHAPE_KINDS[kind_code]
+        info: Dict[str, Any] = {"shape": kind}
+        for column, field in enumerate(_SHAPE_PARAM_FIELDS[kind]):
+            value = float(self._shape_params[index, column])
+            info[field] = int(value) if field in _INT_PARAMS else value
+        return info
+    
+    def primitive(self, index: int) -> Optional[Tuple]:
+        """
+        按当前中心、形状参数和ITZ厚度重建第 index 个骨料的解析图元
+        
+        骨料被平移或旋转后用于重新生成空间索引记录，保持解析碰撞检测可用。
+        
+        Returns:
+            Optional[Tuple]: 解析图元，追加时没有解析图元的骨料返回None
+        """
+        index = self._check_index(index)
+        if not self._analytic[index]:
+            return None
+        center = (float(self._centers[index, 0]), float(self._centers[index, 1]))
+        return make_primitive(self.shape_info(index), center, float(self._itz_thickness[index]))
+    
+    def shape_names(self) -> List[str]:
+        """
+        全部骨料的形状类型名称
+        """
+        names = np.array(SHAPE_KINDS + ("",), dtype=object)
+        return names[self._shape_kinds[:self._size]].tolist()
+    
+    def polygons(self, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """
+        向量化重建骨料多边形
+        
+        Args:
+            indices: 骨料编号，默认全部
+        
+        Returns:
+            np.ndarray: Shapely 多边形数组
+        """
+        if indices is None:
+            indices = np.arange(self._size)
+        indices = np.asarray(indices, dtype=np.int64)
+        if indices.size == 0:
+            return np.empty(0, dtype=object)
+        starts = self._offsets[indices]
+        counts = self._offsets[indices + 1] - starts
+        coord_ids = np.repeat(starts - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts) + np.arange(counts.sum())
+        ring_ids = np.repeat(np.arange(indices.size), counts)
+        return shapely.polygons(shapely.linearrings(self._coords[coord_ids], indices=ring_ids))
+    
+    def itz_polygons(self, indices: Optional[Sequence[int]] = None,
+                     polygons: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        向量化重建ITZ多边形，ITZ厚度为0的骨料对应 None
+        
+        Args:
+            indices: 骨料编号，默认全部
+            polygons: 已重建的骨料多边形（与 indices 对应），避免重复构建
+        
+        Returns:
+            np.ndarray: Shapely 多边形数组
+        """
+        if indices is None:
+            indices = np.arange(self._size)
+        indices = np.asarray(indices, dtype=np.int64)
+        if polygons is None:
+            polygons = self.polygons(indices)
+        thickness = self._itz_thickness[indices]
+        result = np.full(indices.size, None, dtype=object)
+        has_itz = thickness > 0
+        # 与 Polygon.buffer 的默认参数保持一致（shapely.buffer 默认 quad_segs=8）
+        if has_itz.any():
+            result[has_itz] = shapely.buffer(polygons[has_itz], thickness[has_itz], quad_segs=16)
+        return result
+    
+    def _cache_put(self, index: int, geometry: Tuple[Any, Any]) -> None:
+        """
+        写入几何缓存，超出容量时淘汰最久未使用的项（调用方持有锁）
+        """
+        if self.cache_size == 0:
+            return
+        self._geometry_cache[index] = geometry
+        self._geometry_cache.move_to_end(index)
+        while len(self._geometry_cache) > self.cache_size:
+            self._geometry_cache.popitem(last=False)
+    
+    def cache_geometry(self, index: int, polygon: Any, itz_polygon: Any) -> None:
+        """
+        用已有的几何对象预热缓存（新放置的骨料位于当前最活跃的邻域）
+        
+        Args:
+            index: 骨料编号
+            polygon: 骨料多边形
+            itz_polygon: ITZ多边形，可为None
+        """
+        if polygon is None or not SHAPELY_AVAILABLE:
+            return
+        shapely.prepare(polygon)
+        if itz_polygon is not None:
+            shapely.prepare(itz_polygon)
+        with self._cache_lock:
+            self._cache_put(self._check_index(index), (polygon, itz_polygon))
+    
+    def geometry(self, index: int, cache_result: bool = True) -> Tuple[Any, Any]:
+        """
+        获取第 index 个骨料的 (骨料多边形, ITZ多边形)，优先从缓存读取
+        
+        未命中时由坐标重建并 prepare 后放入缓存。
+        
+        Args:
+            index: 骨料编号
+            cache_result: 未命中时是否将重建结果放入缓存（批量遍历时应关闭，避免冲掉热点邻域）
+        
+        Returns:
+            Tuple[Any, Any]: 骨料多边形和ITZ多边形（无ITZ时为None）
+        """
+        index = self._check_index(index)
+        with self._cache_lock:
+            geometry = self._geometry_cache.get(index)
+            if geometry is not None:
+                self._geometry_cache.move_to_end(index)
+                self.cache_hits += 1
+                return geometry
+            self.cache_misses += 1
+        
+        if not SHAPELY_AVAILABLE:
+            return (None, None)
+        polygons = self.polygons([index])
+        itz_polygon = self.itz_polygons([index], polygons)[0]
+        shapely.prepare(polygons[0])
+        if itz_polygon is not None:
+            shapely.prepare(itz_polygon)
+        geometry = (polygons[0], itz_polygon)
+        if cache_result:
+            with self._cache_lock:
+                self._cache_put(index, geometry)
+        return geometry
+    
+    def record(self, index: int, primitive: Optional[Tuple] = None) -> AggregateRecord:
+        """
+        创建用于空间索引的轻量骨料记录
+        
+        Args:
+            index: 骨料编号
+            primitive: 解析图元（可选）
+        
+        Returns:
+            AggregateRecord: 骨料记录
+        """
+        index = self._check_index(index)
+        return AggregateRecord(self, {
+            "id": index,
+            "center": (float(self._centers[index, 0]), float(self._centers[index, 1])),
+            "radius": float(self._radii[index]),
+            "area": float(self._areas[index]),
+            "group_id": int(self._group_ids[index]),
+            "itz_thickness": float(self._itz_thickness[index]),
+            "bounds": tuple(self._bounds[index].tolist()),
+            "primitive": primitive
+        })
+    
+    def get_cache_stats(self) -> Dict[str, Any]:
+        """
+        获取几何缓存统计信息
+        
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        with self._cache_lock:
+            return {
+                'cache_size': self.cache_size,
+                'cached': len(self._geometry_cache),
+                'hits': self.cache_hits,
+                'misses': self.cache_misses
+            }
+    
+    def get(self, index: int, with_geometry: bool = True) -> Dict[str, Any]:
+        """
+        以骨料字典的形式读取第 index 个骨料
+        
+        Args:
+            index: 骨料编号
+            with_geometry: 是否重建 shapely_obj / shapely_itz
+        
+        Returns:
+            Dict[str, Any]: 骨料数据字典
+        """
+        index = self._check_index(index)
+        agg_data = {
+            "id": index,
+            "center": (float(self._centers[index, 0]), float(self._centers[index, 1])),
+            "radius": float(self._radii[index]),
+            "area": float(self._areas[index]),
+            "points": [tuple(p) for p in self.points(index).tolist()],
+            "shape_info": self.shape_info(index),
+            "group_id": int(self._group_ids[index]),
+            "itz_thickness": float(self._itz_thickness[index]),
+        }
+        if with_geometry and SHAPELY_AVAILABLE:
+            agg_data["shapely_obj"], agg_data["shapely_itz"] = self.geometry(index, cache_result=False)
+        return agg_data
+    
+    def __getitem__(self, index: int) -> Dict[str, Any]:
+        return self.get(index)
+    
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for index in range(self._size):
+            yield self.get(index)
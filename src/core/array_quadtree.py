@@ -0,0 +1,517 @@
+# core/array_quadtree.py
+
+import math
+import logging
+from itertools import chain
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+
+from .spatial_index import (get_object_bounds, collect_object_bounds, get_object_center, move_object_bounds,
+                            point_bounds_distance, best_first_search)
+
+try:
+    import shapely  # noqa: F401
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logging.warning("Shapely未安装，数组四叉树空间查询功能将受限")
+
+
+_QUADRANTS = np.arange(4, dtype=np.int32)
+
+
+class ArrayQuadtree:
+    def __init__(self, bounds: Tuple[float, float, float, float], max_depth: int = 8,
+                 max_objects: int = 16, initial_capacity: int = 256):
+        """
+        数组化四叉树空间索引
+        
+        节点边界、首个子节点编号和深度存放在连续的 NumPy 数组中，四个子节点
+        连续分配（顺序与 Quadtree 相同：NW, NE, SW, SE）；对象边界保存在 (N, 4)
+        数组中，内部以整数编号标识；query_ids 与 Quadtree 一样返回对象的 id 字段
+        （没有 id 字段时为内部编号）。每个对象只存放在能完整容纳它的最深节点中，
+        查询结果不重复。查询按层迭代（非递归），每层用一次布尔掩码筛选节点，
+        候选对象再用一次布尔掩码完成边界框筛选。
+        
+        删除时对象只从其所在节点的列表中移除，内部编号留作墓碑，墓碑超过
+        编号总数的一半时压缩重建；更新时从原节点移除后重新向下放置。
+        
+        Args:
+            bounds: 四叉树边界 (min_x, min_y, max_x, max_y)
+            max_depth: 最大深度
+            max_objects: 叶节点内最大对象数，超过则分裂
+            initial_capacity: 对象边界数组初始容量
+        """
+        self.bounds = bounds
+        self.max_depth = max_depth
+        self.max_objects = max_objects
+        self.initial_capacity = max(1, initial_capacity)
+        self._reset()
+    
+    def _reset(self) -> None:
+        """
+        分配空的节点和对象数组，只保留根节点
+        """
+        node_capacity = 64
+        self._node_bounds = np.empty((node_capacity, 4), dtype=float)
+        self._node_first_child = np.full(node_capacity, -1, dtype=np.int32)
+        self._node_depth = np.zeros(node_capacity, dtype=np.int16)
+        self._node_bounds[0] = self.bounds
+        self._node_total = 1
+        self._node_objects: List[List[int]] = [[]]
+        
+        self._objects: List[Optional[Dict[str, Any]]] = []
+        self._bounds_array = np.empty((self.initial_capacity, 4), dtype=float)
+        self._object_node = np.empty(self.initial_capacity, dtype=np.int32)
+        self._keys = np.empty(self.initial_capacity, dtype=np.int64)
+        # 对象 id 字段 -> 内部编号；已删除的内部编号在 _objects 中为 None
+        self._slots: Dict[Any, int] = {}
+        self._removed = 0
+    
+    def _ensure_node_capacity(self, size: int) -> None:
+        """
+        节点数组容量不足时按倍数扩容
+        """
+        capacity = self._node_bounds.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        node_bounds = np.empty((capacity, 4), dtype=float)
+        node_bounds[:self._node_total] = self._node_bounds[:self._node_total]
+        first_child = np.full(capacity, -1, dtype=np.int32)
+        first_child[:self._node_total] = self._node_first_child[:self._node_total]
+        depth = np.zeros(capacity, dtype=np.int16)
+        depth[:self._node_total] = self._node_depth[:self._node_total]
+        self._node_bounds, self._node_first_child, self._node_depth = node_bounds, first_child, depth
+    
+    def _ensure_capacity(self, size: int) -> None:
+        """
+        对象数组容量不足时按倍数扩容
+        """
+        capacity = self._bounds_array.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        bounds_array = np.empty((capacity, 4), dtype=float)
+        bounds_array[:len(self._objects)] = self._bounds_array[:len(self._objects)]
+        object_node = np.empty(capacity, dtype=np.int32)
+        object_node[:len(self._objects)] = self._object_node[:len(self._objects)]
+        keys = np.empty(capacity, dtype=np.int64)
+        keys[:len(self._objects)] = self._keys[:len(self._objects)]
+        self._bounds_array, self._object_node, self._keys = bounds_array, object_node, keys
+    
+    def _quadrant(self, node: int, obj_bounds: Tuple[float, float, float, float]) -> int:
+        """
+        返回能完整容纳对象的子节点序号（0-3），跨越中线时返回-1
+        """
+        min_x, min_y, max_x, max_y = self._node_bounds[node].tolist()
+        mid_x = (min_x + max_x) / 2
+        mid_y = (min_y + max_y) / 2
+        if obj_bounds[2] <= mid_x:
+            east = 0
+        elif obj_bounds[0] >= mid_x:
+            east = 1
+        else:
+            return -1
+        if obj_bounds[1] >= mid_y:
+            return east
+        if obj_bounds[3] <= mid_y:
+            return 2 + east
+        return -1
+    
+    def _divide(self, node: int) -> None:
+        """
+        为叶节点分配四个连续的子节点，并把能完整放入子节点的对象下移
+        """
+        first = self._node_total
+        self._ensure_node_capacity(first + 4)
+        min_x, min_y, max_x, max_y = self._node_bounds[node].tolist()
+        mid_x = (min_x + max_x) / 2
+        mid_y = (min_y + max_y) / 2
+        self._node_bounds[first:first + 4] = (
+            (min_x, mid_y, mid_x, max_y),  # NW
+            (mid_x, mid_y, max_x, max_y),  # NE
+            (min_x, min_y, mid_x, mid_y),  # SW
+            (mid_x, min_y, max_x, mid_y),  # SE
+        )
+        self._node_depth[first:first + 4] = self._node_depth[node] + 1
+        self._node_first_child[first:first + 4] = -1
+        self._node_first_child[node] = first
+        self._node_total += 4
+        self._node_objects.extend([] for _ in range(4))
+        
+        remaining = []
+        for obj_id in self._node_objects[node]:
+            quadrant = self._quadrant(node, self._bounds_array[obj_id].tolist())
+            if quadrant < 0:
+                remaining.append(obj_id)
+            else:
+                self._node_objects[first + quadrant].append(obj_id)
+                self._object_node[obj_id] = first + quadrant
+        self._node_objects[node] = remaining
+    
+    def _place(self, obj_id: int, obj_bounds: Tuple[float, float, float, float]) -> None:
+        """
+        从根节点向下找到能容纳对象的最深节点并放入
+        """
+        node = 0
+        while True:
+            first = int(self._node_first_child[node])
+            if first < 0:
+                if (len(self._node_objects[node]) < self.max_objects
+                        or self._node_depth[node] >= self.max_depth):
+                    break
+                self._divide(node)
+                first = int(self._node_first_child[node])
+            quadrant = self._quadrant(node, obj_bounds)
+            if quadrant < 0:
+                break
+            node = first + quadrant
+        self._node_objects[node].append(obj_id)
+        self._object_node[obj_id] = node
+    
+    def insert(self, obj: Dict[str, Any]) -> bool:
+        """
+        插入对象到四叉树
+        
+        Args:
+            obj: 要插入的对象，必须包含bounds、shapely_obj或shapely_itz属性
+        
+        Returns:
+            bool: 是否成功插入（与根节点边界不相交的对象不插入）
+        """
+        obj_bounds = get_object_bounds(obj)
+        if obj_bounds is None:
+            return False
+        min_x, min_y, max_x, max_y = self.bounds
+        if obj_bounds[2] < min_x or obj_bounds[0] > max_x or obj_bounds[3] < min_y or obj_bounds[1] > max_y:
+            return False
+        
+        obj_id = len(self._objects)
+        self._ensure_capacity(obj_id + 1)
+        self._bounds_array[obj_id] = obj_bounds
+        self._objects.append(obj)
+        self._place(obj_id, obj_bounds)
+        key = obj.get('id')
+        self._keys[obj_id] = obj_id if key is None else key
+        if key is not None:
+            self._slots[key] = obj_id
+        return True
+    
+    def insert_batch(self, objects: List[Dict[str, Any]]) -> int:
+        """
+        批量插入对象
+        
+        新对象不少于已有对象时批量装载：一次取得全部边界，连同已有对象自顶向下
+        重建节点数组，每个节点用一次向量化判定把对象分配到子节点；批量较小时逐个插入。
+        
+        Args:
+            objects: 要插入的对象列表
+        
+        Returns:
+            int: 成功插入的对象数
+        """
+        if len(objects) < max(len(self._objects) - self._removed, 1):
+            count = 0
+            for obj in objects:
+                if self.insert(obj):
+                    count += 1
+            return count
+        
+        new_objects, new_bounds = collect_object_bounds(objects)
+        min_x, min_y, max_x, max_y = self.bounds
+        inside = ~((new_bounds[:, 2] < min_x) | (new_bounds[:, 0] > max_x) |
+                   (new_bounds[:, 3] < min_y) | (new_bounds[:, 1] > max_y))
+        if not inside.any():
+            return 0
+        
+        live = self._live_slots()
+        added = [obj for obj, keep in zip(new_objects, inside.tolist()) if keep]
+        self._load([self._objects[slot] for slot in live] + added,
+                   np.concatenate([self._bounds_array[live], new_bounds[inside]]))
+        return len(added)
+    
+    def _live_slots(self) -> List[int]:
+        """
+        未删除对象的内部编号
+        """
+        if not self._removed:
+            return list(range(len(self._objects)))
+        return [slot for slot, obj in enumerate(self._objects) if obj is not None]
+    
+    def _load(self, objects: List[Dict[str, Any]], bounds: np.ndarray) -> None:
+        """
+        清空后按给定对象和边界批量重建，对象按顺序重新编号
+        """
+        self._reset()
+        self._ensure_capacity(len(objects))
+        self._objects = objects
+        self._bounds_array[:len(objects)] = bounds
+        self._slots = {obj['id']: slot for slot, obj in enumerate(objects) if obj.get('id') is not None}
+        self._keys[:len(objects)] = [slot if obj.get('id') is None else obj['id'] for slot, obj in enumerate(objects)]
+        self._bulk_build(np.arange(len(objects)))
+    
+    def _bulk_build(self, ids: np.ndarray) -> None:
+        """
+        从根节点自顶向下分配对象：超过 max_objects 且未达最大深度的节点分裂，
+        能完整放入某个子节点的对象下移，跨越中线的对象留在本节点
+        """
+        stack = [(0, ids)]
+        while stack:
+            node, ids = stack.pop()
+            if len(ids) > self.max_objects and self._node_depth[node] < self.max_depth:
+                self._divide(node)
+                first = int(self._node_first_child[node])
+                node_min_x, node_min_y, node_max_x, node_max_y = self._node_bounds[node].tolist()
+                mid_x = (node_min_x + node_max_x) / 2
+                mid_y = (node_min_y + node_max_y) / 2
+                obj_bounds = self._bounds_array[ids]
+                # 与 _quadrant 相同的判定：西侧优先、北侧优先，跨越中线为 -1
+                east = np.where(obj_bounds[:, 2] <= mid_x, 0, np.where(obj_bounds[:, 0] >= mid_x, 1, -1))
+                south = np.where(obj_bounds[:, 1] >= mid_y, 0, np.where(obj_bounds[:, 3] <= mid_y, 2, -1))
+                quadrant = np.where((east < 0) | (south < 0), -1, east + south)
+                for q in range(4):
+                    sub_ids = ids[quadrant == q]
+                    if sub_ids.size:
+                        stack.append((first + q, sub_ids))
+                ids = ids[quadrant < 0]
+            self._node_objects[node] = ids.tolist()
+            self._object_node[ids] = node
+    
+    def _visit_nodes(self, bounds: Tuple[float, float, float, float]) -> List[int]:
+        """
+        迭代收集与查询范围相交的所有节点编号
+        
+        先沿完整容纳查询范围的子节点逐级下降（路径上的节点必然相交，根节点中
+        可能保存部分超出根边界的对象，也总被访问），再从该节点起逐层用布尔掩码
+        筛选子树中的节点。
+        """
+        node = 0
+        visited = [0]
+        while True:
+            first = int(self._node_first_child[node])
+            if first < 0:
+                return visited
+            quadrant = self._quadrant(node, bounds)
+            if quadrant < 0:
+                break
+            node = first + quadrant
+            visited.append(node)
+        
+        query_min = np.asarray(bounds[:2], dtype=float)
+        query_max = np.asarray(bounds[2:], dtype=float)
+        frontier = first + _QUADRANTS
+        while frontier.size:
+            node_bounds = self._node_bounds[frontier]
+            frontier = frontier[((node_bounds[:, 2:] >= query_min) & (node_bounds[:, :2] <= query_max)).all(axis=1)]
+            visited.extend(frontier.tolist())
+            children = self._node_first_child[frontier]
+            frontier = (children[children >= 0][:, None] + _QUADRANTS).ravel()
+        return visited
+    
+    def query_ids(self, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+        """
+        查询边界框与指定范围相交的对象编号
+        
+        Args:
+            bounds: 查询边界 (min_x, min_y, max_x, max_y)
+        
+        Returns:
+            np.ndarray: 对象 id 字段数组（没有 id 字段的对象为内部编号），升序且不重复
+        """
+        return np.sort(self._keys[self._query_slots(bounds)])
+    
+    def _query_slots(self, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+        """
+        查询边界框与指定范围相交的对象内部编号（升序，不重复）
+        """
+        if not self._objects:
+            return np.empty(0, dtype=np.intp)
+        node_objects = self._node_objects
+        ids = np.fromiter(chain.from_iterable(node_objects[n] for n in self._visit_nodes(bounds)),
+                          dtype=np.intp)
+        if ids.size == 0:
+            return ids
+        candidate_bounds = self._bounds_array[ids]
+        mask = ~(
+            (candidate_bounds[:, 2] < bounds[0]) |
+            (candidate_bounds[:, 0] > bounds[2]) |
+            (candidate_bounds[:, 3] < bounds[1]) |
+            (candidate_bounds[:, 1] > bounds[3])
+        )
+        ids = ids[mask]
+        ids.sort()
+        return ids
+    
+    def query_range(self, bounds: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
+        """
+        查询指定边界内的所有对象
+        
+        Args:
+            bounds: 查询边界 (min_x, min_y, max_x, max_y)
+        
+        Returns:
+            List[Dict[str, Any]]: 查询到的对象列表
+        """
+        objects = self._objects
+        return [objects[i] for i in self._query_slots(bounds).tolist()]
+    
+    def query_shapely(self, shapely_obj: Any, min_distance: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        查询与指定Shapely对象可能碰撞的所有对象
+        
+        Args:
+            shapely_obj: Shapely几何对象
+            min_distance: 最小距离，用于扩展查询边界
+        
+        Returns:
+            List[Dict[str, Any]]: 可能碰撞的对象列表
+        """
+        if not SHAPELY_AVAILABLE:
+            logging.warning("Shapely未安装，无法执行空间查询")
+            return []
+        obj_bounds = shapely_obj.bounds
+        expanded_bounds = (
+            obj_bounds[0] - min_distance,
+            obj_bounds[1] - min_distance,
+            obj_bounds[2] + min_distance,
+            obj_bounds[3] + min_distance
+        )
+        return self.query_range(expanded_bounds)
+    
+    def query_knn(self, point: Tuple[float, float], k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离最近的 k 个对象（最佳优先遍历）
+        
+        Args:
+            point: 查询点 (x, y)
+            k: 返回的对象数
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        return self._best_first(point, k=k)
+    
+    def query_radius(self, point: Tuple[float, float], radius: float) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离不超过 radius 的所有对象（最佳优先遍历）
+        
+        Args:
+            point: 查询点 (x, y)
+            radius: 查询半径
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        return self._best_first(point, radius=radius)
+    
+    def _best_first(self, point: Tuple[float, float], k: Optional[int] = None,
+                    radius: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        按节点边界到查询点的距离做最佳优先遍历（根节点总先展开，其中可能有部分超出根边界的对象）
+        """
+        px, py = point
+        objects = self._objects
+        
+        def expand(node: int) -> Tuple[list, list]:
+            children = []
+            first = int(self._node_first_child[node])
+            if first >= 0:
+                children = [(point_bounds_distance(point, child_bounds), first + q)
+                            for q, child_bounds in enumerate(self._node_bounds[first:first + 4].tolist())]
+            node_objects = []
+            for obj_id in self._node_objects[node]:
+                center_x, center_y = get_object_center(objects[obj_id], self._bounds_array[obj_id].tolist())
+                node_objects.append((math.hypot(center_x - px, center_y - py), obj_id, objects[obj_id]))
+            return children, node_objects
+        
+        return best_first_search([(0.0, 0)], expand, k, radius)
+    
+    def remove(self, obj_id: Any) -> bool:
+        """
+        按对象的 id 字段删除对象
+        
+        Args:
+            obj_id: 对象的 id 字段
+        
+        Returns:
+            bool: 是否找到并删除
+        """
+        slot = self._slots.pop(obj_id, None)
+        if slot is None:
+            return False
+        self._node_objects[int(self._object_node[slot])].remove(slot)
+        self._objects[slot] = None
+        self._removed += 1
+        if self._removed > len(self._objects) // 2:
+            live = self._live_slots()
+            self._load([self._objects[i] for i in live], self._bounds_array[live])
+        return True
+    
+    def update(self, obj_id: Any, new_bounds: Tuple[float, float, float, float],
+               obj: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        把对象移动到新边界：从原节点移除后重新向下放置，内部编号不变
+        
+        Args:
+            obj_id: 对象的 id 字段
+            new_bounds: 新边界 (min_x, min_y, max_x, max_y)
+            obj: 替换保存的对象（如位置更新后的新记录），省略时保留原对象并同步其 bounds 和 center 字段
+        
+        Returns:
+            bool: 是否找到并更新；新边界与根节点边界不相交时对象被删除，返回False
+        """
+        slot = self._slots.get(obj_id)
+        if slot is None:
+            return False
+        new_bounds = tuple(float(v) for v in new_bounds)
+        min_x, min_y, max_x, max_y = self.bounds
+        if new_bounds[2] < min_x or new_bounds[0] > max_x or new_bounds[3] < min_y or new_bounds[1] > max_y:
+            self.remove(obj_id)
+            return False
+        self._node_objects[int(self._object_node[slot])].remove(slot)
+        if obj is None:
+            move_object_bounds(self._objects[slot], tuple(self._bounds_array[slot].tolist()), new_bounds)
+        else:
+            self._objects[slot] = obj
+        self._bounds_array[slot] = new_bounds
+        self._place(slot, new_bounds)
+        return True
+    
+    def get_object(self, obj_id: Any) -> Dict[str, Any]:
+        """
+        按 query_ids 返回的编号获取对象
+        
+        Args:
+            obj_id: 对象的 id 字段；没有 id 字段的对象为内部编号（插入顺序，删除后压缩时重新编号）
+        
+        Returns:
+            Dict[str, Any]: 对象
+        """
+        return self._objects[self._slots.get(obj_id, obj_id)]
+    
+    def clear(self) -> None:
+        """
+        清除四叉树中的所有对象和节点
+        """
+        self._reset()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取四叉树统计信息
+        
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        total_objects = len(self._objects) - self._removed
+        return {
+            'total_nodes': self._node_total,
+            'total_objects': total_objects,
+            'max_depth': int(self._node_depth[:self._node_total].max()),
+            'root_objects': len(self._node_objects[0]),
+            'max_objects_per_node': max(len(ids) for ids in self._node_objects),
+            'avg_objects_per_node': total_objects / self._node_total
+        }
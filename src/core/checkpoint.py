@@ -0,0 +1,61 @@
+# core/checkpoint.py
+
+import os
+import json
+import logging
+from typing import Tuple, Dict, Any
+
+import numpy as np
+
+CHECKPOINT_VERSION = 2
+
+
+def save_checkpoint(filename: str, store: Any, state: Dict[str, Any], rng_state: Tuple) -> None:
+    """
+    写入生成检查点
+    
+    骨料存储的列数组原样写入 .npz 二进制文件，生成状态（区域、参数、组进度等）
+    以 JSON 文本保存在 meta 字段中，random 模块的状态拆为整数数组和 JSON 字段。
+    先写入临时文件再原子替换，写入过程中进程退出时旧检查点保持完整。
+    
+    Args:
+        filename: 检查点文件路径
+        store: 骨料存储（AggregateStore）
+        state: 可 JSON 序列化的生成状态
+        rng_state: random.getstate() 的返回值
+    """
+    version, internal, gauss_next = rng_state
+    meta = dict(state, version=CHECKPOINT_VERSION, rng_version=version, rng_gauss=gauss_next)
+    payload = {f"store_{name}": array for name, array in store.to_arrays().items()}
+    payload["rng_state"] = np.asarray(internal, dtype=np.uint32)
+    payload["meta"] = np.frombuffer(json.dumps(meta, ensure_ascii=False).encode("utf-8"), dtype=np.uint8)
+    
+    temp_filename = f"{filename}.tmp"
+    with open(temp_filename, "wb") as f:
+        np.savez(f, **payload)
+    os.replace(temp_filename, filename)
+    logging.debug(f"检查点已写入: {filename}，骨料数 {len(store)}")
+
+
+def load_checkpoint(filename: str) -> Tuple[Dict[str, np.ndarray], Dict[str, Any], Tuple]:
+    """
+    读取生成检查点
+    
+    Args:
+        filename: 检查点文件路径
+    
+    Returns:
+        Tuple: (骨料存储列数组，可传给 AggregateStore.load_arrays；生成状态；
+        可传给 random.setstate 的随机数状态)
+    """
+    with np.load(filename, allow_pickle=False) as data:
+        if "meta" not in data.files:
+            raise ValueError(f"不是有效的检查点文件: {filename}")
+        meta = json.loads(data["meta"].tobytes().decode("utf-8"))
+        if meta.get("version") != CHECKPOINT_VERSION:
+            raise ValueError(f"不支持的检查点版本: {meta.get('version')}")
+        arrays = {name[len("store_"):]: data[name] for name in data.files if name.startswith("store_")}
+        internal = tuple(int(value) for value in data["rng_state"])
+    rng_state = (meta.pop("rng_version"), internal, meta.pop("rng_gauss"))
+    meta.pop("version")
+    return arrays, meta, rng_state
@@ -1,26 +1,39 @@
 # collision.py
 
+import math
 import logging
-from typing import List, Optional, Any
+from typing import List, Tuple, Dict, Optional, Any, Callable
+
+import numpy as np
 
 try:
+    import shapely
     from shapely.geometry import Polygon
     SHAPELY_AVAILABLE = True
+    _HAS_DWITHIN = hasattr(shapely, 'dwithin')  # Shapely >= 2.1
 except ImportError:
     SHAPELY_AVAILABLE = False
+    _HAS_DWITHIN = False
     logging.warning("Shapely未安装，碰撞检测功能将受限")
 
 
 class GPUDistanceCalculator:
     """
     GPU加速的距离计算器，用于加速碰撞检测
+    
+    除单次计算接口外，还维护一个常驻设备内存、只追加、容量按倍数扩容的
+    已有骨料边界缓冲区：骨料被接受时只追加一行（O(1)），查询时一次计算
+    多个查询框对全部已有边界的掩码，不再每次重新上传全部边界。
+    PyTorch 可用时缓冲区为设备上的张量（无 CUDA 时为 CPU 张量，代码路径相同），
+    否则退化为 NumPy 数组。
     """
     def __init__(self):
         self.cuda_available = False
         self.torch = None
         self.device = None
-        self._cached_bounds = None  # 缓存的 existing bounds tensor
-        self._cached_bounds_key = None  # 缓存对应的原始数据 id
+        # 常驻边界缓冲区 (capacity, 4)，前 _bounds_count 行有效
+        self._bounds_buffer: Any = None
+        self._bounds_count = 0
         
         try:
             import torch
@@ -47,28 +60,13 @@ class GPUDistanceCalculator:
         Returns:
             List[bool]: 每个现有形状是否与新形状可能碰撞
         """
-        if not self.cuda_available or not self.torch or not existing_bounds_list:
-            results = []
-            for bounds in existing_bounds_list:
-                collision = not (
-                    new_shape_bounds[2] + min_distance < bounds[0] or
-                    new_shape_bounds[0] - min_distance > bounds[2] or
-                    new_shape_bounds[3] + min_distance < bounds[1] or
-                    new_shape_bounds[1] - min_distance > bounds[3]
-                )
-                results.append(collision)
-            return results
+        if not self.cuda_available or not self.torch or len(existing_bounds_list) == 0:
+            return self._calculate_distances_cpu(new_shape_bounds, existing_bounds_list, min_distance)
         
         try:
             new_bounds_tensor = self.torch.tensor(new_shape_bounds, device=self.device, dtype=self.torch.float32)
-            # 使用缓存避免重复创建 existing bounds tensor
-            bounds_key = id(existing_bounds_list)
-            if self._cached_bounds_key == bounds_key and self._cached_bounds is not None:
-                existing_bounds_tensor = self._cached_bounds
-            else:
-                existing_bounds_tensor = self.torch.tensor(existing_bounds_list, device=self.device, dtype=self.torch.float32)
-                self._cached_bounds = existing_bounds_tensor
-                self._cached_bounds_key = bounds_key
+            # 单次计算：每次上传传入的边界；反复查询同一批已有骨料时使用常驻缓冲区（append_bounds/query_masks）
+            existing_bounds_tensor = self.torch.tensor(existing_bounds_list, device=self.device, dtype=self.torch.float32)
             
             expanded_min_x = new_bounds_tensor[0] - min_distance
             expanded_min_y = new_bounds_tensor[1] - min_distance
@@ -85,19 +83,330 @@ class GPUDistanceCalculator:
             return collision_mask.cpu().tolist()
         except Exception as e:
             logging.warning(f"GPU距离计算出错，回退到CPU: {str(e)}")
-            results = []
-            for bounds in existing_bounds_list:
-                collision = not (
-                    new_shape_bounds[2] + min_distance < bounds[0] or
-                    new_shape_bounds[0] - min_distance > bounds[2] or
-                    new_shape_bounds[3] + min_distance < bounds[1] or
-                    new_shape_bounds[1] - min_distance > bounds[3]
-                )
-                results.append(collision)
-            return results
+            return self._calculate_distances_cpu(new_shape_bounds, existing_bounds_list, min_distance)
+    
+    @staticmethod
+    def _calculate_distances_cpu(new_shape_bounds: tuple, existing_bounds_list: Any,
+                                 min_distance: float) -> List[bool]:
+        """
+        CPU回退：用 NumPy 一次布尔掩码完成边界框筛选
+        """
+        existing = np.asarray(existing_bounds_list, dtype=float).reshape(-1, 4)
+        expanded = (new_shape_bounds[0] - min_distance, new_shape_bounds[1] - min_distance,
+                    new_shape_bounds[2] + min_distance, new_shape_bounds[3] + min_distance)
+        return bbox_overlap_mask(existing, expanded).tolist()
+    
+    @property
+    def buffer_size(self) -> int:
+        """常驻边界缓冲区中的有效行数"""
+        return self._bounds_count
+    
+    def _new_buffer(self, capacity: int) -> Any:
+        """
+        分配 (capacity, 4) 的边界缓冲区：PyTorch 可用时为设备张量，否则为 NumPy 数组
+        """
+        if self.torch is not None:
+            return self.torch.empty((capacity, 4), dtype=self.torch.float64, device=self.device)
+        return np.empty((capacity, 4), dtype=float)
+    
+    def reset_bounds(self, initial_capacity: int = 1024) -> None:
+        """
+        清空常驻边界缓冲区
+        
+        Args:
+            initial_capacity: 初始容量
+        """
+        self._bounds_buffer = self._new_buffer(max(1, initial_capacity))
+        self._bounds_count = 0
+    
+    def _ensure_buffer_capacity(self, size: int) -> None:
+        """
+        容量不足时按倍数扩容，已有数据在设备内复制
+        """
+        if self._bounds_buffer is None:
+            self.reset_bounds(max(1024, size))
+            return
+        capacity = self._bounds_buffer.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        buffer = self._new_buffer(capacity)
+        buffer[:self._bounds_count] = self._bounds_buffer[:self._bounds_count]
+        self._bounds_buffer = buffer
+    
+    def _to_buffer_rows(self, bounds_array: Any) -> Any:
+        """
+        把主机端边界数组转换为缓冲区所用的类型和设备
+        """
+        rows = np.asarray(bounds_array, dtype=float).reshape(-1, 4)
+        if self.torch is not None:
+            return self.torch.as_tensor(rows, dtype=self.torch.float64, device=self.device)
+        return rows
+    
+    def append_bounds(self, bounds: tuple) -> int:
+        """
+        追加一个已接受骨料的边界，摊销 O(1)
+        
+        Args:
+            bounds: 边界 (min_x, min_y, max_x, max_y)
+        
+        Returns:
+            int: 该边界在缓冲区中的行号
+        """
+        return self.extend_bounds([bounds])
+    
+    def extend_bounds(self, bounds_array: Any) -> int:
+        """
+        批量追加边界（一次上传）
+        
+        Args:
+            bounds_array: 边界数组 (N, 4)
+        
+        Returns:
+            int: 最后追加的一行的行号，未追加时为 -1
+        """
+        rows = self._to_buffer_rows(bounds_array)
+        count = rows.shape[0]
+        if count == 0:
+            return self._bounds_count - 1
+        self._ensure_buffer_capacity(self._bounds_count + count)
+        self._bounds_buffer[self._bounds_count:self._bounds_count + count] = rows
+        self._bounds_count += count
+        return self._bounds_count - 1
+    
+    def query_masks(self, query_bounds: Any, min_distance: float = 0.0) -> np.ndarray:
+        """
+        一次计算多个查询框与缓冲区中全部边界的相交掩码
+        
+        Args:
+            query_bounds: 查询边界 (4,) 或 (Q, 4)
+            min_distance: 最小间距，用于扩展查询边界
+        
+        Returns:
+            np.ndarray: 布尔掩码 (Q, N)，N 为缓冲区有效行数
+        """
+        queries = self._to_buffer_rows(query_bounds)
+        if self._bounds_count == 0:
+            return np.zeros((queries.shape[0], 0), dtype=bool)
+        existing = self._bounds_buffer[:self._bounds_count]
+        mask = ~(
+            (queries[:, None, 2] + min_distance < existing[None, :, 0]) |
+            (queries[:, None, 0] - min_distance > existing[None, :, 2]) |
+            (queries[:, None, 3] + min_distance < existing[None, :, 1]) |
+            (queries[:, None, 1] - min_distance > existing[None, :, 3])
+        )
+        if self.torch is not None:
+            return mask.cpu().numpy()
+        return mask
+    
+    def query_candidates(self, query_bounds: Any, min_distance: float = 0.0) -> List[np.ndarray]:
+        """
+        返回每个查询框对应的候选行号
+        
+        Args:
+            query_bounds: 查询边界 (4,) 或 (Q, 4)
+            min_distance: 最小间距，用于扩展查询边界
+        
+        Returns:
+            List[np.ndarray]: 每个查询框的候选行号数组（升序）
+        """
+        return [np.flatnonzero(row) for row in self.query_masks(query_bounds, min_distance)]
 
 gpu_calculator = GPUDistanceCalculator()
 
+
+def bbox_overlap_mask(bounds_array: np.ndarray, bbox: tuple) -> np.ndarray:
+    """
+    一次布尔掩码判断 (N, 4) 边界数组中各边界框是否与查询边界框相交（含接触）
+    
+    Args:
+        bounds_array: 边界数组 (N, 4)，每行 (min_x, min_y, max_x, max_y)
+        bbox: 查询边界框 (min_x, min_y, max_x, max_y)
+    
+    Returns:
+        np.ndarray: 布尔数组
+    """
+    return ~(
+        (bbox[2] < bounds_array[:, 0]) |
+        (bbox[0] > bounds_array[:, 2]) |
+        (bbox[3] < bounds_array[:, 1]) |
+        (bbox[1] > bounds_array[:, 3])
+    )
+
+
+def bbox_candidate_indices(bounds_array: np.ndarray, bbox: tuple, min_distance: float = 0.0) -> np.ndarray:
+    """
+    NumPy 边界框预筛选：返回与按最小间距扩展后的查询边界框相交的行号
+    
+    配合只追加的 (N, 4) 边界数组（如 AggregateStore.bounds）使用，
+    无需 GPU 即可用一次向量化表达式排除绝大多数候选。
+    
+    Args:
+        bounds_array: 边界数组 (N, 4)
+        bbox: 查询边界框 (min_x, min_y, max_x, max_y)
+        min_distance: 最小间距，用于扩展查询边界框
+    
+    Returns:
+        np.ndarray: 候选行号数组（升序）
+    """
+    expanded = (bbox[0] - min_distance, bbox[1] - min_distance,
+                bbox[2] + min_distance, bbox[3] + min_distance)
+    return np.flatnonzero(bbox_overlap_mask(np.asarray(bounds_array, dtype=float).reshape(-1, 4), expanded))
+
+def collect_candidate_geometries(objects: List[Any]) -> List[Any]:
+    """
+    从空间索引返回的对象中提取骨料及ITZ几何体（按对象去重）
+    
+    Args:
+        objects: 空间索引查询结果，每项包含shapely_obj/shapely_itz
+    
+    Returns:
+        List[Any]: Shapely几何对象列表
+    """
+    geometries = []
+    seen = set()
+    for obj in objects:
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if obj.get('shapely_obj') is not None:
+            geometries.append(obj['shapely_obj'])
+        if obj.get('shapely_itz') is not None:
+            geometries.append(obj['shapely_itz'])
+    return geometries
+
+
+def _bbox_prefilter(expanded_bbox: tuple, candidates: np.ndarray, use_gpu: bool) -> np.ndarray:
+    """
+    边界框快速排除，返回可能碰撞的候选几何体
+    
+    未启用 GPU 时始终由 NumPy 一次布尔掩码完成筛选。
+    
+    Args:
+        expanded_bbox: 已按最小间距扩展的查询边界框
+        candidates: Shapely几何对象数组
+        use_gpu: 是否使用GPU计算
+    
+    Returns:
+        np.ndarray: 通过边界框检测的几何对象数组
+    """
+    bounds = shapely.bounds(candidates)
+    
+    if use_gpu and gpu_calculator.cuda_available:
+        mask = np.asarray(gpu_calculator.calculate_distances_gpu(
+            expanded_bbox, bounds.tolist(), 0.0
+        ), dtype=bool)
+        return candidates[mask]
+    
+    return candidates[bbox_candidate_indices(bounds, expanded_bbox)]
+
+
+def batch_intersects(query_shape: Any, candidates: Any) -> np.ndarray:
+    """
+    使用 Shapely 2 向量化谓词，一次性判断查询几何体与一批几何体是否相交
+    
+    查询几何体会被 prepare()，重复使用时无需再次构建内部索引。
+    
+    Args:
+        query_shape: 查询用的Shapely几何对象
+        candidates: Shapely几何对象数组或列表
+    
+    Returns:
+        np.ndarray: 布尔数组，每个候选几何体是否与查询几何体相交
+    """
+    candidates = np.asarray(candidates, dtype=object)
+    if candidates.size == 0:
+        return np.zeros(0, dtype=bool)
+    shapely.prepare(query_shape)
+    return shapely.intersects(query_shape, candidates)
+
+
+def batch_collides(query_shape: Any, candidates: Any,
+                   min_distance: float = 0.0, allow_touching: bool = True) -> np.ndarray:
+    """
+    精确间距检测：判断查询几何体与一批几何体之间是否违反最小间距
+    
+    判定规则（d 为两几何体间的最短距离）：
+    - allow_touching=True：d < min_distance 视为碰撞，恰好接触（d == min_distance）允许；
+    - allow_touching=False：d <= min_distance 视为碰撞，必须留有间隙。
+    min_distance 为 0 时分别退化为“内部重叠”和“相交”。
+    
+    先用 dwithin/intersects 一次向量化调用筛出命中项，只对命中项再计算
+    distance/touches 以区分恰好接触的情况，无需为间距额外 buffer() 几何体。
+    
+    Args:
+        query_shape: 查询用的Shapely几何对象
+        candidates: Shapely几何对象数组或列表
+        min_distance: 最小间距
+        allow_touching: 是否允许恰好接触
+    
+    Returns:
+        np.ndarray: 布尔数组，每个候选几何体是否与查询几何体冲突
+    """
+    candidates = np.asarray(candidates, dtype=object)
+    if candidates.size == 0:
+        return np.zeros(0, dtype=bool)
+    shapely.prepare(query_shape)
+    
+    if min_distance > 0:
+        if _HAS_DWITHIN:
+            hits = shapely.dwithin(query_shape, candidates, min_distance)
+        else:
+            hits = shapely.distance(query_shape, candidates) <= min_distance
+        if allow_touching and hits.any():
+            idx = np.flatnonzero(hits)
+            hits[idx] = shapely.distance(query_shape, candidates[idx]) < min_distance
+        return hits
+    
+    hits = shapely.intersects(query_shape, candidates)
+    if allow_touching and hits.any():
+        idx = np.flatnonzero(hits)
+        hits[idx] = ~shapely.touches(query_shape, candidates[idx])
+    return hits
+
+
+def _pair_collides(shape_a: Any, shape_b: Any, min_distance: float, allow_touching: bool) -> bool:
+    """
+    单对几何体的间距检测，与 batch_collides 规则一致（用于回退路径）
+    """
+    if min_distance > 0:
+        distance = shape_a.distance(shape_b)
+        return distance < min_distance if allow_touching else distance <= min_distance
+    if not shape_a.intersects(shape_b):
+        return False
+    return not (allow_touching and shape_a.touches(shape_b))
+
+
+def _exact_collision(new_shape: Any, new_itz_shape: Optional[Any], candidates: np.ndarray,
+                     min_distance: float = 0.0, allow_touching: bool = True) -> bool:
+    """
+    精确碰撞检测：每个查询几何体对整批候选只调用一次向量化谓词
+    """
+    try:
+        if batch_collides(new_shape, candidates, min_distance, allow_touching).any():
+            return True
+        if new_itz_shape and batch_collides(new_itz_shape, candidates, min_distance, allow_touching).any():
+            return True
+        return False
+    except Exception as e:
+        logging.warning(f"向量化碰撞检测出错，回退到逐个检测: {str(e)}")
+    
+    for shape in candidates:
+        try:
+            if _pair_collides(new_shape, shape, min_distance, allow_touching):
+                return True
+            
+            if new_itz_shape:
+                if _pair_collides(new_itz_shape, shape, min_distance, allow_touching):
+                    return True
+        except Exception as e:
+            logging.warning(f"精确碰撞检测时出错: {str(e)}")
+            continue
+    
+    return False
+
+
 def check_collision_hierarchical(new_shape: Any, 
                                  new_itz_shape: Optional[Any], 
                                  existing_shapes_and_itzs: List[Any], 
@@ -108,14 +417,18 @@ def check_collision_hierarchical(new_shape: Any,
     """
     层次化碰撞检测：先边界框快速排除，再精确碰撞检测。
     
+    边界框排除和精确检测均基于 Shapely 2 的向量化接口，
+    每批候选几何体只需一次 C 层调用。精确检测按 min_distance 和
+    allow_touching 判定真实间距，规则见 batch_collides。
+    
     Args:
         new_shape: 新骨料的Shapely几何对象
         new_itz_shape: 新骨料ITZ的Shapely几何对象，可为None
         existing_shapes_and_itzs: 包含所有已存在骨料和ITZ的Shapely对象列表
-        min_distance: 最小间距
-        quadtree: 可选的空间索引对象，用于优化碰撞检测
+        min_distance: 最小间距，骨料（含ITZ）之间的最短距离不得小于该值
+        quadtree: 可选的空间索引对象，提供时以其查询结果作为候选集
         use_gpu: 是否使用GPU加速碰撞检测
-        allow_touching: 是否允许颗粒直接接触，True表示允许接触，False表示必须保持最小距离
+        allow_touching: 是否允许颗粒恰好接触（距离等于最小间距），False表示必须留有间隙
         
     Returns:
         bool: 如果发生碰撞返回True，否则返回False
@@ -124,68 +437,252 @@ def check_collision_hierarchical(new_shape: Any,
         logging.error("Shapely未安装，无法进行碰撞检测")
         return True
     
+    query_obj = new_itz_shape if new_itz_shape else new_shape
+    
     if quadtree is not None:
-        query_obj = new_itz_shape if new_itz_shape else new_shape
-        temp_obj = {'shapely_obj': new_shape}
         potential_collisions = quadtree.query_shapely(query_obj, min_distance)
+        existing_shapes_and_itzs = collect_candidate_geometries(potential_collisions)
         
-        potential_shapes = []
-        for obj in potential_collisions:
-            if 'shapely_obj' in obj:
-                potential_shapes.append(obj['shapely_obj'])
-            if 'shapely_itz' in obj and obj['shapely_itz']:
-                potential_shapes.append(obj['shapely_itz'])
+    if not existing_shapes_and_itzs:
+        return False
         
-        if potential_shapes:
-            existing_shapes_and_itzs = potential_shapes
-    
-    if new_itz_shape:
-        main_bbox = new_itz_shape.bounds
-        expanded_bbox = (
-            main_bbox[0] - min_distance,
-            main_bbox[1] - min_distance,
-            main_bbox[2] + min_distance,
-            main_bbox[3] + min_distance
-        )
-    else:
-        main_bbox = new_shape.bounds
-        expanded_bbox = (
-            main_bbox[0] - min_distance,
-            main_bbox[1] - min_distance,
-            main_bbox[2] + min_distance,
-            main_bbox[3] + min_distance
-        )
+    main_bbox = query_obj.bounds
+    expanded_bbox = (
+        main_bbox[0] - min_distance,
+        main_bbox[1] - min_distance,
+        main_bbox[2] + min_distance,
+        main_bbox[3] + min_distance
+    )
     
-    possible_colliders = []
+    candidates = np.asarray(existing_shapes_and_itzs, dtype=object)
+    possible_colliders = _bbox_prefilter(expanded_bbox, candidates, use_gpu)
+    if possible_colliders.size == 0:
+        return False
     
-    if use_gpu and gpu_calculator.cuda_available:
-        existing_bounds_list = [shape.bounds for shape in existing_shapes_and_itzs]
-        potential_collisions = gpu_calculator.calculate_distances_gpu(
-            expanded_bbox, existing_bounds_list, 0.0
-        )
-        
-        for i, collision in enumerate(potential_collisions):
-            if collision:
-                possible_colliders.append(existing_shapes_and_itzs[i])
-    else:
-        for shape in existing_shapes_and_itzs:
-            shape_bbox = shape.bounds
-            if not (expanded_bbox[2] < shape_bbox[0] or 
-                    expanded_bbox[0] > shape_bbox[2] or 
-                    expanded_bbox[3] < shape_bbox[1] or 
-                    expanded_bbox[1] > shape_bbox[3]):
-                possible_colliders.append(shape)
-    
-    for shape in possible_colliders:
-        try:
-            if new_shape.intersects(shape):
-                return True
-            
-            if new_itz_shape:
-                if new_itz_shape.intersects(shape):
-                    return True
-        except Exception as e:
-            logging.warning(f"精确碰撞检测时出错: {str(e)}")
+    return _exact_collision(new_shape, new_itz_shape, possible_colliders, min_distance, allow_touching)
+
+
+# 解析图元: (类型, 中心x, 中心y, 半轴a, 半轴b, 旋转角, ITZ厚度)，圆形 a == b
+Primitive = Tuple[str, float, float, float, float, float, float]
+
+_PW_ITERATIONS = 40
+_GOLDEN = (math.sqrt(5) - 1) / 2
+
+
+def make_primitive(shape_info: Dict[str, Any], center: Tuple[float, float],
+                   itz_thickness: float = 0.0) -> Optional[Primitive]:
+    """
+    根据形状信息构造圆/椭圆解析图元
+    
+    Args:
+        shape_info: 形状信息，shape 字段为 circle 或 ellipse
+        center: 中心点坐标 (x, y)
+        itz_thickness: ITZ厚度
+    
+    Returns:
+        Optional[Primitive]: 解析图元，多边形等其他形状返回None
+    """
+    shape = shape_info.get('shape')
+    if shape == 'circle':
+        radius = shape_info['radius']
+        return ('circle', center[0], center[1], radius, radius, 0.0, itz_thickness)
+    if shape == 'ellipse':
+        return ('ellipse', center[0], center[1], shape_info['major_axis'], shape_info['minor_axis'],
+                shape_info.get('rotation', 0.0), itz_thickness)
+    return None
+
+
+def primitive_radius(primitive: Primitive) -> float:
+    """
+    解析图元（含ITZ）的外接圆半径
+    """
+    return max(primitive[3], primitive[4]) + primitive[6]
+
+
+def _ellipse_inverse_shape(a: float, b: float, rotation: float) -> Tuple[float, float, float]:
+    """
+    椭圆 x^T A x <= 1 中 A^{-1} = R diag(a², b²) R^T 的三个独立分量 (xx, xy, yy)
+    """
+    c = math.cos(rotation)
+    s = math.sin(rotation)
+    a2 = a * a
+    b2 = b * b
+    return (a2 * c * c + b2 * s * s, (a2 - b2) * c * s, a2 * s * s + b2 * c * c)
+
+
+def ellipse_contact_function(p1: Primitive, p2: Primitive, inflate1: float = 0.0,
+                             inflate2: float = 0.0, scale1: float = 1.0, scale2: float = 1.0,
+                             threshold: float = math.inf) -> float:
+    """
+    Perram–Wertheim 接触函数 F = max_λ λ(1-λ) rᵀ[(1-λ)A⁻¹ + λB⁻¹]⁻¹ r
+    
+    F < 1 表示两椭圆重叠，F == 1 表示相切，F > 1 表示分离。F(λ) 在 [0, 1] 上为凹函数，
+    使用黄金分割搜索求最大值；任一采样值达到 threshold 即提前返回。
+    
+    Args:
+        p1, p2: 解析图元（不含ITZ，仅使用中心、半轴和旋转角）
+        inflate1, inflate2: 半轴的加性膨胀量
+        scale1, scale2: 半轴的乘性缩放系数（在膨胀后应用）
+        threshold: 提前终止阈值
+    
+    Returns:
+        float: 接触函数值（提前终止时为下界）
+    """
+    rx = p2[1] - p1[1]
+    ry = p2[2] - p1[2]
+    a_xx, a_xy, a_yy = _ellipse_inverse_shape((p1[3] + inflate1) * scale1, (p1[4] + inflate1) * scale1, p1[5])
+    b_xx, b_xy, b_yy = _ellipse_inverse_shape((p2[3] + inflate2) * scale2, (p2[4] + inflate2) * scale2, p2[5])
+    
+    def f(lam: float) -> float:
+        m_xx = (1 - lam) * a_xx + lam * b_xx
+        m_xy = (1 - lam) * a_xy + lam * b_xy
+        m_yy = (1 - lam) * a_yy + lam * b_yy
+        det = m_xx * m_yy - m_xy * m_xy
+        if det <= 0:
+            return 0.0
+        quad = (m_yy * rx * rx - 2 * m_xy * rx * ry + m_xx * ry * ry) / det
+        return lam * (1 - lam) * quad
+    
+    lo, hi = 0.0, 1.0
+    x1 = hi - _GOLDEN * (hi - lo)
+    x2 = lo + _GOLDEN * (hi - lo)
+    f1 = f(x1)
+    f2 = f(x2)
+    for _ in range(_PW_ITERATIONS):
+        if f1 >= threshold or f2 >= threshold:
+            break
+        if f1 < f2:
+            lo, x1, f1 = x1, x2, f2
+            x2 = lo + _GOLDEN * (hi - lo)
+            f2 = f(x2)
+        else:
+            hi, x2, f2 = x2, x1, f1
+            x1 = hi - _GOLDEN * (hi - lo)
+            f1 = f(x1)
+    return max(f1, f2)
+
+
+def _primitive_pair_collides(p1: Primitive, p2: Primitive, min_distance: float,
+                             allow_touching: bool) -> Optional[bool]:
+    """
+    解析图元对的间距检测
+    
+    Returns:
+        Optional[bool]: True 碰撞，False 无碰撞，None 无法解析判定（需回退到多边形）
+    """
+    distance = math.hypot(p2[1] - p1[1], p2[2] - p1[2])
+    
+    def violates(gap: float) -> bool:
+        return gap < min_distance if allow_touching else gap <= min_distance
+    
+    # 外接圆排除
+    if not violates(distance - primitive_radius(p1) - primitive_radius(p2)):
+        return False
+    
+    if p1[0] == 'circle' and p2[0] == 'circle':
+        return True
+    
+    # 内切圆（ITZ 缓冲后仍为圆）重叠则必然碰撞
+    if violates(distance - min(p1[3], p1[4]) - p1[6] - min(p2[3], p2[4]) - p2[6]):
+        return True
+    
+    # 椭圆按 t 缓冲后的区域介于 (a+t, b+t) 椭圆与按 1 + t/min(a,b) 缩放的椭圆之间，
+    # 最小间距平分到两侧的膨胀量中
+    half_gap = min_distance / 2
+    t1 = p1[6] + half_gap
+    t2 = p2[6] + half_gap
+    inner = ellipse_contact_function(p1, p2, t1, t2, threshold=1.0)
+    if inner < 1.0 or (not allow_touching and inner <= 1.0):
+        return True
+    if t1 == 0 and t2 == 0:
+        return False
+    
+    scale1 = 1 + t1 / max(min(p1[3], p1[4]), 1e-12)
+    scale2 = 1 + t2 / max(min(p2[3], p2[4]), 1e-12)
+    outer = ellipse_contact_function(p1, p2, scale1=scale1, scale2=scale2, threshold=1.0 + 1e-12)
+    if outer > 1.0 or (allow_touching and outer >= 1.0):
+        return False
+    return None
+
+
+def check_collision_analytic(primitive: Primitive, candidates: List[Dict[str, Any]],
+                             min_distance: float = 0.0,
+                             allow_touching: bool = True) -> Tuple[bool, List[Dict[str, Any]]]:
+    """
+    圆/椭圆骨料的解析碰撞检测
+    
+    圆-圆仅比较中心距离；涉及椭圆时先做外接圆排除和内切圆确认，
+    再用 Perram–Wertheim 接触函数判定。多边形候选或落在椭圆缓冲区
+    上下界之间的情况无法解析判定，交由调用方用多边形精确检测。
+    
+    Args:
+        primitive: 新骨料的解析图元
+        candidates: 空间索引返回的候选对象，解析图元存放在 primitive 字段
+        min_distance: 最小间距
+        allow_touching: 是否允许恰好接触
+    
+    Returns:
+        Tuple[bool, List[Dict[str, Any]]]: (是否已确认碰撞, 需多边形检测的候选列表)
+    """
+    undecided: List[Dict[str, Any]] = []
+    seen = set()
+    for obj in candidates:
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        other = obj.get('primitive')
+        if other is None:
+            undecided.append(obj)
             continue
+        result = _primitive_pair_collides(primitive, other, min_distance, allow_touching)
+        if result is None:
+            undecided.append(obj)
+        elif result:
+            return True, []
+    return False, undecided
+
+
+def check_aggregate_collision(agg_data: Dict[str, Any], spatial_index: Any,
+                              min_distance: float = 0.0, allow_touching: bool = True,
+                              use_gpu: bool = False,
+                              ensure_geometry: Optional[Callable[[Dict[str, Any]], bool]] = None) -> bool:
+    """
+    检测候选骨料与空间索引中已有骨料是否冲突
     
-    return False
+    带解析图元（圆/椭圆）的候选先走解析路径，只有与多边形或无法解析判定的
+    邻居才需要 Shapely 对象做精确检测；其余候选直接走层次化检测。
+    
+    Args:
+        agg_data: 候选骨料数据，包含 primitive、shapely_obj、shapely_itz
+        spatial_index: 已有骨料的空间索引
+        min_distance: 最小间距
+        allow_touching: 是否允许恰好接触
+        use_gpu: 是否使用GPU加速边界框筛选
+        ensure_geometry: 需要多边形检测时调用，用于按需构建 Shapely 对象，返回False表示构建失败
+    
+    Returns:
+        bool: 发生碰撞返回True
+    """
+    primitive = agg_data.get("primitive")
+    if primitive is not None:
+        reach = primitive_radius(primitive) + min_distance
+        query_bounds = (primitive[1] - reach, primitive[2] - reach,
+                        primitive[1] + reach, primitive[2] + reach)
+        neighbours = spatial_index.query_range(query_bounds)
+        collision, undecided = check_collision_analytic(primitive, neighbours, min_distance, allow_touching)
+        if collision:
+            return True
+        if not undecided:
+            return False
+        existing_shapes = collect_candidate_geometries(undecided)
+        index = None
+    else:
+        existing_shapes = []
+        index = spatial_index
+    
+    if ensure_geometry is not None and not ensure_geometry(agg_data):
+        return True
+    return check_collision_hierarchical(
+        agg_data["shapely_obj"], agg_data["shapely_itz"], existing_shapes,
+        min_distance, index, use_gpu, allow_touching
+    )
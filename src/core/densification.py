@@ -0,0 +1,228 @@
+# core/densification.py
+
+import math
+import random
+import logging
+from typing import Tuple, Dict, Any, Optional, Callable, List
+
+import numpy as np
+
+from .collision import check_collision_hierarchical
+
+try:
+    import shapely
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logging.warning("Shapely未安装，重力沉降密实化功能将受限")
+
+
+class GravityDensifier:
+    """
+    重力沉降密实化
+    
+    沿沉降方向（向下或指向区域中心）以小步长逐个推动已放置的骨料。每个骨料依次尝试
+    沉降方向及其左右 45° 两个斜向，步长从 step 开始逐次减半至 step / 16，取第一个
+    不越出区域且不与其他骨料冲突的位移。每一轮按沉降方向由前到后处理骨料，前方的
+    骨料先落位，为后方的骨料让出空间，沉降结束后空隙集中在沉降方向的后方，可供
+    后续投放轮次继续填充。
+    
+    接触检测通过空间索引完成，骨料移动后立即用 update 更新其在索引中的位置。
+    每个骨料的邻居只查询一次，供全部试探位移共用；无法移动的骨料进入休眠，
+    直到其邻域内有骨料移动。
+    """
+    
+    DIRECTIONS = ("down", "inward")
+    
+    def __init__(self, store: Any, spatial_index: Any, region: Tuple[float, float, float, float],
+                 min_distance: float = 0.0, allow_touching: bool = True,
+                 direction: str = "down", step: Optional[float] = None, first_index: int = 0):
+        """
+        Args:
+            store: 骨料存储（AggregateStore），沉降直接修改其中的坐标
+            spatial_index: 包含存储中全部骨料的空间索引，记录的 id 为存储编号
+            region: 区域边界 (min_x, min_y, max_x, max_y)，骨料不得沉降到区域外
+            min_distance: 骨料（含ITZ）之间的最小间距
+            allow_touching: 是否允许恰好接触
+            direction: 沉降方向，"down"（向下）或 "inward"（指向区域中心）
+            step: 单次最大位移，默认取可移动骨料半径中位数的一半
+            first_index: 只移动编号不小于该值的骨料，之前的骨料作为固定障碍
+        """
+        if direction not in self.DIRECTIONS:
+            raise ValueError(f"无效的沉降方向: {direction}，必须是 'down' 或 'inward'")
+        self.store = store
+        self.spatial_index = spatial_index
+        self.region = region
+        self.min_distance = min_distance
+        self.allow_touching = allow_touching
+        self.direction = direction
+        self.first_index = max(0, first_index)
+        
+        if step is None:
+            radii = store.radii[self.first_index:]
+            step = 0.5 * float(np.median(radii)) if len(radii) else 0.0
+        self.step = step
+        self.min_step = step / 16.0
+        self._center = ((region[0] + region[2]) / 2.0, (region[1] + region[3]) / 2.0)
+        self._asleep = set()
+    
+    def settle(self, max_sweeps: int = 20, tolerance: float = 0.01,
+               cancel_check: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        反复沉降，直到一轮中发生位移的骨料比例不超过 tolerance 或达到 max_sweeps
+        
+        Args:
+            max_sweeps: 最大轮数
+            tolerance: 停止阈值（一轮中发生位移的骨料占可移动骨料的比例）
+            cancel_check: 每轮开始前调用，返回True时提前结束
+        
+        Returns:
+            Dict[str, Any]: 统计信息（轮数、累计位移次数、累计位移距离）
+        """
+        stats = {'sweeps': 0, 'moves': 0, 'displacement': 0.0}
+        movable = len(self.store) - self.first_index
+        if not SHAPELY_AVAILABLE or movable <= 0 or self.step <= 0:
+            return stats
+        
+        for _ in range(max_sweeps):
+            if cancel_check is not None and cancel_check():
+                break
+            moved, displacement = self._sweep()
+            stats['sweeps'] += 1
+            stats['moves'] += moved
+            stats['displacement'] += displacement
+            if moved <= tolerance * movable:
+                break
+        logging.info(f"重力沉降: {stats['sweeps']} 轮，位移 {stats['moves']} 次，"
+                     f"累计距离 {stats['displacement']:.2f}")
+        return stats
+    
+    def _sweep(self) -> Tuple[int, float]:
+        """
+        按沉降顺序推动每个可移动骨料一次
+        
+        Returns:
+            Tuple[int, float]: (发生位移的骨料数, 位移距离之和)
+        """
+        moved = 0
+        displacement = 0.0
+        for index in self._settle_order():
+            index = int(index)
+            if index in self._asleep:
+                continue
+            distance = self._settle_one(index)
+            if distance > 0:
+                moved += 1
+                displacement += distance
+        return moved, displacement
+    
+    def _settle_order(self) -> np.ndarray:
+        """
+        可移动骨料的处理顺序：沿沉降方向最靠前的骨料最先处理
+        """
+        first = self.first_index
+        if self.direction == "down":
+            key = self.store.bounds[first:, 1]
+        else:
+            key = np.hypot(self.store.centers[first:, 0] - self._center[0],
+                           self.store.centers[first:, 1] - self._center[1])
+        return first + np.argsort(key, kind="stable")
+    
+    def _directions(self, index: int) -> Tuple[List[Tuple[float, float]], float]:
+        """
+        骨料的候选位移方向（沉降方向及左右 45° 斜向，斜向顺序随机）和最大步长
+        """
+        if self.direction == "down":
+            ux, uy = 0.0, -1.0
+            max_step = self.step
+        else:
+            cx, cy = self.store.centers[index]
+            vx, vy = self._center[0] - cx, self._center[1] - cy
+            distance = math.hypot(vx, vy)
+            if distance < self.min_step:
+                return [], 0.0
+            ux, uy = vx / distance, vy / distance
+            max_step = min(self.step, distance)
+        
+        c = math.sqrt(0.5)
+        diagonals = [(c * (ux - uy), c * (ux + uy)), (c * (ux + uy), c * (uy - ux))]
+        random.shuffle(diagonals)
+        return [(ux, uy)] + diagonals, max_step
+    
+    def _inside(self, bounds: Tuple[float, float, float, float], dx: float, dy: float) -> bool:
+        """
+        平移后骨料是否仍在区域内（原本越界的一侧不得进一步越界）
+        """
+        min_x, min_y, max_x, max_y = self.region
+        return (bounds[0] + dx >= min(min_x, bounds[0]) and bounds[1] + dy >= min(min_y, bounds[1]) and
+                bounds[2] + dx <= max(max_x, bounds[2]) and bounds[3] + dy <= max(max_y, bounds[3]))
+    
+    def _settle_one(self, index: int) -> float:
+        """
+        尝试沿沉降方向推动一个骨料，成功时更新存储
+        
+        Returns:
+            float: 位移距离，无法移动时为0
+        """
+        directions, max_step = self._directions(index)
+        if not directions:
+            return 0.0
+        polygon, itz_polygon = self.store.geometry(index)
+        bounds = polygon.bounds
+        neighbours, shapes = self._neighbours(index, itz_polygon if itz_polygon is not None else polygon)
+        
+        # 最小步长在所有方向上都受阻时直接放弃，否则从最大步长开始逐次减半
+        steps = [max_step / 2.0 ** k for k in range(5)]
+        if not any(self._try_move(polygon, itz_polygon, bounds, shapes, ux * self.min_step, uy * self.min_step)
+                   for ux, uy in directions):
+            self._asleep.add(index)
+            return 0.0
+        for step in steps:
+            for ux, uy in directions:
+                moved = self._try_move(polygon, itz_polygon, bounds, shapes, ux * step, uy * step)
+                if moved is not None:
+                    self.store.translate(index, ux * step, uy * step)
+                    self.store.cache_geometry(index, *moved)
+                    new_bounds = tuple(self.store.bounds[index].tolist())
+                    record = self.store.record(index, self.store.primitive(index))
+                    self.spatial_index.update(index, new_bounds, record)
+                    self._asleep.difference_update(neighbours)
+                    return step
+        return 0.0
+    
+    def _neighbours(self, index: int, footprint: Any) -> Tuple[List[int], List[Any]]:
+        """
+        查询骨料在本次沉降可能到达的范围内的邻居
+        
+        Returns:
+            Tuple[List[int], List[Any]]: (邻居编号, 邻居的骨料和ITZ几何)
+        """
+        min_x, min_y, max_x, max_y = footprint.bounds
+        reach = self.min_distance + self.step
+        neighbours = []
+        shapes = []
+        for record in self.spatial_index.query_range((min_x - reach, min_y - reach, max_x + reach, max_y + reach)):
+            other = record['id']
+            if other == index:
+                continue
+            neighbours.append(other)
+            other_polygon, other_itz = self.store.geometry(other)
+            shapes.append(other_polygon)
+            if other_itz is not None:
+                shapes.append(other_itz)
+        return neighbours, shapes
+    
+    def _try_move(self, polygon: Any, itz_polygon: Any, bounds: Tuple[float, float, float, float],
+                  shapes: List[Any], dx: float, dy: float) -> Optional[Tuple[Any, Any]]:
+        """
+        试探平移：不越出区域且不与邻居冲突时返回平移后的 (骨料多边形, ITZ多边形)，否则返回None
+        """
+        if not self._inside(bounds, dx, dy):
+            return None
+        offset = np.array([dx, dy])
+        moved_polygon = shapely.transform(polygon, lambda coords: coords + offset)
+        moved_itz = shapely.transform(itz_polygon, lambda coords: coords + offset) if itz_polygon is not None else None
+        if check_collision_hierarchical(moved_polygon, moved_itz, shapes, self.min_distance,
+                                        None, False, self.allow_touching):
+            return None
+        return moved_polygon, moved_itz
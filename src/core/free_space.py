@@ -0,0 +1,192 @@
+# core/free_space.py
+
+import math
+import random
+import logging
+import threading
+from typing import Tuple, Dict, Any, Optional
+
+import numpy as np
+
+try:
+    import shapely
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logging.warning("Shapely未安装，空隙感知采样功能将受限")
+
+
+class FreeSpaceSampler:
+    def __init__(self, bounds: Tuple[float, float, float, float], cell_size: float, max_clearance: float):
+        """
+        空隙感知的中心点采样器
+        
+        在采样区域上维护一张间隙栅格：每个单元格记录其中心到最近已放置骨料
+        （含ITZ）的距离，上限为 max_clearance。骨料被接受时只更新其周围的单元格。
+        采样时只从间隙足够容纳候选形状的单元格中抽取中心点；判定按单元格内
+        最不利位置保守处理，因此不会排除任何可行位置，采样分布在可行区域内保持均匀。
+        
+        Args:
+            bounds: 中心点采样范围 (min_x, min_y, max_x, max_y)
+            cell_size: 栅格单元边长
+            max_clearance: 需要区分的最大间隙，超过该值的单元格视为完全空闲
+        """
+        if cell_size <= 0:
+            raise ValueError("单元格尺寸必须大于0")
+        self.bounds = bounds
+        self.cell_size = float(cell_size)
+        
+        min_x, min_y, max_x, max_y = bounds
+        self.nx = max(1, int(math.ceil((max_x - min_x) / self.cell_size)))
+        self.ny = max(1, int(math.ceil((max_y - min_y) / self.cell_size)))
+        self._xs = min_x + (np.arange(self.nx) + 0.5) * self.cell_size
+        self._ys = min_y + (np.arange(self.ny) + 0.5) * self.cell_size
+        
+        # 单元格内任意一点与中心的最大距离，用于保守判定
+        self._half_diagonal = self.cell_size * math.sqrt(2) / 2
+        self._cap = max_clearance + self._half_diagonal
+        self._free = np.full((self.ny, self.nx), self._cap, dtype=float)
+        # 各间隙等级的候选单元格及其中已失效（间隙降到阈值以下）的数量
+        self._eligible_cache: Dict[int, np.ndarray] = {}
+        self._stale: Dict[int, int] = {}
+        # 生成线程并发采样时，采样会压缩和新建候选列表，与 mark_occupied 共用此锁
+        self._lock = threading.Lock()
+    
+    def mark_occupied(self, geometry: Any) -> None:
+        """
+        记录一个新放置的骨料，更新其影响范围内单元格的间隙
+        
+        Args:
+            geometry: 骨料占据的几何体（通常为含ITZ的 Shapely 多边形）
+        """
+        if geometry is None or not SHAPELY_AVAILABLE:
+            return
+        g_min_x, g_min_y, g_max_x, g_max_y = geometry.bounds
+        reach = self._cap
+        min_x, min_y = self.bounds[0], self.bounds[1]
+        
+        ix0 = max(0, int(math.floor((g_min_x - reach - min_x) / self.cell_size)))
+        ix1 = min(self.nx, int(math.ceil((g_max_x + reach - min_x) / self.cell_size)))
+        iy0 = max(0, int(math.floor((g_min_y - reach - min_y) / self.cell_size)))
+        iy1 = min(self.ny, int(math.ceil((g_max_y + reach - min_y) / self.cell_size)))
+        if ix0 >= ix1 or iy0 >= iy1:
+            return
+        
+        xs, ys = np.meshgrid(self._xs[ix0:ix1], self._ys[iy0:iy1])
+        distances = shapely.distance(geometry, shapely.points(xs.ravel(), ys.ravel()))
+        distances = distances.reshape(iy1 - iy0, ix1 - ix0)
+        with self._lock:
+            window = self._free[iy0:iy1, ix0:ix1]
+            if self._eligible_cache:
+                # 只统计窗口内间隙跌破各等级阈值的单元格，候选列表留待失效过半时再压缩
+                lowered = distances < window
+                old, new = window[lowered], distances[lowered]
+                levels = list(self._eligible_cache)
+                thresholds = np.array([self._threshold(level) for level in levels])[:, None]
+                dropped = ((old >= thresholds) & (new < thresholds)).sum(axis=1)
+                for level, count in zip(levels, dropped.tolist()):
+                    self._stale[level] += count
+            np.minimum(window, distances, out=window)
+    
+    def _level(self, clearance: float) -> int:
+        """
+        所需间隙按四分之一单元格尺寸向下取整后的等级，取整只会放宽判定
+        """
+        return max(0, int(math.floor(clearance * 4 / self.cell_size)))
+    
+    def _threshold(self, level: int) -> float:
+        """
+        等级对应的单元格中心间隙阈值
+        """
+        return min(level * self.cell_size / 4 - self._half_diagonal, self._cap)
+    
+    def _eligible_cells(self, clearance: float) -> np.ndarray:
+        """
+        返回间隙可能不小于 clearance 的候选单元格编号（展平后）
+        
+        候选列表按等级缓存并随 mark_occupied 增量维护：其中可能含有已失效的单元格，
+        失效数量超过一半时按当前间隙压缩。失效单元格必然被 sample 的 Lipschitz 判定剔除。
+        调用方需持有 self._lock。
+        """
+        level = self._level(clearance)
+        cells = self._eligible_cache.get(level)
+        if cells is None:
+            cells = np.flatnonzero(self._free.ravel() >= self._threshold(level))
+            self._stale[level] = 0
+            self._eligible_cache[level] = cells
+        elif self._stale[level] * 2 > cells.size:
+            cells = cells[self._free.ravel()[cells] >= self._threshold(level)]
+            self._stale[level] = 0
+            self._eligible_cache[level] = cells
+        return cells
+    
+    def _eligible_count(self, clearance: float) -> int:
+        """
+        间隙可能不小于 clearance 的单元格数（不含已失效的候选），调用方需持有 self._lock
+        """
+        cells = self._eligible_cells(clearance)
+        return cells.size - self._stale[self._level(clearance)]
+    
+    def sample(self, clearance: float = 0.0, max_tries: int = 16) -> Optional[Tuple[float, float]]:
+        """
+        采样一个可能容纳给定间隙的中心点
+        
+        先按单元格筛选，再对单元格内的随机点用间隙场的 1-Lipschitz 上界
+        （单元格中心间隙 + 到中心的距离）剔除必然不可行的点，被剔除的点无需碰撞检测。
+        
+        Args:
+            clearance: 候选中心周围至少需要的空隙（中心间隙半径 + ITZ + 最小间距）
+            max_tries: 单次调用的最大抽样次数
+        
+        Returns:
+            Optional[Tuple[float, float]]: 中心点，没有可行单元格或抽样均被剔除时返回None
+        """
+        with self._lock:
+            if self._eligible_count(clearance) == 0:
+                return None
+            cells = self._eligible_cells(clearance)
+            
+            free = self._free.ravel()
+            min_x, min_y, max_x, max_y = self.bounds
+            for _ in range(max_tries):
+                cell = int(cells[random.randrange(cells.size)])
+                iy, ix = divmod(cell, self.nx)
+                dx = random.random() - 0.5
+                dy = random.random() - 0.5
+                x = self._xs[ix] + dx * self.cell_size
+                y = self._ys[iy] + dy * self.cell_size
+                if x > max_x or y > max_y:
+                    continue
+                if free[cell] < self._cap and free[cell] + math.hypot(dx, dy) * self.cell_size < clearance:
+                    continue
+                return (float(x), float(y))
+            return None
+    
+    def free_fraction(self, clearance: float = 0.0) -> float:
+        """
+        估计仍可能容纳给定间隙的单元格比例
+        """
+        with self._lock:
+            return self._eligible_count(clearance) / self._free.size
+    
+    def clear(self) -> None:
+        """
+        重置为完全空闲
+        """
+        with self._lock:
+            self._free.fill(self._cap)
+            self._eligible_cache = {}
+            self._stale = {}
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取采样器统计信息
+        
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        return {
+            'cell_size': self.cell_size,
+            'grid_shape': (self.ny, self.nx),
+            'free_fraction': self.free_fraction(0.0)
+        }
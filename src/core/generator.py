@@ -5,21 +5,30 @@ import time
 import math
 import logging
 import threading
+from collections import deque
 from typing import List, Tuple, Dict, Any, Optional, Union, Callable
 from concurrent.futures import ThreadPoolExecutor, as_completed
 
-from .shapes import generate_random_polygon, generate_circle, generate_ellipse
-from .collision import check_collision_hierarchical, gpu_calculator
+from .shapes import generate_shape_from_config, generate_shape_batch_from_config
+from .collision import (
+    check_collision_hierarchical, check_aggregate_collision, make_primitive, gpu_calculator,
+    bbox_candidate_indices
+)
 from .group_manager import GroupManager
+from .aggregate_store import AggregateStore
+from .free_space import FreeSpaceSampler
+from .densification import GravityDensifier
+from .relaxation import MonteCarloRelaxer
+from .checkpoint import save_checkpoint, load_checkpoint
+from .parallel_engine import ProcessCandidateEngine, unpack_candidate_batch, pack_aggregates, plan_tiles
 from .quadtree import Quadtree
+from .array_quadtree import ArrayQuadtree
 from .kd_tree import KDTree
-from .spatial_index import SpatialIndex
+from .strtree_index import STRtreeIndex
+from .grid_index import GridIndex
+from .spatial_index import SpatialIndex, get_object_bounds
 from .cad_connection import CADConnection, ConnectionState
-from ..utils import (
-    calculate_polygon_area, calculate_circle_area, calculate_ellipse_area,
-    calculate_bounding_circle, is_near_boundary, move_toward_boundary,
-    adjust_points_to_boundary
-)
+from ..utils import adjust_aggregate_to_boundary
 from ..configs.config import (
     SpecimenType, CADColorMap, DEFAULT_SPECIMEN_TYPE,
     DEFAULT_CIRCLE_DIAMETER, DEFAULT_ITERATION_LIMIT
@@ -48,8 +57,8 @@ class RandomAggregateGenerator:
     - 支持多种骨料形状（多边形、圆形、椭圆形）
     - 支持多组粒径配置
     - 支持ITZ（界面过渡区）生成
-    - 支持空间索引优化（四叉树/KD树）
-    - 支持并行计算和GPU加速
+    - 支持空间索引优化（四叉树/KD树/STR树/均匀网格）
+    - 支持并行计算（线程池/进程池）和GPU加速
     - 支持AutoCAD集成
     """
     
@@ -64,8 +73,9 @@ class RandomAggregateGenerator:
         self.cad_connection = CADConnection(auto_start=auto_start, cad_type=cad_type)
         
         self.generation_mode: str = "count"
+        self.placement_strategy: str = "progress"
         self.target_porosity: float = 0.0
-        self.generated_aggregates: List[Dict[str, Any]] = []
+        self.generated_aggregates = AggregateStore()
         self.groups = GroupManager()
         self.itz_layers: List[Any] = []
         self.start_time: float = 0.0
@@ -94,8 +104,32 @@ class RandomAggregateGenerator:
         
         self.executor: Optional[ThreadPoolExecutor] = None
         self.max_workers: int = 4
+        self.parallel_backend: str = "thread"
+        self.process_workers: Optional[int] = None
+        self.process_batch_size: int = 64
         self._state_lock = threading.Lock()  # 保护共享状态的线程锁
         
+        self.candidate_pool_size: int = 256  # 每种形状一次预生成的候选形状数
+        self._shape_pools: Dict[Tuple[int, int], deque] = {}
+        self._shape_pool_lock = threading.Lock()
+        
+        self.use_free_space_sampling: bool = True
+        self.free_space_sampler: Optional[FreeSpaceSampler] = None
+        
+        self.densification_rounds: int = 0
+        self.densification_direction: str = "down"
+        self.relaxation_phases: int = 0
+        self.relaxation_moves: int = 5
+        self._relaxation_phases_used: int = 0
+        self._run_start_index: int = 0
+        self._rounds_completed: int = 0
+        
+        self.checkpoint_path: Optional[str] = None
+        self.checkpoint_interval: float = 300.0
+        self._last_checkpoint_time: float = 0.0
+        self._checkpoint_run: Optional[Dict[str, Any]] = None
+        self._resume_state: Optional[Dict[str, Any]] = None
+        
         self.use_gpu: bool = False
         self.cuda_available: bool = gpu_calculator.cuda_available
         
@@ -146,14 +180,100 @@ class RandomAggregateGenerator:
         设置空间划分算法
         
         Args:
-            method: 空间划分算法，可选值: quadtree, kdtree
+            method: 空间划分算法，可选值: quadtree, loose_quadtree, array_quadtree, kdtree, strtree, grid
         """
-        if method in ["quadtree", "kdtree"]:
+        if method in ["quadtree", "loose_quadtree", "array_quadtree", "kdtree", "strtree", "grid"]:
             self.space_partitioning = method
             logging.info(f"已设置空间划分算法: {method}")
         else:
             logging.warning(f"未知的空间划分算法: {method}，将使用默认值 quadtree")
     
+    def set_parallel_backend(self, backend: str, max_workers: Optional[int] = None,
+                             batch_size: int = 64) -> None:
+        """
+        设置候选骨料的并行生成方式
+        
+        Args:
+            backend: 并行方式，可选值: thread（线程池）, process（进程池，绕过 GIL）,
+                tiled（分块并行填充后由进程池补齐）
+            max_workers: 进程池工作进程数，默认使用全部 CPU 核心
+            batch_size: 进程池每个任务生成的候选数
+        """
+        if backend not in ["thread", "process", "tiled"]:
+            raise ValueError(f"无效的并行方式: {backend}，必须是 'thread'、'process' 或 'tiled'")
+        self.parallel_backend = backend
+        self.process_workers = max_workers
+        self.process_batch_size = max(1, batch_size)
+        logging.info(f"已设置并行方式: {backend}")
+    
+    def set_free_space_sampling(self, enabled: bool) -> None:
+        """
+        设置是否使用空隙感知采样
+        
+        启用后候选中心只从仍能容纳该候选形状的区域中抽取，接近堆积极限时
+        可大幅减少无效尝试；关闭时在整个区域内均匀采样。
+        
+        Args:
+            enabled: 是否启用
+        """
+        self.use_free_space_sampling = enabled
+        logging.info(f"空隙感知采样: {'启用' if enabled else '禁用'}")
+    
+    def set_densification(self, rounds: int, direction: str = "down") -> None:
+        """
+        设置重力沉降密实化
+        
+        每轮投放结束后将本次生成的骨料沿沉降方向推实，腾出的空间由下一轮投放继续填充，
+        用于突破随机顺序投放约 50%~55% 的面积占比上限。
+        
+        Args:
+            rounds: 密实化轮数，0 表示不密实化
+            direction: 沉降方向，可选值："down"（向下）、"inward"（指向区域中心）
+        """
+        if rounds < 0:
+            raise ValueError("密实化轮数不能为负数")
+        if direction not in GravityDensifier.DIRECTIONS:
+            raise ValueError(f"无效的沉降方向: {direction}，必须是 'down' 或 'inward'")
+        self.densification_rounds = rounds
+        self.densification_direction = direction
+        logging.info(f"密实化: {rounds} 轮，沉降方向 {direction}")
+    
+    def set_relaxation(self, phases: int, moves_per_aggregate: int = 5) -> None:
+        """
+        设置蒙特卡洛松弛
+        
+        投放连续失败达到上限时，不立即停止，而是对本次生成的骨料做一次随机游走松弛，
+        再继续投放，最多 phases 次。
+        
+        Args:
+            phases: 每次生成最多执行的松弛次数，0 表示不松弛
+            moves_per_aggregate: 每次松弛中平均每个骨料的扰动尝试次数
+        """
+        if phases < 0 or moves_per_aggregate < 1:
+            raise ValueError("松弛次数不能为负数，每个骨料的扰动次数至少为1")
+        self.relaxation_phases = phases
+        self.relaxation_moves = moves_per_aggregate
+        logging.info(f"蒙特卡洛松弛: 最多 {phases} 次，每个骨料 {moves_per_aggregate} 次扰动")
+    
+    def set_checkpoint(self, filename: Optional[str], interval: float = 300.0) -> None:
+        """
+        设置生成检查点
+        
+        生成过程中每隔 interval 秒（在接受新骨料时检查）以及每轮密实化后和生成结束时，
+        把已接受的骨料、组进度和随机数状态写入检查点文件，进程意外退出后可用
+        resume_from_checkpoint 继续生成。
+        
+        Args:
+            filename: 检查点文件路径，为None时不写检查点
+            interval: 两次检查点之间的最短间隔（秒）
+        """
+        if interval <= 0:
+            raise ValueError("检查点间隔必须大于0")
+        self.checkpoint_path = filename
+        self.checkpoint_interval = interval
+        if filename:
+            logging.info(f"检查点: {filename}，间隔 {interval:.0f} 秒")
+    
     def set_use_gpu(self, use_gpu: bool) -> None:
         """
         设置是否使用GPU加速
@@ -242,6 +362,19 @@ class RandomAggregateGenerator:
             raise ValueError(f"无效的生成模式: {mode}，必须是 'count' 或 'porosity'")
         self.generation_mode = mode
 
+    def set_placement_strategy(self, strategy: str) -> None:
+        """
+        设置颗粒放置顺序
+        
+        Args:
+            strategy: 放置策略，可选值："progress"（每次选择进度最低的组）、
+                "take_and_place"（预抽样全部颗粒，按尺寸从大到小依次放置）
+        """
+        if strategy not in ["progress", "take_and_place"]:
+            raise ValueError(f"无效的放置策略: {strategy}，必须是 'progress' 或 'take_and_place'")
+        self.placement_strategy = strategy
+        logging.info(f"已设置放置策略: {strategy}")
+    
     def set_target_porosity(self, porosity: float) -> None:
         """
         设置目标孔隙度
@@ -297,6 +430,7 @@ class RandomAggregateGenerator:
             int: 生成的骨料数量
         """
         try:
+            resume, self._resume_state = self._resume_state, None
             min_x, min_y = region_min
             max_x, max_y = region_max
             if min_x >= max_x or min_y >= max_y:
@@ -305,6 +439,7 @@ class RandomAggregateGenerator:
             self.start_time = time.time()
             self.total_area = 0.0
             self.generation_canceled = False
+            self.free_space_sampler = None
             
             region_width = max_x - min_x
             region_height = max_y - min_y
@@ -333,19 +468,43 @@ class RandomAggregateGenerator:
             if self.space_partitioning == "kdtree":
                 self.spatial_index = KDTree(spatial_bounds, max_depth=dynamic_max_depth, max_objects=dynamic_max_objects)
                 logging.info("使用KD树作为空间索引")
+            elif self.space_partitioning == "strtree":
+                self.spatial_index = STRtreeIndex(spatial_bounds, node_capacity=dynamic_max_objects)
+                logging.info("使用STR树作为空间索引")
+            elif self.space_partitioning == "array_quadtree":
+                self.spatial_index = ArrayQuadtree(spatial_bounds, max_depth=dynamic_max_depth, max_objects=dynamic_max_objects)
+                logging.info("使用数组化四叉树作为空间索引")
+            elif self.space_partitioning == "loose_quadtree":
+                self.spatial_index = Quadtree(spatial_bounds, max_depth=dynamic_max_depth, max_objects=dynamic_max_objects,
+                                              loose=True)
+                logging.info("使用松散四叉树作为空间索引")
+            elif self.space_partitioning == "grid":
+                # 单元格约为最大颗粒直径（含ITZ），单个颗粒查询只涉及 3×3 邻域
+                max_itz = max((g.get('itz_thickness', 0.0) for g in self.groups.get_config()), default=0.0)
+                cell_size = 2 * (max_possible_radius + max_itz) + min_distance
+                self.spatial_index = GridIndex(spatial_bounds, cell_size=max(cell_size, 1e-6))
+                logging.info(f"使用均匀网格作为空间索引，单元格尺寸: {cell_size:.2f}")
             else:
                 self.spatial_index = Quadtree(spatial_bounds, max_depth=dynamic_max_depth, max_objects=dynamic_max_objects)
                 logging.info("使用四叉树作为空间索引")
             
-            generated_count = 0
-            total_attempts = 0
-            last_update_time = time.time()
-            last_success_time = time.time()
-            consecutive_failures = 0
-            MAX_CONSECUTIVE_FAILURES = 500
-            STALL_TIMEOUT = 60  # 60秒内无成功生成则视为停滞
+            if self.generated_aggregates:
+                # 已有骨料（未清除的上一轮结果）一次性批量装载到新索引
+                store = self.generated_aggregates
+                self.spatial_index.insert_batch([store.record(i, store.primitive(i)) for i in range(len(store))])
+                logging.info(f"已批量装载 {len(store)} 个已有骨料到空间索引")
+            
+            if self.use_gpu:
+                # 已有骨料边界一次上传到常驻缓冲区，之后每接受一个骨料只追加一行
+                gpu_calculator.reset_bounds(max(1024, len(self.generated_aggregates)))
+                gpu_calculator.extend_bounds(self.generated_aggregates.bounds)
             
-            self._initialize_group_targets()
+            if resume is None:
+                self._initialize_group_targets()
+                if self.generated_aggregates:
+                    self._seed_progress_from_store()
+            else:
+                self._restore_group_progress(resume)
             
             target_total_area = 0.0
             if self.generation_mode == "porosity":
@@ -354,42 +513,339 @@ class RandomAggregateGenerator:
             
             self.allow_touching = allow_touching
             
-            base_parallelism = self.max_workers
-            dynamic_parallelism = max(2, min(8, int(base_parallelism * (1 + (5.0 / avg_particle_size)))))
+            region = (min_x, min_y, max_x, max_y)
+            use_process_pool = self.parallel_backend in ("process", "tiled") and self.placement_strategy == "progress"
+            
+            if self.use_free_space_sampling and SHAPELY_AVAILABLE and not use_process_pool:
+                max_itz = max((g.get('itz_thickness', 0.0) for g in self.groups.get_config()), default=0.0)
+                buffer = max_possible_radius * 0.5
+                cell_size = max(max_possible_radius / 12.0, max(region_width, region_height) / 1024.0, 1e-6)
+                self.free_space_sampler = FreeSpaceSampler(
+                    (min_x + buffer, min_y + buffer, max_x - buffer, max_y - buffer),
+                    cell_size, max_possible_radius + max_itz + min_distance
+                )
+                logging.info(f"空隙感知采样栅格: {self.free_space_sampler.nx}×{self.free_space_sampler.ny}，单元格尺寸: {cell_size:.2f}")
+                if self.generated_aggregates:
+                    self._mark_store_occupied()
             
-            self.executor = ThreadPoolExecutor(max_workers=12)  # 固定最大值，通过任务数控制实际并行度
-            logging.info(f"创建线程池，初始并行度: {dynamic_parallelism}")
+            self._checkpoint_run = {
+                'region': list(region),
+                'min_distance': min_distance,
+                'max_attempts': max_attempts,
+                'boundary_adjust': boundary_adjust,
+                'allow_touching': allow_touching
+            }
+            self._last_checkpoint_time = time.time()
             
-            self.last_parallelism_adjustment = time.time()
-            self.parallelism_adjustment_interval = 5.0
-            self.successful_generations_in_interval = 0
-            self.attempts_in_interval = 0
+            # 密实化和松弛会移动已放置的骨料，绘图推迟到全部轮次结束后统一发送
+            if resume is None:
+                first_index = len(self.generated_aggregates)
+                self._relaxation_phases_used = 0
+                self._rounds_completed = 0
+            else:
+                first_index = resume['run_start_index']
+                self._relaxation_phases_used = resume['relaxation_phases_used']
+                self._rounds_completed = resume['rounds_completed']
+            self._run_start_index = first_index
+            start_round = self._rounds_completed
+            moves_aggregates = self.densification_rounds > 0 or self.relaxation_phases > 0
+            round_draw_callback = None if moves_aggregates else draw_callback
+            # 从检查点恢复的骨料在本次会话中尚未绘制
+            draw_start = first_index if resume is None else 0
+            
+            if resume is not None:
+                random.setstate(resume['rng_state'])
+                if round_draw_callback is not None:
+                    self._draw_from_store(0, round_draw_callback)
+            
+            self._run_insertion_round(region, max_possible_radius, min_distance, max_attempts,
+                                      boundary_adjust, target_total_area, progress_callback,
+                                      round_draw_callback, use_process_pool, first_round=start_round == 0)
+            
+            for round_index in range(start_round, self.densification_rounds):
+                if self.generation_canceled or self._check_exit_conditions(target_total_area, max_attempts):
+                    break
+                logging.info(f"密实化轮次 {round_index + 1}/{self.densification_rounds}")
+                self._densify(region, min_distance, first_index)
+                self._rounds_completed = round_index + 1
+                if self.checkpoint_path:
+                    with self._state_lock:
+                        self._write_checkpoint()
+                if progress_callback is not None:
+                    progress_callback("progress", len(self.generated_aggregates) - first_index,
+                                      self.total_area, self.calculate_porosity())
+                self._run_insertion_round(region, max_possible_radius, min_distance, max_attempts,
+                                          boundary_adjust, target_total_area, progress_callback,
+                                          round_draw_callback, use_process_pool, first_round=False)
             
+            if draw_callback and round_draw_callback is None:
+                self._draw_from_store(draw_start, draw_callback)
+            
+            if self.checkpoint_path:
+                with self._state_lock:
+                    self._write_checkpoint()
+            
+
+        except Exception as e:
+            logging.error(f"生成错误：{str(e)}", exc_info=True)
+            raise
+        finally:
+            self.end_time = time.time()
+            logging.info(f"生成完成，耗时: {self.end_time - self.start_time:.2f}秒")
+        
+        return len(self.generated_aggregates)
+    
+    def _run_insertion_round(self, region: Tuple[float, float, float, float],
+                             max_possible_radius: float,
+                             min_distance: float,
+                             max_attempts: int,
+                             boundary_adjust: bool,
+                             target_total_area: float,
+                             progress_callback: Optional[Callable],
+                             draw_callback: Optional[Callable],
+                             use_process_pool: bool,
+                             first_round: bool) -> None:
+        """
+        按放置策略和并行方式执行一轮投放
+        
+        分块并行填充只用于第一轮，之后的轮次（密实化后）由进程池补齐。
+        """
+        if use_process_pool:
+            if self.parallel_backend == "tiled" and first_round:
+                self._generate_with_tiles(
+                    region, max_possible_radius, min_distance,
+                    max_attempts, boundary_adjust, target_total_area,
+                    progress_callback, draw_callback
+                )
+            self._generate_with_process_pool(
+                region, max_possible_radius, min_distance,
+                max_attempts, boundary_adjust, target_total_area,
+                progress_callback, draw_callback
+            )
+        elif self.placement_strategy == "take_and_place":
+            self._generate_take_and_place(
+                region, max_possible_radius, min_distance,
+                max_attempts, boundary_adjust, target_total_area,
+                progress_callback, draw_callback
+            )
+        else:
+            self._generate_with_thread_pool(
+                region, max_possible_radius, min_distance,
+                max_attempts, boundary_adjust, target_total_area,
+                progress_callback, draw_callback
+            )
+    
+    def _generate_with_thread_pool(self, region: Tuple[float, float, float, float],
+                                   max_possible_radius: float,
+                                   min_distance: float,
+                                   max_attempts: int,
+                                   boundary_adjust: bool,
+                                   target_total_area: float,
+                                   progress_callback: Optional[Callable],
+                                   draw_callback: Optional[Callable]) -> None:
+        """
+        线程池生成循环
+        
+        每次选择进度最低的组，并行提交多个候选尝试，按最新状态复查后接受第一个
+        无冲突的候选；并行度按成功率自适应调整。
+        """
+        min_x, min_y, max_x, max_y = region
+        avg_particle_size = max_possible_radius / 2.0
+        generated_count = 0
+        total_attempts = 0
+        last_update_time = time.time()
+        last_success_time = time.time()
+        consecutive_failures = 0
+        MAX_CONSECUTIVE_FAILURES = 500
+        STALL_TIMEOUT = 60  # 60秒内无成功生成则视为停滞
+        
+        base_parallelism = self.max_workers
+        dynamic_parallelism = max(2, min(8, int(base_parallelism * (1 + (5.0 / avg_particle_size)))))
+        
+        self.executor = ThreadPoolExecutor(max_workers=12)  # 固定最大值，通过任务数控制实际并行度
+        logging.info(f"创建线程池，初始并行度: {dynamic_parallelism}")
+        
+        self.last_parallelism_adjustment = time.time()
+        self.parallelism_adjustment_interval = 5.0
+        self.successful_generations_in_interval = 0
+        self.attempts_in_interval = 0
+        
+        while True:
+            if self.generation_canceled:
+                if progress_callback:
+                    progress_callback("info", 0, 0.0, 0.0)
+                # 同时尝试发送文本消息到 CAD
+                if self.cad_connection.is_connected:
+                    try:
+                        self.cad_connection.prompt("生成过程已被用户取消\n")
+                    except Exception:
+                        pass
+                break
+            
+            if self._check_exit_conditions(target_total_area, max_attempts):
+                break
+            
+            # 停滞检测：连续失败或长时间无进展（可松弛时先松弛再继续）
+            if consecutive_failures >= MAX_CONSECUTIVE_FAILURES and self._relax_after_stall(region, min_distance):
+                consecutive_failures = 0
+                last_success_time = time.time()
+                continue
+            
+            if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
+                logging.warning(f"连续 {consecutive_failures} 次失败，生成空间可能已满，停止生成")
+                if progress_callback:
+                    progress_callback("info", 0, 0.0, 0.0)
+                if self.cad_connection.is_connected:
+                    try:
+                        self.cad_connection.prompt("空间已满，生成停止\n")
+                    except Exception:
+                        pass
+                break
+            
+            if generated_count > 0 and time.time() - last_success_time > STALL_TIMEOUT:
+                logging.warning(f"超过 {STALL_TIMEOUT}s 无成功生成，停止生成")
+                if progress_callback:
+                    progress_callback("info", 0, 0.0, 0.0)
+                break
+            
+            current_time = time.time()
+            if current_time - last_update_time > 0.5 and progress_callback is not None:
+                progress_callback("progress", generated_count, self.total_area, self.calculate_porosity())
+                last_update_time = current_time
+            
+            chosen_group = self.groups.select_next_group(self.generation_mode)
+            if not chosen_group:
+                break
+            
+            if self.generation_mode == "porosity" and target_total_area > 0:
+                progress_ratio = min(1.0, self.total_area / target_total_area)
+            else:
+                progress_ratio = self.groups.mean_progress()
+            
+            base_attempts = dynamic_parallelism * 2
+            dynamic_attempts = max(2, int(base_attempts * (1 - progress_ratio * 0.7)))
+            
+            futures = []
+            
+            for _ in range(dynamic_attempts):
+                future = self.executor.submit(
+                    self._parallel_generate_attempt,
+                    chosen_group, min_x, min_y, max_x, max_y, max_possible_radius,
+                    min_distance, boundary_adjust
+                )
+                futures.append(future)
+            
+            agg_data = None
+            timeout = 5.0
+            
+            for future in as_completed(futures, timeout=timeout):
+                try:
+                    result = future.result(timeout=timeout)
+                    if result is not None:
+                        # 并行尝试之间可能相互冲突，接受前按最新状态复查
+                        collision = self._check_candidate_collision(result, min_distance)
+                        
+                        if not collision:
+                            agg_data = result
+                            for f in futures:
+                                if not f.done():
+                                    f.cancel()
+                            break
+                except Exception as e:
+                    logging.warning(f"并行任务处理异常: {str(e)}")
+                    continue
+            
+            if agg_data:
+                generated_count += 1
+                total_attempts = 0
+                consecutive_failures = 0
+                last_success_time = time.time()
+                self.successful_generations_in_interval += 1
+                self.attempts_in_interval += 1
+                
+                self._add_aggregate_to_spatial_index_and_collections(agg_data)
+                
+                if draw_callback:
+                    self._send_draw_command(agg_data, chosen_group, draw_callback)
+                
+                if generated_count % 10 == 0 and time.time() - self.last_progress_time > 1.0:
+                    if draw_callback:
+                        draw_callback('regen',)
+                    self.last_progress_time = time.time()
+            else:
+                total_attempts += 1
+                consecutive_failures += 1
+                self.attempts_in_interval += 1
+            
+            current_time = time.time()
+            if current_time - self.last_parallelism_adjustment > self.parallelism_adjustment_interval:
+                if self.attempts_in_interval > 0:
+                    success_rate = self.successful_generations_in_interval / self.attempts_in_interval
+                    
+                    if success_rate > 0.7:
+                        new_parallelism = min(12, dynamic_parallelism + 1)
+                    elif success_rate < 0.3:
+                        new_parallelism = max(2, dynamic_parallelism - 1)
+                    else:
+                        new_parallelism = dynamic_parallelism
+                    
+                    if new_parallelism != dynamic_parallelism:
+                        dynamic_parallelism = new_parallelism
+                        logging.info(f"自适应调整并行度: {dynamic_parallelism}, 成功率: {success_rate:.2f}")
+                
+                self.successful_generations_in_interval = 0
+                self.attempts_in_interval = 0
+                self.last_parallelism_adjustment = current_time
+        
+        if self.executor:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+            logging.info("线程池已关闭")
+
+    def _generate_with_process_pool(self, region: Tuple[float, float, float, float],
+                                    max_possible_radius: float,
+                                    min_distance: float,
+                                    max_attempts: int,
+                                    boundary_adjust: bool,
+                                    target_total_area: float,
+                                    progress_callback: Optional[Callable],
+                                    draw_callback: Optional[Callable]) -> None:
+        """
+        多进程生成循环
+        
+        工作进程持续产出预校验过的候选批次，主进程按批次顺序逐个
+        对照空间索引做最终接受判定，保证结果无重叠。
+        """
+        MAX_CONSECUTIVE_FAILURES = 500
+        STALL_TIMEOUT = 60
+        
+        engine = ProcessCandidateEngine(self.process_workers, self.process_batch_size)
+        pending = deque()
+        generated_count = 0
+        consecutive_failures = 0
+        last_update_time = time.time()
+        last_success_time = time.time()
+        groups_by_id = {g['id']: g for g in self.groups.get_config()}
+        
+        with engine:
             while True:
                 if self.generation_canceled:
                     if progress_callback:
                         progress_callback("info", 0, 0.0, 0.0)
-                    # 同时尝试发送文本消息到 CAD
-                    if self.cad_connection.is_connected:
-                        try:
-                            self.cad_connection.prompt("生成过程已被用户取消\n")
-                        except Exception:
-                            pass
                     break
-
+                
                 if self._check_exit_conditions(target_total_area, max_attempts):
                     break
                 
-                # 停滞检测：连续失败或长时间无进展
+                if consecutive_failures >= MAX_CONSECUTIVE_FAILURES and self._relax_after_stall(region, min_distance):
+                    consecutive_failures = 0
+                    last_success_time = time.time()
+                    continue
+                
                 if consecutive_failures >= MAX_CONSECUTIVE_FAILURES:
-                    logging.warning(f"连续 {consecutive_failures} 次失败，生成空间可能已满，停止生成")
+                    logging.warning(f"连续 {consecutive_failures} 个候选批次全部失败，生成空间可能已满，停止生成")
                     if progress_callback:
                         progress_callback("info", 0, 0.0, 0.0)
-                    if self.cad_connection.is_connected:
-                        try:
-                            self.cad_connection.prompt("空间已满，生成停止\n")
-                        except Exception:
-                            pass
                     break
                 
                 if generated_count > 0 and time.time() - last_success_time > STALL_TIMEOUT:
@@ -397,125 +853,418 @@ class RandomAggregateGenerator:
                     if progress_callback:
                         progress_callback("info", 0, 0.0, 0.0)
                     break
-
+                
                 current_time = time.time()
                 if current_time - last_update_time > 0.5 and progress_callback is not None:
                     progress_callback("progress", generated_count, self.total_area, self.calculate_porosity())
                     last_update_time = current_time
-
-                chosen_group = self.groups.select_next_group(self.generation_mode)
-                if not chosen_group:
-                    break
-
-                if self.generation_mode == "porosity" and target_total_area > 0:
-                    progress_ratio = min(1.0, self.total_area / target_total_area)
-                else:
-                    group_progress = []
-                    for group in self.groups.get_config():
-                        if group['target_area'] > 0:
-                            group_progress.append(min(1.0, group['generated_area'] / group['target_area']))
-                    progress_ratio = sum(group_progress) / len(group_progress) if group_progress else 0
-                
-                base_attempts = dynamic_parallelism * 2
-                dynamic_attempts = max(2, int(base_attempts * (1 - progress_ratio * 0.7)))
                 
-                futures = []
-                
-                for _ in range(dynamic_attempts):
-                    future = self.executor.submit(
-                        self._parallel_generate_attempt,
-                        chosen_group, min_x, min_y, max_x, max_y, max_possible_radius,
-                        min_distance, boundary_adjust
-                    )
-                    futures.append(future)
+                while len(pending) < engine.max_in_flight:
+                    chosen_group = self.groups.select_next_group(self.generation_mode)
+                    if not chosen_group:
+                        break
+                    pending.append(engine.submit(chosen_group, region, max_possible_radius,
+                                                 min_distance, boundary_adjust))
+                if not pending:
+                    break
                 
-                agg_data = None
-                timeout = 5.0
+                try:
+                    batch = pending.popleft().result()
+                except Exception as e:
+                    logging.warning(f"候选批次生成失败: {str(e)}")
+                    consecutive_failures += 1
+                    continue
                 
-                for future in as_completed(futures, timeout=timeout):
-                    try:
-                        result = future.result(timeout=timeout)
-                        if result is not None:
-                            # 空间索引可用时跳过全量列表构建，让 quadtree 自行过滤
-                            if self.spatial_index:
-                                all_existing_objects = []
-                            else:
-                                all_existing_objects = []
-                                for g in self.groups.get_config():
-                                    all_existing_objects.extend(g['shapes_and_itz'])
-                            
-                            collision = check_collision_hierarchical(
-                                result['shapely_obj'], result['shapely_itz'], 
-                                all_existing_objects, min_distance, self.spatial_index, self.use_gpu,
-                                self.allow_touching
-                            )
-                            
-                            if not collision:
-                                agg_data = result
-                                for f in futures:
-                                    if not f.done():
-                                        f.cancel()
-                                break
-                    except Exception as e:
-                        logging.warning(f"并行任务处理异常: {str(e)}")
+                accepted_in_batch = 0
+                for agg_data in unpack_candidate_batch(batch):
+                    group = groups_by_id[agg_data["group_id"]]
+                    if group['count'] >= group['max_count']:
+                        break
+                    if self._check_exit_conditions(target_total_area, max_attempts):
+                        break
+                    if self._check_candidate_collision(agg_data, min_distance):
                         continue
-                
-                if agg_data:
-                    generated_count += 1
-                    total_attempts = 0
-                    consecutive_failures = 0
-                    last_success_time = time.time()
-                    self.successful_generations_in_interval += 1
-                    self.attempts_in_interval += 1
                     
                     self._add_aggregate_to_spatial_index_and_collections(agg_data)
+                    generated_count += 1
+                    accepted_in_batch += 1
                     
                     if draw_callback:
-                        self._send_draw_command(agg_data, chosen_group, draw_callback)
-                        
-                    if generated_count % 10 == 0 and time.time() - self.last_progress_time > 1.0:
-                        if draw_callback:
+                        self._send_draw_command(agg_data, group, draw_callback)
+                        if generated_count % 10 == 0 and time.time() - self.last_progress_time > 1.0:
                             draw_callback('regen',)
-                        self.last_progress_time = time.time()
+                            self.last_progress_time = time.time()
+                
+                if accepted_in_batch:
+                    consecutive_failures = 0
+                    last_success_time = time.time()
                 else:
-                    total_attempts += 1
                     consecutive_failures += 1
-                    self.attempts_in_interval += 1
+    
+    def _generate_with_tiles(self, region: Tuple[float, float, float, float],
+                             max_possible_radius: float,
+                             min_distance: float,
+                             max_attempts: int,
+                             boundary_adjust: bool,
+                             target_total_area: float,
+                             progress_callback: Optional[Callable],
+                             draw_callback: Optional[Callable]) -> None:
+        """
+        分块并行填充
+        
+        区域按 2×2 奇偶性划分为4个相位的分块，同一相位的分块由工作进程各自独立填充。
+        每个分块任务携带光晕区（最大半径 + ITZ + 最小间距）内先前相位已接受的骨料；
+        合并时只有落在光晕带内的骨料需要对照全局索引复核，分块内部的骨料直接接受。
+        未达到的目标由随后的进程池循环补齐。
+        """
+        MAX_TILE_FAILURES = 500
+        
+        max_itz = max((g.get('itz_thickness', 0.0) for g in self.groups.get_config()), default=0.0)
+        halo = max_possible_radius + max_itz + min_distance
+        engine = ProcessCandidateEngine(self.process_workers, self.process_batch_size)
+        tiles = plan_tiles(region, halo, 4 * engine.max_workers)
+        region_area = (region[2] - region[0]) * (region[3] - region[1])
+        groups_by_id = {g['id']: g for g in self.groups.get_config()}
+        logging.info(f"分块并行填充: {len(tiles)} 个分块，光晕宽度 {halo:.2f}")
+        
+        generated_count = 0
+        halo_rejected = 0
+        with engine:
+            for phase in range(4):
+                if self.generation_canceled or self._check_exit_conditions(target_total_area, max_attempts):
+                    break
                 
-                current_time = time.time()
-                if current_time - self.last_parallelism_adjustment > self.parallelism_adjustment_interval:
-                    if self.attempts_in_interval > 0:
-                        success_rate = self.successful_generations_in_interval / self.attempts_in_interval
-                        
-                        if success_rate > 0.7:
-                            new_parallelism = min(12, dynamic_parallelism + 1)
-                        elif success_rate < 0.3:
-                            new_parallelism = max(2, dynamic_parallelism - 1)
-                        else:
-                            new_parallelism = dynamic_parallelism
-                        
-                        if new_parallelism != dynamic_parallelism:
-                            dynamic_parallelism = new_parallelism
-                            logging.info(f"自适应调整并行度: {dynamic_parallelism}, 成功率: {success_rate:.2f}")
+                futures = []
+                for tile, tile_phase in tiles:
+                    if tile_phase != phase:
+                        continue
+                    fraction = (tile[2] - tile[0]) * (tile[3] - tile[1]) / region_area
+                    halo_bounds = (tile[0] - halo, tile[1] - halo, tile[2] + halo, tile[3] + halo)
+                    task = {
+                        "tile": tile,
+                        "region": region,
+                        "existing": pack_aggregates(self.spatial_index.query_range(halo_bounds)),
+                        "groups": [{
+                            "id": g['id'],
+                            "shapes": g['shapes'],
+                            "itz_thickness": g.get('itz_thickness', 0.0),
+                            "max_count": int(math.ceil(g['max_count'] * fraction)),
+                            "target_area": g['target_area'] * fraction
+                        } for g in self.groups.get_config()],
+                        "target_area": target_total_area * fraction,
+                        "max_possible_radius": max_possible_radius,
+                        "min_distance": min_distance,
+                        "allow_touching": self.allow_touching,
+                        "boundary_adjust": boundary_adjust,
+                        "cell_size": max(2 * (max_possible_radius + max_itz) + min_distance, 1e-6),
+                        "max_failures": MAX_TILE_FAILURES
+                    }
+                    futures.append((tile, engine.submit_tile(task)))
+                
+                for tile, future in futures:
+                    try:
+                        batches = future.result()
+                    except Exception as e:
+                        logging.warning(f"分块填充失败: {str(e)}")
+                        continue
                     
-                    self.successful_generations_in_interval = 0
-                    self.attempts_in_interval = 0
-                    self.last_parallelism_adjustment = current_time
+                    interior = (tile[0] + halo, tile[1] + halo, tile[2] - halo, tile[3] - halo)
+                    for batch in batches:
+                        for agg_data in unpack_candidate_batch(batch):
+                            group = groups_by_id[agg_data["group_id"]]
+                            if group['count'] >= group['max_count']:
+                                break
+                            if self._check_exit_conditions(target_total_area, max_attempts):
+                                break
+                            
+                            min_bx, min_by, max_bx, max_by = get_object_bounds(agg_data)
+                            in_interior = (min_bx >= interior[0] and min_by >= interior[1] and
+                                           max_bx <= interior[2] and max_by <= interior[3])
+                            if not in_interior and self._check_candidate_collision(agg_data, min_distance):
+                                halo_rejected += 1
+                                continue
+                            
+                            self._add_aggregate_to_spatial_index_and_collections(agg_data)
+                            generated_count += 1
+                            if draw_callback:
+                                self._send_draw_command(agg_data, group, draw_callback)
+                
+                if draw_callback:
+                    draw_callback('regen',)
+                if progress_callback is not None:
+                    progress_callback("progress", generated_count, self.total_area, self.calculate_porosity())
+                logging.info(f"分块相位 {phase + 1}/4 完成，累计接受 {generated_count} 个骨料")
+        
+        logging.info(f"分块并行填充结束: 接受 {generated_count} 个，光晕冲突剔除 {halo_rejected} 个")
+    
+    def _generate_take_and_place(self, region: Tuple[float, float, float, float],
+                                 max_possible_radius: float,
+                                 min_distance: float,
+                                 max_attempts: int,
+                                 boundary_adjust: bool,
+                                 target_total_area: float,
+                                 progress_callback: Optional[Callable],
+                                 draw_callback: Optional[Callable]) -> None:
+        """
+        take-and-place 生成循环
+        
+        按组目标预抽样全部颗粒（数量模式抽满各组数量上限，孔隙度模式按面积占比分摊
+        目标总面积），按尺寸从大到小依次放置。每个颗粒最多尝试 max_attempts 个中心，
+        空隙采样已无法容纳该颗粒时立即跳过；大颗粒先在完整空间中落位，不再因空间
+        被细颗粒割碎而在后期反复失败。连续跳过过多颗粒时视为空间已满。总是在主线程中顺序执行。
+        """
+        MAX_CONSECUTIVE_SKIPS = 100
+        
+        min_x, min_y, max_x, max_y = region
+        area_targets = None
+        if self.generation_mode == "porosity" and target_total_area > 0:
+            total_ratio = self.groups.calculate_total_area_ratio()
+            if total_ratio > 0:
+                area_targets = {g['id']: target_total_area * g['area_ratio'] / total_ratio
+                                for g in self.groups.get_config()}
+        
+        queue = self.groups.build_placement_queue(self._sample_group_shape, area_targets)
+        logging.info(f"take-and-place: 预抽样 {len(queue)} 个颗粒")
+        
+        generated_count = 0
+        skipped_count = 0
+        consecutive_skips = 0
+        # 空隙采样已无法容纳的最小中心间隙，不小于它的后续颗粒直接跳过
+        blocked_clearance = math.inf
+        last_update_time = time.time()
+        
+        for group, shape_index, pooled_shape in queue:
+            if self.generation_canceled:
+                if progress_callback:
+                    progress_callback("info", 0, 0.0, 0.0)
+                break
+            if self._check_exit_conditions(target_total_area, max_attempts):
+                break
+            if group['count'] >= group['max_count']:
+                continue
             
-            if self.executor:
-                self.executor.shutdown(wait=True)
-                self.executor = None
-                logging.info("线程池已关闭")
-
+            clearance = pooled_shape[4] + group.get('itz_thickness', 0.0) + min_distance
+            agg_data = None
+            if clearance < blocked_clearance:
+                for _ in range(max_attempts):
+                    center = self._sample_center(group, pooled_shape, min_x, min_y, max_x, max_y,
+                                                 max_possible_radius, min_distance)
+                    if center is None:
+                        # 抽样均被 Lipschitz 上界剔除时仍可能有可行单元格，只算一次失败尝试
+                        if self.free_space_sampler.free_fraction(clearance) == 0:
+                            blocked_clearance = clearance
+                            break
+                        continue
+                    success, agg_data = self._place_shape_at(group, shape_index, pooled_shape, center,
+                                                             min_x, min_y, max_x, max_y,
+                                                             min_distance, boundary_adjust)
+                    if success:
+                        break
+            
+            if not agg_data:
+                skipped_count += 1
+                consecutive_skips += 1
+                if consecutive_skips >= MAX_CONSECUTIVE_SKIPS:
+                    logging.warning(f"连续跳过 {consecutive_skips} 个颗粒，生成空间可能已满，停止生成")
+                    break
+                continue
+            
+            self._add_aggregate_to_spatial_index_and_collections(agg_data)
+            generated_count += 1
+            consecutive_skips = 0
+            if draw_callback:
+                self._send_draw_command(agg_data, group, draw_callback)
+                if generated_count % 10 == 0 and time.time() - self.last_progress_time > 1.0:
+                    draw_callback('regen',)
+                    self.last_progress_time = time.time()
+            
+            current_time = time.time()
+            if current_time - last_update_time > 0.5 and progress_callback is not None:
+                progress_callback("progress", generated_count, self.total_area, self.calculate_porosity())
+                last_update_time = current_time
+        
+        logging.info(f"take-and-place 结束: 放置 {generated_count} 个，跳过 {skipped_count} 个")
+    
+    def _sample_group_shape(self, group: Dict[str, Any]) -> Optional[Tuple[int, Tuple]]:
+        """
+        按形状权重为组抽取一个预生成形状
+        
+        Returns:
+            Optional[Tuple[int, Tuple]]: (形状序号, 形状)，批量生成失败时返回None
+        """
+        weights = [shape['weight'] for shape in group['shapes']]
+        shape_index = random.choices(range(len(weights)), weights=weights, k=1)[0]
+        pooled_shape = self._next_pooled_shape(group, shape_index)
+        return (shape_index, pooled_shape) if pooled_shape else None
+    
+    def _densify(self, region: Tuple[float, float, float, float], min_distance: float,
+                 first_index: int) -> None:
+        """
+        对本次生成的骨料做重力沉降，并按新位置重置空隙栅格和GPU边界缓冲区
+        
+        Args:
+            region: 区域边界
+            min_distance: 最小间距
+            first_index: 本次生成的第一个骨料编号，之前的骨料保持不动
+        """
+        store = self.generated_aggregates
+        densifier = GravityDensifier(store, self.spatial_index, region, min_distance,
+                                     self.allow_touching, self.densification_direction,
+                                     first_index=first_index)
+        with self._state_lock:
+            densifier.settle(cancel_check=lambda: self.generation_canceled)
+            self._refresh_after_moves()
+            
+    def _relax_after_stall(self, region: Tuple[float, float, float, float], min_distance: float) -> bool:
+        """
+        投放停滞时对本次生成的骨料做一次蒙特卡洛松弛
+        
+        Returns:
+            bool: 执行了松弛返回True，松弛次数已用完或没有可移动的骨料时返回False
+        """
+        store = self.generated_aggregates
+        movable = len(store) - self._run_start_index
+        if self._relaxation_phases_used >= self.relaxation_phases or movable <= 0 or self.generation_canceled:
+            return False
+        self._relaxation_phases_used += 1
+        logging.info(f"投放停滞，执行蒙特卡洛松弛 {self._relaxation_phases_used}/{self.relaxation_phases}")
+        relaxer = MonteCarloRelaxer(store, self.spatial_index, region, min_distance,
+                                    self.allow_touching, first_index=self._run_start_index)
+        with self._state_lock:
+            relaxer.relax(self.relaxation_moves * movable, cancel_check=lambda: self.generation_canceled)
+            self._refresh_after_moves()
+        return True
+    
+    def _refresh_after_moves(self) -> None:
+        """
+        已放置骨料移动后，按新位置重置空隙栅格和GPU边界缓冲区（调用方持有状态锁）
+        """
+        store = self.generated_aggregates
+        if self.free_space_sampler is not None:
+            self.free_space_sampler.clear()
+            self._mark_store_occupied()
+        if self.use_gpu:
+            gpu_calculator.reset_bounds(max(1024, len(store)))
+            gpu_calculator.extend_bounds(store.bounds)
+    
+    def _mark_store_occupied(self) -> None:
+        """
+        把存储中全部骨料的占据范围标记到空隙栅格
+        """
+        store = self.generated_aggregates
+        for index in range(len(store)):
+            polygon, itz_polygon = store.geometry(index, cache_result=False)
+            self.free_space_sampler.mark_occupied(itz_polygon if itz_polygon is not None else polygon)
+    
+    def _checkpoint_state(self) -> Dict[str, Any]:
+        """
+        当前生成状态（检查点中除骨料和随机数状态以外的部分）
+        """
+        groups = [{
+            'area_ratio': g['area_ratio'],
+            'itz_thickness': g['itz_thickness'],
+            'max_count': g['max_count'],
+            'layer_color': g['layer_color'],
+            'shapes': g['shapes'],
+            'target_area': g['target_area'],
+            'generated_area': g['generated_area'],
+            'count': g['count']
+        } for g in self.groups.get_config()]
+        return dict(
+            self._checkpoint_run,
+            groups=groups,
+            generation_mode=self.generation_mode,
+            target_porosity=self.target_porosity,
+            placement_strategy=self.placement_strategy,
+            densification_rounds=self.densification_rounds,
+            densification_direction=self.densification_direction,
+            relaxation_phases=self.relaxation_phases,
+            relaxation_moves=self.relaxation_moves,
+            total_area=self.total_area,
+            run_start_index=self._run_start_index,
+            rounds_completed=self._rounds_completed,
+            relaxation_phases_used=self._relaxation_phases_used
+        )
+    
+    def _write_checkpoint(self) -> None:
+        """
+        把当前生成状态写入检查点文件（调用方持有状态锁），写入失败只记录警告，不中断生成
+        """
+        if not self.checkpoint_path or self._checkpoint_run is None:
+            return
+        try:
+            save_checkpoint(self.checkpoint_path, self.generated_aggregates,
+                            self._checkpoint_state(), random.getstate())
+            logging.info(f"检查点已保存: {self.checkpoint_path}（{len(self.generated_aggregates)} 个骨料）")
         except Exception as e:
-            logging.error(f"生成错误：{str(e)}", exc_info=True)
-            raise
-        finally:
-            self.end_time = time.time()
-            logging.info(f"生成完成，耗时: {self.end_time - self.start_time:.2f}秒")
+            logging.warning(f"保存检查点失败: {str(e)}")
+        self._last_checkpoint_time = time.time()
+    
+    def _restore_group_progress(self, resume: Dict[str, Any]) -> None:
+        """
+        按检查点还原组目标面积、已生成面积和数量
+        """
+        self._shape_pools = {}
+        for group, saved in zip(self.groups.get_config(), resume['groups']):
+            group['target_area'] = saved['target_area']
+            group['generated_area'] = saved['generated_area']
+            group['count'] = saved['count']
+        self.groups.rebuild_accounting()
+        self.total_area = resume['total_area']
+    
+    def resume_from_checkpoint(self, filename: str,
+                               progress_callback: Optional[Callable] = None,
+                               draw_callback: Optional[Callable] = None) -> int:
+        """
+        从检查点恢复中断的生成并继续
         
-        return len(self.generated_aggregates)
-
+        还原组配置、生成模式和密实化/松弛设置，把检查点中的骨料载入存储，再按检查点
+        记录的区域和参数调用 generate_aggregates_in_region：已有骨料批量装载到空间索引，
+        组进度和随机数状态从检查点还原，投放从中断的轮次继续。空间索引类型、
+        并行方式和GPU设置沿用当前设置。
+        
+        Args:
+            filename: 检查点文件路径
+            progress_callback: 进度更新回调
+            draw_callback: 绘图命令回调，检查点中的骨料也会重新绘制
+        
+        Returns:
+            int: 骨料总数（含检查点中的骨料）
+        """
+        arrays, state, rng_state = load_checkpoint(filename)
+        self.set_groups([{key: g[key] for key in ('area_ratio', 'itz_thickness', 'max_count', 'layer_color', 'shapes')}
+                         for g in state['groups']])
+        self.set_generation_mode(state['generation_mode'])
+        self.target_porosity = state['target_porosity']
+        self.set_placement_strategy(state['placement_strategy'])
+        self.set_densification(state['densification_rounds'], state['densification_direction'])
+        self.set_relaxation(state['relaxation_phases'], state['relaxation_moves'])
+        self.generated_aggregates.load_arrays(arrays)
+        state['rng_state'] = rng_state
+        self._resume_state = state
+        logging.info(f"已从检查点 {filename} 恢复 {len(self.generated_aggregates)} 个骨料")
+        
+        min_x, min_y, max_x, max_y = state['region']
+        return self.generate_aggregates_in_region(
+            (min_x, min_y), (max_x, max_y),
+            min_distance=state['min_distance'],
+            max_attempts=state['max_attempts'],
+            boundary_adjust=state['boundary_adjust'],
+            progress_callback=progress_callback,
+            draw_callback=draw_callback,
+            allow_touching=state['allow_touching']
+        )
+    
+    def _draw_from_store(self, first_index: int, draw_callback: Callable) -> None:
+        """
+        按存储中的最终位置发送 first_index 之后全部骨料的绘图命令
+        """
+        groups_by_id = {g['id']: g for g in self.groups.get_config()}
+        for index in range(first_index, len(self.generated_aggregates)):
+            agg_data = self.generated_aggregates.get(index)
+            self._send_draw_command(agg_data, groups_by_id.get(agg_data["group_id"], {}), draw_callback)
+        draw_callback('regen',)
+    
     def _clear_old_boundary(self) -> None:
         """
         删除旧边界
@@ -575,13 +1324,19 @@ class RandomAggregateGenerator:
         """
         初始化组目标面积
         """
-        total_area_ratio = sum(g['area_ratio'] for g in self.groups.get_config())
-        for group in self.groups.get_config():
-            group['target_area'] = self.region_area * (group['area_ratio'] / 100.0)
-            group['generated_area'] = 0.0
-            group['count'] = 0
-            group['shapes_and_itz'] = []
-            logging.info(f"Group {group['id']}: Target Area {group['target_area']:.2f}")
+        self._shape_pools = {}
+        self.groups.initialize_targets(self.region_area)
+
+    def _seed_progress_from_store(self) -> None:
+        """
+        把存储中已有骨料（未清除的上一轮结果）计入总面积和组统计，
+        使孔隙度和组数量与已装载到空间索引、参与碰撞的骨料一致
+        """
+        store = self.generated_aggregates
+        for group_id, area in zip(store.group_ids.tolist(), store.areas.tolist()):
+            self.groups.record_aggregate(group_id, area)
+        self.total_area = float(store.areas.sum())
+        logging.info(f"已有骨料计入统计: {len(store)} 个，总面积 {self.total_area:.2f}")
 
     def _check_exit_conditions(self, target_total_area: float, max_attempts: int) -> bool:
         """
@@ -590,8 +1345,6 @@ class RandomAggregateGenerator:
         Returns:
             bool: 是否满足退出条件
         """
-        groups = self.groups.get_config()
-        
         if self.generation_mode == "porosity":
             current_porosity = self.calculate_porosity()
             target_porosity_percent = self.target_porosity * 100
@@ -607,28 +1360,15 @@ class RandomAggregateGenerator:
                 logging.info(f"孔隙度模式: 当前孔隙度 {current_porosity:.2f}% 已小于目标孔隙度 {target_porosity_percent:.2f}%，生成过程结束")
                 return True
             
-            has_remaining_groups = False
-            for group in groups:
-                if group['count'] < group['max_count']:
-                    has_remaining_groups = True
-                    break
-            
-            if not has_remaining_groups:
+            if not self.groups.has_remaining_groups():
                 logging.info(f"孔隙度模式: 所有组都已达到最大数量限制，生成过程结束")
                 return True
         else:
-            has_remaining_groups = False
-            for group in groups:
-                if group['count'] < group['max_count']:
-                    has_remaining_groups = True
-                    break
-            
-            if not has_remaining_groups:
+            if not self.groups.has_remaining_groups():
                 logging.info(f"所有组都已达到最大数量限制，生成过程结束")
                 return True
         
-        total_max_count = sum(g['max_count'] for g in groups)
-        global_max_attempts = max_attempts * total_max_count
+        global_max_attempts = max_attempts * self.groups.total_max_count
         
         if len(self.generated_aggregates) > global_max_attempts:
             logging.info(f"已达到全局最大尝试次数 {global_max_attempts}，生成过程结束")
@@ -658,69 +1398,74 @@ class RandomAggregateGenerator:
         if not SHAPELY_AVAILABLE:
             return False, None
         
-        buffer = max_possible_radius * 0.5
-        x = random.uniform(min_x + buffer, max_x - buffer)
-        y = random.uniform(min_y + buffer, max_y - buffer)
-        center = (x, y)
-
         group_shapes = chosen_group['shapes']
         group_weights = [s['weight'] for s in group_shapes]
-        shape_config = random.choices(group_shapes, weights=group_weights, k=1)[0]
-
-        shape_data = self._generate_shape(shape_config, center)
-        if not shape_data:
+        shape_index = random.choices(range(len(group_shapes)), weights=group_weights, k=1)[0]
+        pooled_shape = self._next_pooled_shape(chosen_group, shape_index)
+        
+        center = self._sample_center(chosen_group, pooled_shape, min_x, min_y, max_x, max_y,
+                                     max_possible_radius, min_distance)
+        if center is None:
             return False, None
+        return self._place_shape_at(chosen_group, shape_index, pooled_shape, center,
+                                    min_x, min_y, max_x, max_y, min_distance, boundary_adjust)
+    
+    def _sample_center(self, chosen_group: Dict[str, Any], pooled_shape: Optional[Tuple],
+                       min_x: float, min_y: float, max_x: float, max_y: float,
+                       max_possible_radius: float,
+                       min_distance: float) -> Optional[Tuple[float, float]]:
+        """
+        为候选形状采样中心点
         
-        points, actual_radius, area, shape_info, coords = shape_data
+        启用空隙感知采样时只在仍能容纳该形状（含ITZ和最小间距）的区域内采样，
+        否则在区域内均匀采样。
         
-        shapely_poly = self._create_shapely_polygon(coords)
-        if not shapely_poly:
-            return False, None
-
+        Returns:
+            Optional[Tuple[float, float]]: 中心点，已没有可容纳该形状的空隙时返回None
+        """
+        if self.free_space_sampler is not None:
+            center_clearance = pooled_shape[4] if pooled_shape else 0.0
+            itz_thickness = chosen_group.get('itz_thickness', 0.0)
+            return self.free_space_sampler.sample(center_clearance + itz_thickness + min_distance)
+        buffer = max_possible_radius * 0.5
+        return (random.uniform(min_x + buffer, max_x - buffer),
+                random.uniform(min_y + buffer, max_y - buffer))
+    
+    def _place_shape_at(self, chosen_group: Dict[str, Any], shape_index: int,
+                        pooled_shape: Optional[Tuple], center: Tuple[float, float],
+                        min_x: float, min_y: float, max_x: float, max_y: float,
+                        min_distance: float,
+                        boundary_adjust: bool) -> Tuple[bool, Optional[Dict[str, Any]]]:
+        """
+        将形状放置到给定中心并做碰撞检测和边界优化
+        
+        Args:
+            chosen_group: 所属组配置
+            shape_index: 形状在组配置中的序号
+            pooled_shape: 以原点为中心的预生成形状，为None时按形状配置现场生成
+            center: 中心点
+            min_x, min_y, max_x, max_y: 区域边界
+            min_distance: 最小间距
+            boundary_adjust: 是否进行边界优化
+        
+        Returns:
+            Tuple[bool, Optional[Dict[str, Any]]]: (是否成功, 骨料数据)
+        """
+        group_shapes = chosen_group['shapes']
         itz_thickness = chosen_group.get('itz_thickness', 0.0)
-        shapely_itz = shapely_poly.buffer(itz_thickness) if itz_thickness > 0 else None
-
-        with self._state_lock:
-            all_existing_objects = []
-            for g in self.groups.get_config():
-                all_existing_objects.extend(g['shapes_and_itz'])
-            
-            collision = check_collision_hierarchical(shapely_poly, shapely_itz, all_existing_objects, min_distance, self.spatial_index, self.use_gpu, self.allow_touching)
-        if collision:
+        
+        if pooled_shape:
+            offsets, actual_radius, area, shape_info, _ = pooled_shape
+            points = [tuple(p) for p in (offsets + center).tolist()]
+            shape_data = (points, actual_radius, area, dict(shape_info), points)
+        else:
+            shape_data = self._generate_shape(group_shapes[shape_index], center)
+        if not shape_data:
             return False, None
-
-        if boundary_adjust:
-            boundary_check_radius = actual_radius + itz_thickness
-            if is_near_boundary(center, boundary_check_radius, (min_x, min_y), (max_x, max_y), min_distance):
-                itz_safe_distance = 0.1
-                
-                center = move_toward_boundary(center, (min_x, min_y), (max_x, max_y), itz_safe_distance)
-                for i in range(len(points)):
-                    px, py = points[i]
-                    points[i] = (center[0] + (px - x), center[1] + (py - y))
-                
-                points = adjust_points_to_boundary(points, itz_safe_distance, (min_x, min_y), (max_x, max_y))
-                _, actual_radius = calculate_bounding_circle(points)
-                
-                coords = [(p[0], p[1]) for p in points]
-                
-                shapely_poly = self._create_shapely_polygon(coords)
-                if not shapely_poly:
-                    return False, None
-                
-                shapely_itz = shapely_poly.buffer(itz_thickness) if itz_thickness > 0 else None
-                
-                if hasattr(shapely_poly, 'area'):
-                    area = shapely_poly.area
-            
-            all_existing_objects = []
-            for g in self.groups.get_config():
-                all_existing_objects.extend(g['shapes_and_itz'])
-            
-            collision = check_collision_hierarchical(shapely_poly, shapely_itz, all_existing_objects, min_distance, self.spatial_index, self.use_gpu, self.allow_touching)
-            if collision:
-                return False, None
-
+        
+        points, actual_radius, area, shape_info, coords = shape_data
+        
+        # 圆/椭圆先做解析检测，仅在需要多边形精确检测或被接受时才构建 Shapely 对象
         agg_data = {
             "center": center,
             "radius": actual_radius,
@@ -729,11 +1474,147 @@ class RandomAggregateGenerator:
             "shape_info": shape_info,
             "group_id": chosen_group['id'],
             "itz_thickness": itz_thickness,
-            "shapely_obj": shapely_poly,
-            "shapely_itz": shapely_itz
+            "shapely_obj": None,
+            "shapely_itz": None,
+            "primitive": make_primitive(shape_info, center, itz_thickness)
         }
         
+        with self._state_lock:
+            collision = self._check_candidate_collision(agg_data, min_distance)
+        if collision:
+            return False, None
+        
+        if boundary_adjust:
+            adjusted = adjust_aggregate_to_boundary(
+                center, points, actual_radius + itz_thickness,
+                (min_x, min_y), (max_x, max_y), min_distance
+            )
+            if adjusted is not None:
+                center, points, actual_radius = adjusted
+                
+                # 贴边裁剪后不再是标准圆/椭圆，改用多边形检测
+                agg_data.update({
+                    "center": center,
+                    "radius": actual_radius,
+                    "points": points,
+                    "shapely_obj": None,
+                    "shapely_itz": None,
+                    "primitive": None
+                })
+                if not self._ensure_shapely_geometry(agg_data):
+                    return False, None
+                
+                if hasattr(agg_data["shapely_obj"], 'area'):
+                    agg_data["area"] = agg_data["shapely_obj"].area
+                
+                collision = self._check_candidate_collision(agg_data, min_distance)
+                if collision:
+                    return False, None
+        
+        if not self._ensure_shapely_geometry(agg_data):
+            return False, None
+        
         return True, agg_data
+    
+    def _ensure_shapely_geometry(self, agg_data: Dict[str, Any]) -> bool:
+        """
+        按需为骨料构建 Shapely 多边形及ITZ
+        
+        Returns:
+            bool: 几何体可用返回True，构建失败返回False
+        """
+        if agg_data.get("shapely_obj") is not None:
+            return True
+        shapely_poly = self._create_shapely_polygon([(p[0], p[1]) for p in agg_data["points"]])
+        if not shapely_poly:
+            return False
+        itz_thickness = agg_data.get("itz_thickness", 0.0)
+        agg_data["shapely_obj"] = shapely_poly
+        agg_data["shapely_itz"] = shapely_poly.buffer(itz_thickness) if itz_thickness > 0 else None
+        return True
+    
+    def _check_candidate_collision(self, agg_data: Dict[str, Any], min_distance: float) -> bool:
+        """
+        检测候选骨料是否与已有骨料冲突
+        
+        空间索引可用时由 check_aggregate_collision 处理（圆/椭圆走解析路径）；
+        启用GPU且常驻边界缓冲区与已有骨料同步时，由缓冲区一次给出候选；
+        否则对存储中的边界数组做 NumPy 预筛选后层次化检测。
+        
+        Returns:
+            bool: 发生碰撞返回True
+        """
+        if self.spatial_index is not None and not self._gpu_bounds_synced():
+            return check_aggregate_collision(
+                agg_data, self.spatial_index, min_distance, self.allow_touching,
+                self.use_gpu, self._ensure_shapely_geometry
+            )
+        
+        if not self._ensure_shapely_geometry(agg_data):
+            return True
+        query_shape = agg_data["shapely_itz"] or agg_data["shapely_obj"]
+        return check_collision_hierarchical(
+            agg_data["shapely_obj"], agg_data["shapely_itz"],
+            self._collect_existing_shapes(query_shape.bounds, min_distance),
+            min_distance, None, False, self.allow_touching  # 候选已按边界框筛选过
+        )
+    
+    def _gpu_bounds_synced(self) -> bool:
+        """
+        GPU常驻边界缓冲区是否启用且与已有骨料一一对应
+        """
+        return self.use_gpu and gpu_calculator.buffer_size == len(self.generated_aggregates)
+    
+    def _collect_existing_shapes(self, bbox: Tuple[float, float, float, float],
+                                 min_distance: float = 0.0) -> List[Any]:
+        """
+        收集碰撞检测所需的已有几何体列表
+        
+        先按边界框筛选候选骨料（GPU常驻缓冲区同步时在设备上计算，否则对存储中的
+        (N, 4) 边界数组做一次 NumPy 预筛选），只取出边界框相交的骨料几何。
+        
+        Args:
+            bbox: 候选骨料（含ITZ）的边界框
+            min_distance: 最小间距，用于扩展边界框
+        """
+        if not self.generated_aggregates:
+            return []
+        store = self.generated_aggregates
+        if self._gpu_bounds_synced():
+            indices = gpu_calculator.query_candidates(bbox, min_distance)[0]
+        else:
+            indices = bbox_candidate_indices(store.bounds, bbox, min_distance)
+        shapes = []
+        for index in indices.tolist():
+            polygon, itz_polygon = store.geometry(index)
+            shapes.append(polygon)
+            if itz_polygon is not None:
+                shapes.append(itz_polygon)
+        return shapes
+    
+    def _next_pooled_shape(self, group: Dict[str, Any], shape_index: int) -> Optional[Tuple]:
+        """
+        从组的候选形状池中取出一个以原点为中心的形状
+        
+        形状池按 (组ID, 形状序号) 以 candidate_pool_size 为批量向量化预生成，
+        池耗尽时整批补充。
+        
+        Returns:
+            Optional[Tuple]: (点数组, 实际半径, 面积, 形状信息, 中心间隙半径)，批量生成失败时返回None
+        """
+        key = (group['id'], shape_index)
+        pool = self._shape_pools.get(key)
+        if not pool:
+            with self._shape_pool_lock:
+                pool = self._shape_pools.get(key)
+                if not pool:
+                    pool = deque(generate_shape_batch_from_config(group['shapes'][shape_index],
+                                                                  self.candidate_pool_size))
+                    self._shape_pools[key] = pool
+        try:
+            return pool.popleft()
+        except IndexError:
+            return None
 
     def _generate_shape(self, shape_config: Dict[str, Any], center: Tuple[float, float]) -> Optional[Tuple]:
         """
@@ -742,66 +1623,7 @@ class RandomAggregateGenerator:
         Returns:
             Optional[Tuple]: (点列表, 实际半径, 面积, 形状信息, 坐标列表)
         """
-        points = []
-        actual_radius = 0.0
-        area = 0.0
-        shape_info = {}
-        
-        try:
-            if shape_config['type'] == 'polygon':
-                min_size = shape_config.get('min_size', 2.0)
-                max_size = shape_config.get('max_size', 8.0)
-                min_sides = shape_config.get('min_sides', 3)
-                max_sides = shape_config.get('max_sides', 7)
-                irregularity = shape_config.get('irregularity', 0.3)
-                spikiness = shape_config.get('spikiness', 0.2)
-                optimize_sides = shape_config.get('optimize_sides', True)
-                min_edge_length = shape_config.get('min_edge_length', None)
-                
-                size = random.uniform(min_size, max_size)
-                sides = random.randint(min_sides, max_sides)
-                points = generate_random_polygon(center, size, sides, irregularity, spikiness, optimize_sides, min_edge_length)
-                _, actual_radius = calculate_bounding_circle(points)
-                area = calculate_polygon_area(points)
-                shape_info = {"shape": "polygon", "size": size, "sides": sides, "irregularity": irregularity, "spikiness": spikiness}
-            
-            elif shape_config['type'] == 'circle':
-                min_radius = shape_config.get('min_radius', 2.0)
-                max_radius = shape_config.get('max_radius', 8.0)
-                segments = shape_config.get('segments', 36)
-                
-                radius = random.uniform(min_radius, max_radius)
-                actual_radius = radius
-                area = calculate_circle_area(radius)
-                points = generate_circle(center, radius, segments)
-                shape_info = {"shape": "circle", "radius": radius, "segments": segments}
-            
-            elif shape_config['type'] == 'ellipse':
-                min_major = shape_config.get('min_major', 3.0)
-                max_major = shape_config.get('max_major', 10.0)
-                min_minor = shape_config.get('min_minor', 2.0)
-                max_minor = shape_config.get('max_minor', 8.0)
-                segments = shape_config.get('segments', 36)
-                
-                major_axis = random.uniform(min_major, max_major)
-                minor_axis = random.uniform(min_minor, max_minor)
-                rotation = random.uniform(0, 2 * math.pi)
-                actual_radius = max(major_axis, minor_axis)
-                area = calculate_ellipse_area(major_axis, minor_axis)
-                points = generate_ellipse(center, major_axis, minor_axis, rotation, segments)
-                shape_info = {"shape": "ellipse", "major_axis": major_axis, "minor_axis": minor_axis, "rotation": rotation, "segments": segments}
-            
-            else:
-                logging.warning(f"未知的形状类型: {shape_config['type']}")
-                return None
-                
-            coords = [(p[0], p[1]) for p in points]
-            
-            return points, actual_radius, area, shape_info, coords
-            
-        except Exception as e:
-            logging.warning(f"生成形状时出错: {str(e)}")
-            return None
+        return generate_shape_from_config(shape_config, center)
 
     def _create_shapely_polygon(self, coords: List[Tuple[float, float]]) -> Optional[Any]:
         """
@@ -826,20 +1648,23 @@ class RandomAggregateGenerator:
         with self._state_lock:
             self.total_area += agg_data["area"]
             
-            for group in self.groups.get_config():
-                if group['id'] == agg_data["group_id"]:
-                    group['generated_area'] += agg_data["area"]
-                    group['count'] += 1
-                    group['shapes_and_itz'].append(agg_data["shapely_obj"])
-                    if agg_data["shapely_itz"]:
-                        group['shapes_and_itz'].append(agg_data["shapely_itz"])
-                    break
+            self.groups.record_aggregate(agg_data["group_id"], agg_data["area"])
             
+            # 索引中只保存轻量记录，几何对象由存储的 LRU 缓存按需重建
+            index = self.generated_aggregates.append(agg_data)
+            self.generated_aggregates.cache_geometry(index, agg_data["shapely_obj"], agg_data["shapely_itz"])
+            if self.use_gpu:
+                gpu_calculator.append_bounds(self.generated_aggregates.bounds[index])
             if self.spatial_index:
-                self.spatial_index.insert(agg_data)
+                self.spatial_index.insert(self.generated_aggregates.record(index, agg_data.get("primitive")))
             
-            self.generated_aggregates.append(agg_data)
+            if self.free_space_sampler is not None:
+                footprint = agg_data["shapely_itz"] if agg_data["shapely_itz"] is not None else agg_data["shapely_obj"]
+                self.free_space_sampler.mark_occupied(footprint)
 
+            if self.checkpoint_path and time.time() - self._last_checkpoint_time >= self.checkpoint_interval:
+                self._write_checkpoint()
+    
     def _send_draw_command(self, agg_data: Dict[str, Any], chosen_group: Dict[str, Any], draw_callback: Any) -> None:
         """
         发送绘图命令到队列
@@ -906,9 +1731,11 @@ class RandomAggregateGenerator:
                 writer = csv.writer(f)
                 writer.writerow(["ID", "Group_ID", "Center_X", "Center_Y", "Radius", "Area", "Shape", "Shape Parameters", "ITZ_Thickness"])
                 
-                for i, agg in enumerate(self.generated_aggregates):
-                    center = agg["center"]
-                    shape_info = agg["shape_info"]
+                store = self.generated_aggregates
+                for i, (group_id, center, radius, area, itz_thickness) in enumerate(zip(
+                        store.group_ids.tolist(), store.centers.tolist(), store.radii.tolist(),
+                        store.areas.tolist(), store.itz_thickness.tolist())):
+                    shape_info = store.shape_info(i)
                     shape_type = shape_info["shape"]
                     params_str = ""
                     
@@ -921,14 +1748,14 @@ class RandomAggregateGenerator:
                     
                     writer.writerow([
                         i + 1,
-                        agg["group_id"],
+                        group_id,
                         round(center[0], 4),
                         round(center[1], 4),
-                        round(agg["radius"], 4),
-                        round(agg["area"], 4),
+                        round(radius, 4),
+                        round(area, 4),
                         shape_type,
                         params_str,
-                        agg.get("itz_thickness", 0.0)
+                        itz_thickness
                     ])
             
             logging.info(f"数据已成功导出到: {filename}")
@@ -953,6 +1780,7 @@ class RandomAggregateGenerator:
         
         try:
             import json
+            store = self.generated_aggregates
             data = {
                 "metadata": {
                     "version": "2.0.1",
@@ -965,10 +1793,12 @@ class RandomAggregateGenerator:
                 "groups": [{"id": g['id'], "area_ratio": g['area_ratio'], "itz_thickness": g['itz_thickness'], 
                              "max_count": g['max_count'], "count": g['count'], "generated_area": g['generated_area']} 
                             for g in self.groups.get_config()],
-                "aggregates": [{"id": i+1, "group_id": a['group_id'], "center": list(a['center']),
-                                 "radius": a['radius'], "area": a['area'], 
-                                 "shape": a['shape_info'], "itz_thickness": a.get('itz_thickness', 0)}
-                                for i, a in enumerate(self.generated_aggregates)]
+                "aggregates": [{"id": i+1, "group_id": group_id, "center": center,
+                                 "radius": radius, "area": area, 
+                                 "shape": store.shape_info(i), "itz_thickness": itz_thickness}
+                                for i, (group_id, center, radius, area, itz_thickness) in enumerate(zip(
+                                    store.group_ids.tolist(), store.centers.tolist(), store.radii.tolist(),
+                                    store.areas.tolist(), store.itz_thickness.tolist()))]
             }
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(data, f, ensure_ascii=False, indent=2, default=str)
@@ -996,7 +1826,9 @@ class RandomAggregateGenerator:
                 logging.warning(f"删除对象时出错: {str(e)}")
         
         self.draw_objects = []
-        self.generated_aggregates = []
+        self.generated_aggregates.clear()
+        if self.use_gpu:
+            gpu_calculator.reset_bounds()
         self.itz_layers = []
         self.groups.reset_group_stats()
         self.total_area = 0.0
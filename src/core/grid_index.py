@@ -0,0 +1,387 @@
+# core/grid_index.py
+
+import math
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+
+from .spatial_index import (get_object_bounds, collect_object_bounds, get_object_center, move_object_bounds,
+                            best_first_search)
+
+
+class GridIndex:
+    def __init__(self, bounds: Tuple[float, float, float, float], cell_size: float, initial_capacity: int = 256):
+        """
+        均匀网格（单元哈希）空间索引
+        
+        对象按边界框中心放入单元格，插入为 O(1)。单元格尺寸取约 2 倍最大颗粒半径时，
+        单个颗粒的查询只需访问 3×3 邻域。对象边界保存在 NumPy 数组中，
+        邻域内候选通过一次布尔掩码完成边界框筛选。
+        
+        删除和更新只改动对象所在的单元格，删除后的内部编号留作墓碑，
+        墓碑超过编号总数的一半时压缩重排。
+        
+        Args:
+            bounds: 索引边界 (min_x, min_y, max_x, max_y)
+            cell_size: 单元格边长
+            initial_capacity: 边界数组初始容量
+        """
+        if cell_size <= 0:
+            raise ValueError("单元格尺寸必须大于0")
+        self.bounds = bounds
+        self.cell_size = float(cell_size)
+        self.initial_capacity = max(1, initial_capacity)
+        
+        self._objects: List[Optional[Dict[str, Any]]] = []
+        self._bounds_array = np.empty((self.initial_capacity, 4), dtype=float)
+        self._cells: Dict[Tuple[int, int], List[int]] = {}
+        self._max_half_extent = 0.0
+        # 对象 id 字段 -> 内部编号；已删除的内部编号在 _objects 中为 None
+        self._slots: Dict[Any, int] = {}
+        self._removed = 0
+    
+    def _cell_of(self, x: float, y: float) -> Tuple[int, int]:
+        """
+        计算坐标所在的单元格编号
+        """
+        return (int(math.floor((x - self.bounds[0]) / self.cell_size)),
+                int(math.floor((y - self.bounds[1]) / self.cell_size)))
+    
+    def _ensure_capacity(self, size: int) -> None:
+        """
+        边界数组容量不足时按倍数扩容
+        """
+        capacity = self._bounds_array.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        new_array = np.empty((capacity, 4), dtype=float)
+        new_array[:len(self._objects)] = self._bounds_array[:len(self._objects)]
+        self._bounds_array = new_array
+    
+    def insert(self, obj: Dict[str, Any]) -> bool:
+        """
+        插入对象到网格
+        
+        Args:
+            obj: 要插入的对象，必须包含shapely_obj或shapely_itz属性
+        
+        Returns:
+            bool: 是否成功插入
+        """
+        obj_bounds = get_object_bounds(obj)
+        if obj_bounds is None:
+            return False
+        
+        obj_id = len(self._objects)
+        self._ensure_capacity(obj_id + 1)
+        self._objects.append(obj)
+        self._link(obj_id, obj_bounds)
+        key = obj.get('id')
+        if key is not None:
+            self._slots[key] = obj_id
+        return True
+    
+    def _link(self, obj_id: int, obj_bounds: Tuple[float, float, float, float]) -> None:
+        """
+        写入对象边界并把内部编号放入中心所在的单元格
+        """
+        self._bounds_array[obj_id] = obj_bounds
+        min_x, min_y, max_x, max_y = obj_bounds
+        half_extent = max(max_x - min_x, max_y - min_y) / 2
+        if half_extent > self._max_half_extent:
+            self._max_half_extent = half_extent
+        
+        cell = self._cell_of((min_x + max_x) / 2, (min_y + max_y) / 2)
+        self._cells.setdefault(cell, []).append(obj_id)
+    
+    def _unlink(self, obj_id: int) -> None:
+        """
+        把内部编号从其所在的单元格中移除
+        """
+        min_x, min_y, max_x, max_y = self._bounds_array[obj_id].tolist()
+        cell = self._cell_of((min_x + max_x) / 2, (min_y + max_y) / 2)
+        cell_ids = self._cells[cell]
+        cell_ids.remove(obj_id)
+        if not cell_ids:
+            del self._cells[cell]
+    
+    def insert_batch(self, objects: List[Dict[str, Any]]) -> int:
+        """
+        批量插入对象：一次取得全部边界，单元格编号向量化计算后按单元格分组写入
+        
+        Args:
+            objects: 要插入的对象列表
+        
+        Returns:
+            int: 成功插入的对象数
+        """
+        new_objects, new_bounds = collect_object_bounds(objects)
+        return self._append_batch(new_objects, new_bounds)
+    
+    def _append_batch(self, new_objects: List[Dict[str, Any]], new_bounds: np.ndarray) -> int:
+        """
+        按已知边界批量追加对象
+        """
+        if not new_objects:
+            return 0
+        start = len(self._objects)
+        total = start + len(new_objects)
+        self._ensure_capacity(total)
+        self._bounds_array[start:total] = new_bounds
+        self._objects.extend(new_objects)
+        
+        half_extent = float(np.max(new_bounds[:, 2:] - new_bounds[:, :2])) / 2
+        if half_extent > self._max_half_extent:
+            self._max_half_extent = half_extent
+        
+        centers = (new_bounds[:, :2] + new_bounds[:, 2:]) / 2
+        cells = np.floor((centers - self.bounds[:2]) / self.cell_size).astype(np.int64)
+        order = np.lexsort((cells[:, 1], cells[:, 0]))
+        sorted_cells = cells[order]
+        splits = np.flatnonzero((sorted_cells[1:] != sorted_cells[:-1]).any(axis=1)) + 1
+        for group in np.split(order, splits):
+            cx, cy = cells[group[0]].tolist()
+            self._cells.setdefault((cx, cy), []).extend((group + start).tolist())
+        for slot, obj in enumerate(new_objects, start):
+            key = obj.get('id')
+            if key is not None:
+                self._slots[key] = slot
+        return len(new_objects)
+    
+    def remove(self, obj_id: Any) -> bool:
+        """
+        按对象的 id 字段删除对象
+        
+        Args:
+            obj_id: 对象的 id 字段
+        
+        Returns:
+            bool: 是否找到并删除
+        """
+        slot = self._slots.pop(obj_id, None)
+        if slot is None:
+            return False
+        self._unlink(slot)
+        self._objects[slot] = None
+        self._removed += 1
+        if self._removed > len(self._objects) // 2:
+            self._compact()
+        return True
+    
+    def update(self, obj_id: Any, new_bounds: Tuple[float, float, float, float],
+               obj: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        把对象移动到新边界：从原单元格移除后放入新中心所在的单元格，内部编号不变
+        
+        Args:
+            obj_id: 对象的 id 字段
+            new_bounds: 新边界 (min_x, min_y, max_x, max_y)
+            obj: 替换保存的对象（如位置更新后的新记录），省略时保留原对象并同步其 bounds 和 center 字段
+        
+        Returns:
+            bool: 是否找到并更新
+        """
+        slot = self._slots.get(obj_id)
+        if slot is None:
+            return False
+        new_bounds = tuple(float(v) for v in new_bounds)
+        if obj is None:
+            move_object_bounds(self._objects[slot], tuple(self._bounds_array[slot].tolist()), new_bounds)
+        else:
+            self._objects[slot] = obj
+        self._unlink(slot)
+        self._link(slot, new_bounds)
+        return True
+    
+    def _compact(self) -> None:
+        """
+        丢弃墓碑，按存活对象重新编号并重建单元格
+        """
+        live = [slot for slot, obj in enumerate(self._objects) if obj is not None]
+        objects = [self._objects[slot] for slot in live]
+        bounds = self._bounds_array[live]
+        self.clear()
+        self._append_batch(objects, bounds)
+    
+    def _candidate_ids(self, bounds: Tuple[float, float, float, float]) -> List[int]:
+        """
+        收集中心可能落在查询范围附近的单元格内的对象编号
+        """
+        margin = self._max_half_extent
+        min_cx, min_cy = self._cell_of(bounds[0] - margin, bounds[1] - margin)
+        max_cx, max_cy = self._cell_of(bounds[2] + margin, bounds[3] + margin)
+        
+        ids: List[int] = []
+        if (max_cx - min_cx + 1) * (max_cy - min_cy + 1) > len(self._cells):
+            for (cx, cy), cell_ids in self._cells.items():
+                if min_cx <= cx <= max_cx and min_cy <= cy <= max_cy:
+                    ids.extend(cell_ids)
+            return ids
+        
+        for cx in range(min_cx, max_cx + 1):
+            for cy in range(min_cy, max_cy + 1):
+                cell_ids = self._cells.get((cx, cy))
+                if cell_ids:
+                    ids.extend(cell_ids)
+        return ids
+    
+    def query_range(self, bounds: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
+        """
+        查询指定边界内的所有对象
+        
+        Args:
+            bounds: 查询边界 (min_x, min_y, max_x, max_y)
+        
+        Returns:
+            List[Dict[str, Any]]: 查询到的对象列表
+        """
+        if not self._objects:
+            return []
+        ids = self._candidate_ids(bounds)
+        if not ids:
+            return []
+        
+        id_array = np.asarray(ids, dtype=np.intp)
+        candidate_bounds = self._bounds_array[id_array]
+        mask = ~(
+            (candidate_bounds[:, 2] < bounds[0]) |
+            (candidate_bounds[:, 0] > bounds[2]) |
+            (candidate_bounds[:, 3] < bounds[1]) |
+            (candidate_bounds[:, 1] > bounds[3])
+        )
+        return [self._objects[i] for i in id_array[mask]]
+    
+    def query_shapely(self, shapely_obj: Any, min_distance: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        查询与指定Shapely对象可能碰撞的所有对象
+        
+        Args:
+            shapely_obj: Shapely几何对象
+            min_distance: 最小距离，用于扩展查询边界
+        
+        Returns:
+            List[Dict[str, Any]]: 可能碰撞的对象列表
+        """
+        obj_bounds = shapely_obj.bounds
+        expanded_bounds = (
+            obj_bounds[0] - min_distance,
+            obj_bounds[1] - min_distance,
+            obj_bounds[2] + min_distance,
+            obj_bounds[3] + min_distance
+        )
+        return self.query_range(expanded_bounds)
+    
+    def query_knn(self, point: Tuple[float, float], k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离最近的 k 个对象（逐环最佳优先遍历）
+        
+        Args:
+            point: 查询点 (x, y)
+            k: 返回的对象数
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        return self._best_first(point, k=k)
+    
+    def query_radius(self, point: Tuple[float, float], radius: float) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离不超过 radius 的所有对象（逐环最佳优先遍历）
+        
+        Args:
+            point: 查询点 (x, y)
+            radius: 查询半径
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        return self._best_first(point, radius=radius)
+    
+    def _best_first(self, point: Tuple[float, float], k: Optional[int] = None,
+                    radius: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        以查询点所在单元格为中心逐环向外做最佳优先遍历
+        
+        第 s 环为与中心单元格切比雪夫距离为 s 的单元格。对象按边界框中心分格，
+        其中心偏出所在单元格不超过最大半边长，据此得到每一环的距离下界；
+        环上单元格数超过已占用单元格数时，剩余单元格作为一个节点一次展开。
+        """
+        total = len(self._objects) - self._removed
+        if total == 0:
+            return []
+        px, py = point
+        cx, cy = self._cell_of(px, py)
+        origin_x, origin_y = self.bounds[0], self.bounds[1]
+        cells = self._cells
+        measured = [0]
+        
+        def lower_bound(s: int) -> float:
+            min_x = origin_x + (cx - s + 1) * self.cell_size
+            max_x = origin_x + (cx + s) * self.cell_size
+            min_y = origin_y + (cy - s + 1) * self.cell_size
+            max_y = origin_y + (cy + s) * self.cell_size
+            gap = min(px - min_x, max_x - px, py - min_y, max_y - py)
+            return max(0.0, gap - self._max_half_extent)
+        
+        def measure(ids: List[int]) -> list:
+            measured[0] += len(ids)
+            result = []
+            for obj_id in ids:
+                obj = self._objects[obj_id]
+                center_x, center_y = get_object_center(obj, self._bounds_array[obj_id].tolist())
+                result.append((math.hypot(center_x - px, center_y - py), obj_id, obj))
+            return result
+        
+        def expand(node: Tuple[int, bool]) -> Tuple[list, list]:
+            s, rest = node
+            ids: List[int] = []
+            if rest:
+                for (x, y), cell_ids in cells.items():
+                    if max(abs(x - cx), abs(y - cy)) >= s:
+                        ids.extend(cell_ids)
+                return [], measure(ids)
+            if s == 0:
+                ring = [(cx, cy)]
+            else:
+                ring = ([(x, y) for x in range(cx - s, cx + s + 1) for y in (cy - s, cy + s)] +
+                        [(x, y) for y in range(cy - s + 1, cy + s) for x in (cx - s, cx + s)])
+            for cell in ring:
+                cell_ids = cells.get(cell)
+                if cell_ids:
+                    ids.extend(cell_ids)
+            objects = measure(ids)
+            if measured[0] >= total:
+                return [], objects
+            return [(lower_bound(s + 1), (s + 1, 8 * (s + 1) > len(cells)))], objects
+        
+        return best_first_search([(0.0, (0, False))], expand, k, radius)
+    
+    def clear(self) -> None:
+        """
+        清除网格中的所有对象
+        """
+        self._objects = []
+        self._bounds_array = np.empty((self.initial_capacity, 4), dtype=float)
+        self._cells = {}
+        self._max_half_extent = 0.0
+        self._slots = {}
+        self._removed = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取网格统计信息
+        
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        occupied = len(self._cells)
+        total_objects = len(self._objects) - self._removed
+        return {
+            'total_objects': total_objects,
+            'cell_size': self.cell_size,
+            'occupied_cells': occupied,
+            'max_objects_per_cell': max((len(ids) for ids in self._cells.values()), default=0),
+            'avg_objects_per_cell': total_objects / occupied if occupied else 0.0
+        }
@@ -1,11 +1,21 @@
 # group_manager.py
 
+import heapq
 import logging
-from typing import List, Dict, Any, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 class GroupManager:
     def __init__(self):
         self.groups: List[Dict[str, Any]] = []
+        
+        # 增量统计：按进度排序的小顶堆（过期条目按版本号惰性丢弃）和累计值
+        self._heap: List[Tuple[float, int, int]] = []
+        self._versions: List[int] = []
+        self._index_by_id: Dict[int, int] = {}
+        self._progress_sum: float = 0.0
+        self._progress_groups: int = 0
+        self.total_max_count: int = 0
+        self.remaining_groups: int = 0
 
     def set_config(self, groups_config: List[Dict[str, Any]]) -> None:
         """
@@ -36,12 +46,96 @@ class GroupManager:
                 'shapes': conf['shapes'],
                 'target_area': 0.0,
                 'generated_area': 0.0,
-                'count': 0,
-                'shapes_and_itz': []
+                'count': 0
             }
             self.groups.append(group)
+        self.rebuild_accounting()
         logging.info(f"GroupManager: 已设置 {len(self.groups)} 个组")
 
+    @staticmethod
+    def _progress(group: Dict[str, Any]) -> float:
+        """
+        组的生成进度（已生成面积 / 目标面积）
+        """
+        return group['generated_area'] / group['target_area'] if group['target_area'] > 0 else 0.0
+
+    def rebuild_accounting(self) -> None:
+        """
+        根据当前组统计重建增量统计结构
+        
+        组统计应通过 record_aggregate / update_group_stats 更新；直接修改组字典后需调用本方法。
+        """
+        self._index_by_id = {g['id']: i for i, g in enumerate(self.groups)}
+        self._versions = [0] * len(self.groups)
+        self._heap = [(self._progress(g), i, 0) for i, g in enumerate(self.groups) if g['count'] < g['max_count']]
+        heapq.heapify(self._heap)
+        
+        self.total_max_count = sum(g['max_count'] for g in self.groups)
+        self.remaining_groups = len(self._heap)
+        with_target = [g for g in self.groups if g['target_area'] > 0]
+        self._progress_sum = sum(min(1.0, self._progress(g)) for g in with_target)
+        self._progress_groups = len(with_target)
+
+    def initialize_targets(self, region_area: float) -> None:
+        """
+        按区域面积初始化各组目标面积并清零统计
+        
+        Args:
+            region_area: 区域面积
+        """
+        for group in self.groups:
+            group['target_area'] = region_area * (group['area_ratio'] / 100.0)
+            group['generated_area'] = 0.0
+            group['count'] = 0
+            logging.info(f"Group {group['id']}: Target Area {group['target_area']:.2f}")
+        self.rebuild_accounting()
+
+    def record_aggregate(self, group_id: int, area: float) -> Optional[Dict[str, Any]]:
+        """
+        记录一个新接受的骨料，增量更新组统计、进度堆和累计值
+        
+        Args:
+            group_id: 组ID
+            area: 骨料面积
+        
+        Returns:
+            Optional[Dict[str, Any]]: 对应的组配置，未找到组时返回None
+        """
+        index = self._index_by_id.get(group_id)
+        if index is None:
+            logging.warning(f"GroupManager: 未找到ID为 {group_id} 的组")
+            return None
+        
+        group = self.groups[index]
+        was_available = group['count'] < group['max_count']
+        old_progress = self._progress(group)
+        
+        group['generated_area'] += area
+        group['count'] += 1
+        
+        new_progress = self._progress(group)
+        if group['target_area'] > 0:
+            self._progress_sum += min(1.0, new_progress) - min(1.0, old_progress)
+        
+        self._versions[index] += 1
+        if group['count'] < group['max_count']:
+            heapq.heappush(self._heap, (new_progress, index, self._versions[index]))
+        elif was_available:
+            self.remaining_groups -= 1
+        return group
+
+    def has_remaining_groups(self) -> bool:
+        """
+        是否还有未达到最大数量的组
+        """
+        return self.remaining_groups > 0
+
+    def mean_progress(self) -> float:
+        """
+        有目标面积的组的平均进度（单组进度上限为1）
+        """
+        return self._progress_sum / self._progress_groups if self._progress_groups else 0.0
+
     def get_config(self) -> List[Dict[str, Any]]:
         """
         获取组配置
@@ -64,29 +158,63 @@ class GroupManager:
         """
         根据生成模式选择下一个需要生成的组
         
+        返回进度最低且未达到最大数量的组（进度相同时按组顺序），
+        由进度堆维护，无需每次对全部组排序。
+        
         Args:
             generation_mode: 生成模式，可选值："count"（按数量）、"porosity"（按孔隙度）
             
         Returns:
             Optional[Dict[str, Any]]: 选中的组配置，没有可生成的组时返回None
         """
-        if generation_mode == "porosity":
-            for g in self.groups:
-                if g['target_area'] > 0:
-                    g['progress'] = g['generated_area'] / g['target_area']
-                else:
-                    g['progress'] = 0.0
-            
-            candidate_groups = sorted(self.groups, key=lambda g: g['progress'])
-        else:
-            candidate_groups = sorted(self.groups, key=lambda g: g['generated_area'] / g['target_area'] if g['target_area'] > 0 else 0)
-        
-        available_groups = [g for g in candidate_groups if g['count'] < g['max_count']]
-        
-        if available_groups:
-            return available_groups[0]
+        while self._heap:
+            progress, index, version = self._heap[0]
+            group = self.groups[index]
+            if version != self._versions[index] or group['count'] >= group['max_count']:
+                heapq.heappop(self._heap)
+                continue
+            if generation_mode == "porosity":
+                group['progress'] = progress
+            return group
         return None
 
+    def build_placement_queue(self, sample_shape: Callable[[Dict[str, Any]], Optional[Tuple[int, Tuple]]],
+                              area_targets: Optional[Dict[int, float]] = None) -> List[Tuple[Dict[str, Any], int, Tuple]]:
+        """
+        预抽样全部待放置颗粒并按尺寸降序排列（take-and-place 模式）
+        
+        每组抽样至剩余数量上限；给出 area_targets 时，组的累计抽样面积达到目标面积即停止。
+        尺寸相同时保持组顺序和抽样顺序。
+        
+        Args:
+            sample_shape: 抽样函数，接收组配置，返回 (形状序号, 形状)，抽样失败时返回None；
+                形状为 (点数组, 实际半径, 面积, 形状信息, 中心间隙半径)
+            area_targets: 以组ID为键的目标面积，为None时只按数量上限抽样
+        
+        Returns:
+            List[Tuple[Dict[str, Any], int, Tuple]]: (组配置, 形状序号, 形状) 列表，按实际半径降序
+        """
+        queue = []
+        for group in self.groups:
+            remaining = group['max_count'] - group['count']
+            target_area = area_targets.get(group['id'], 0.0) if area_targets is not None else None
+            sampled_area = 0.0
+            failures = 0
+            while remaining > 0 and (target_area is None or sampled_area < target_area):
+                sample = sample_shape(group)
+                if sample is None:
+                    failures += 1
+                    if failures > 10:
+                        logging.warning(f"GroupManager: 组 {group['id']} 形状抽样连续失败，停止抽样")
+                        break
+                    continue
+                shape_index, shape = sample
+                queue.append((group, shape_index, shape))
+                sampled_area += shape[2]
+                remaining -= 1
+        queue.sort(key=lambda item: -item[2][1])
+        return queue
+    
     def update_group_stats(self, group_id: int, area: float) -> bool:
         """
         更新指定组的统计数据
@@ -98,13 +226,7 @@ class GroupManager:
         Returns:
             bool: 更新成功返回True，未找到组返回False
         """
-        for group in self.groups:
-            if group['id'] == group_id:
-                group['generated_area'] += area
-                group['count'] += 1
-                return True
-        logging.warning(f"GroupManager: 未找到ID为 {group_id} 的组")
-        return False
+        return self.record_aggregate(group_id, area) is not None
 
     def reset_group_stats(self) -> None:
         """
@@ -113,7 +235,7 @@ class GroupManager:
         for group in self.groups:
             group['generated_area'] = 0.0
             group['count'] = 0
-            group['shapes_and_itz'] = []
+        self.rebuild_accounting()
         logging.info("GroupManager: 已重置所有组的统计数据")
 
     def calculate_total_area_ratio(self) -> float:
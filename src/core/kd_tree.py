@@ -1,8 +1,14 @@
 # core/kd_tree.py
 
+import math
 import logging
 from typing import List, Tuple, Dict, Any, Optional, Union
 
+import numpy as np
+
+from .spatial_index import (get_object_bounds, collect_object_bounds, morton_order, get_object_center,
+                            move_object_bounds, point_bounds_distance, best_first_search)
+
 try:
     from shapely.geometry import Polygon  # noqa: F401
     SHAPELY_AVAILABLE = True
@@ -38,6 +44,58 @@ class KDTreeNode:
         if len(self.objects) > self.max_objects and self.depth < self.max_depth:
             self._split()
     
+    @classmethod
+    def build(cls, objects: List[Dict[str, Any]], bounds_array: np.ndarray, centers: np.ndarray,
+              depth: int = 0, max_objects: int = 10, max_depth: int = 10) -> "KDTreeNode":
+        """
+        由预先计算的边界和中心数组构建静态平衡子树
+        
+        与逐个对象排序、逐个计算边界的构造方式划分结果相同（按当前轴中位数划分），
+        但节点边界和中位数划分都用 NumPy 完成。
+        
+        Args:
+            objects: 对象列表
+            bounds_array: 对象边界 (N, 4)
+            centers: 对象中心 (N, 2)
+            depth: 当前节点深度
+            max_objects: 节点内最大对象数
+            max_depth: 最大深度
+        
+        Returns:
+            KDTreeNode: 子树根节点
+        """
+        node = cls.__new__(cls)
+        node.depth = depth
+        node.max_objects = max_objects
+        node.max_depth = max_depth
+        node.axis = depth % 2
+        node.left = None
+        node.right = None
+        node.median = None
+        
+        count = len(objects)
+        if count == 0:
+            node.objects = []
+            node.bounds = None
+            return node
+        node.bounds = (float(bounds_array[:, 0].min()), float(bounds_array[:, 1].min()),
+                       float(bounds_array[:, 2].max()), float(bounds_array[:, 3].max()))
+        
+        if count <= max_objects or depth >= max_depth:
+            node.objects = list(objects)
+            return node
+        
+        median_idx = count // 2
+        order = np.argpartition(centers[:, node.axis], median_idx)
+        node.median = float(centers[order[median_idx], node.axis])
+        left_ids, right_ids = order[:median_idx], order[median_idx:]
+        node.left = cls.build([objects[i] for i in left_ids.tolist()], bounds_array[left_ids], centers[left_ids],
+                              depth + 1, max_objects, max_depth)
+        node.right = cls.build([objects[i] for i in right_ids.tolist()], bounds_array[right_ids], centers[right_ids],
+                               depth + 1, max_objects, max_depth)
+        node.objects = []
+        return node
+    
     def _calculate_bounds(self) -> None:
         """
         计算节点的边界框
@@ -52,20 +110,9 @@ class KDTreeNode:
         max_y = float('-inf')
         
         for obj in self.objects:
-            # 先检查是否有现成的bounds属性，避免重复计算
-            if 'bounds' in obj:
-                obj_bounds = obj['bounds']
-            else:
-                shapely_obj = obj.get('shapely_obj') or obj.get('shapely_itz')
-                if shapely_obj:
-                    if not SHAPELY_AVAILABLE:
-                        logging.warning("Shapely未安装，无法计算对象边界，跳过")
-                        continue
-                    obj_bounds = shapely_obj.bounds
-                    # 缓存边界框，避免重复计算
-                    obj['bounds'] = obj_bounds
-                else:
-                    continue
+            obj_bounds = self._get_object_bounds(obj)
+            if obj_bounds is None:
+                continue
             
             min_x = min(min_x, obj_bounds[0])
             min_y = min(min_y, obj_bounds[1])
@@ -98,6 +145,18 @@ class KDTreeNode:
         # 清空当前节点的对象列表，因为它们现在存储在子节点中
         self.objects = []
     
+    @staticmethod
+    def _get_object_bounds(obj: Dict[str, Any]) -> Optional[Tuple[float, float, float, float]]:
+        """
+        获取对象的占据范围边界（含ITZ），首次计算后缓存到对象的 bounds 字段
+        """
+        if 'bounds' in obj:
+            return obj['bounds']
+        obj_bounds = get_object_bounds(obj)
+        if obj_bounds is not None:
+            obj['bounds'] = obj_bounds
+        return obj_bounds
+    
     def _get_object_center(self, obj: Dict[str, Any]) -> Tuple[float, float]:
         """
         获取对象的中心点
@@ -111,9 +170,8 @@ class KDTreeNode:
         if 'center' in obj:
             return obj['center']
         
-        shapely_obj = obj.get('shapely_obj') or obj.get('shapely_itz')
-        if shapely_obj and SHAPELY_AVAILABLE:
-            obj_bounds = shapely_obj.bounds
+        obj_bounds = self._get_object_bounds(obj)
+        if obj_bounds is not None:
             center_x = (obj_bounds[0] + obj_bounds[2]) / 2
             center_y = (obj_bounds[1] + obj_bounds[3]) / 2
             return (center_x, center_y)
@@ -141,7 +199,11 @@ class KDTreeNode:
                 self._split()
             return True
         
-        # 非叶子节点，根据当前轴和中位数决定插入到左还是右子树
+        # 非叶子节点，先扩展本节点边界，再根据当前轴和中位数决定插入到左还是右子树
+        obj_bounds = self._get_object_bounds(obj)
+        if obj_bounds is not None and self.bounds is not None:
+            self.bounds = (min(self.bounds[0], obj_bounds[0]), min(self.bounds[1], obj_bounds[1]),
+                           max(self.bounds[2], obj_bounds[2]), max(self.bounds[3], obj_bounds[3]))
         if self.median is not None:
             obj_center = self._get_object_center(obj)
             if obj_center[self.axis] < self.median:
@@ -173,29 +235,56 @@ class KDTreeNode:
         if not self.left and not self.right:
             for obj in self.objects:
                 # 使用缓存的边界框，避免重复计算
-                if 'bounds' in obj:
-                    obj_bounds = obj['bounds']
-                else:
-                    shapely_obj = obj.get('shapely_obj') or obj.get('shapely_itz')
-                    if shapely_obj and SHAPELY_AVAILABLE:
-                        obj_bounds = shapely_obj.bounds
-                        obj['bounds'] = obj_bounds
-                    else:
-                        continue
+                obj_bounds = self._get_object_bounds(obj)
+                if obj_bounds is None:
+                    continue
                 
                 if self._intersects_bounds(obj_bounds, bounds):
                     results.append(obj)
             return results
         
         # 非叶子节点，递归查询左右子树
-        # 优化：先查询与当前轴相关的子树，减少递归深度
-        if self.left and (bounds[self.axis] < self.median or bounds[2 + self.axis] < self.median):
+        # 对象按中心划分，其范围可能越过中位线，因此按子节点自身的边界（而不是中位数）剪枝
+        if self.left:
             results.extend(self.left.query_range(bounds))
-        if self.right and (bounds[self.axis] > self.median or bounds[2 + self.axis] > self.median):
+        if self.right:
             results.extend(self.right.query_range(bounds))
         
         return results
     
+    def remove(self, obj: Dict[str, Any], obj_bounds: Tuple[float, float, float, float]) -> bool:
+        """
+        从子树中删除对象（按身份比较），只访问边界能容纳该对象的节点
+        
+        Args:
+            obj: 要删除的对象
+            obj_bounds: 对象的边界
+        
+        Returns:
+            bool: 是否找到并删除
+        """
+        if (self.bounds is None or obj_bounds[0] < self.bounds[0] or obj_bounds[1] < self.bounds[1]
+                or obj_bounds[2] > self.bounds[2] or obj_bounds[3] > self.bounds[3]):
+            return False
+        if not self.left and not self.right:
+            for position, candidate in enumerate(self.objects):
+                if candidate is obj:
+                    del self.objects[position]
+                    return True
+            return False
+        return bool((self.left and self.left.remove(obj, obj_bounds)) or
+                    (self.right and self.right.remove(obj, obj_bounds)))
+    
+    def collect(self, out: List[Dict[str, Any]]) -> None:
+        """
+        收集子树叶节点中的全部对象
+        """
+        out.extend(self.objects)
+        if self.left:
+            self.left.collect(out)
+        if self.right:
+            self.right.collect(out)
+    
     def _intersects_bounds(self, bounds1: Tuple[float, float, float, float], 
                           bounds2: Tuple[float, float, float, float]) -> bool:
         """
@@ -236,17 +325,92 @@ class KDTreeNode:
 class KDTree:
     def __init__(self, bounds: Tuple[float, float, float, float], max_depth: int = 10, max_objects: int = 10):
         """
-        KD树初始化
+        动态KD树初始化
+        
+        采用对数方法（logarithmic method）维护一组静态KD树：新对象先进入容量为
+        4 × max_objects 的缓冲区，缓冲区满时与所有更小的静态树合并，按中位数
+        重新构建一棵平衡树，第 k 层的树恰好包含 缓冲区容量 × 2^k 个对象。
+        单次插入的摊销代价为 O(log n) 次对象重建，查询访问 O(log n) 棵深度为
+        O(log n) 的平衡树，不会随增量插入而退化。
+        
+        删除时对象直接从所在叶节点（或缓冲区）中移除，查询不再返回它；静态树的
+        对象数组中只记下墓碑数，在该层下次合并时剔除，墓碑超过存活对象数时整体重建。
+        更新等同于删除后按新边界重新插入缓冲区。
         
         Args:
             bounds: 树的初始边界 (min_x, min_y, max_x, max_y)
-            max_depth: 最大深度
+            max_depth: 最大深度（对象较多时按需要自动加深，保证叶节点规模）
             max_objects: 节点内最大对象数
         """
-        self.root = KDTreeNode([], max_depth=max_depth, max_objects=max_objects)
         self.bounds = bounds
         self.max_depth = max_depth
         self.max_objects = max_objects
+        self.buffer_capacity = max(1, 4 * max_objects)
+        
+        self._buffer: List[Dict[str, Any]] = []
+        self._buffer_bounds: List[Tuple[float, float, float, float]] = []
+        self._buffer_centers: List[Tuple[float, float]] = []
+        # 每层一棵静态树及其对象、边界和中心数组，合并时直接拼接数组
+        self._trees: List[Optional[KDTreeNode]] = []
+        self._tree_data: List[Optional[Tuple[List[Dict[str, Any]], np.ndarray, np.ndarray]]] = []
+        # 每层静态树对象数组中已删除对象（墓碑）的个数
+        self._tree_removed: List[int] = []
+        self._by_id: Dict[Any, Dict[str, Any]] = {}
+        self.rebuild_count = 0
+    
+    def _build_tree(self, objects: List[Dict[str, Any]], bounds_array: np.ndarray,
+                    centers: np.ndarray) -> KDTreeNode:
+        """
+        按中位数划分构建一棵静态平衡树
+        """
+        depth_needed = int(math.ceil(math.log2(max(1.0, len(objects) / self.max_objects)))) + 1
+        self.rebuild_count += 1
+        return KDTreeNode.build(objects, bounds_array, centers, max_objects=self.max_objects,
+                                max_depth=max(self.max_depth, depth_needed))
+    
+    def _flush_buffer(self) -> None:
+        """
+        将缓冲区与所有更小的静态树合并为一棵新树（二进制计数器进位）
+        """
+        objects = self._buffer
+        bounds_parts = [np.asarray(self._buffer_bounds, dtype=float).reshape(-1, 4)]
+        center_parts = [np.asarray(self._buffer_centers, dtype=float).reshape(-1, 2)]
+        self._buffer = []
+        self._buffer_bounds = []
+        self._buffer_centers = []
+        
+        level = 0
+        while level < len(self._trees) and self._trees[level] is not None:
+            tree_objects, tree_bounds, tree_centers = self._live_data(level)
+            objects = tree_objects + objects
+            bounds_parts.insert(0, tree_bounds)
+            center_parts.insert(0, tree_centers)
+            self._trees[level] = None
+            self._tree_data[level] = None
+            level += 1
+        
+        if level == len(self._trees):
+            self._trees.append(None)
+            self._tree_data.append(None)
+            self._tree_removed.append(0)
+        bounds_array = np.concatenate(bounds_parts)
+        centers = np.concatenate(center_parts)
+        self._trees[level] = self._build_tree(objects, bounds_array, centers)
+        self._tree_data[level] = (objects, bounds_array, centers)
+        self._tree_removed[level] = 0
+    
+    def _live_data(self, level: int) -> Tuple[List[Dict[str, Any]], np.ndarray, np.ndarray]:
+        """
+        某层静态树的对象、边界和中心数组，剔除已删除的对象
+        """
+        objects, bounds_array, centers = self._tree_data[level]
+        if not self._tree_removed[level]:
+            return objects, bounds_array, centers
+        live: List[Dict[str, Any]] = []
+        self._trees[level].collect(live)
+        live_ids = {id(obj) for obj in live}
+        keep = [i for i, obj in enumerate(objects) if id(obj) in live_ids]
+        return [objects[i] for i in keep], bounds_array[keep], centers[keep]
     
     def insert(self, obj: Dict[str, Any]) -> bool:
         """
@@ -256,25 +420,180 @@ class KDTree:
             obj: 要插入的对象
         
         Returns:
-            bool: 是否成功插入
+            bool: 是否成功插入（无法获得边界的对象不插入）
         """
-        return self.root.insert(obj)
+        obj_bounds = KDTreeNode._get_object_bounds(obj)
+        if obj_bounds is None:
+            return False
+        self._append(obj, obj_bounds)
+        return True
+        
+    def _append(self, obj: Dict[str, Any], obj_bounds: Tuple[float, float, float, float]) -> None:
+        """
+        把对象放入插入缓冲区，缓冲区满时合并
+        """
+        key = obj.get('id')
+        if key is not None:
+            self._by_id[key] = obj
+        center = obj.get('center')
+        if center is None:
+            center = ((obj_bounds[0] + obj_bounds[2]) / 2, (obj_bounds[1] + obj_bounds[3]) / 2)
+        
+        self._buffer.append(obj)
+        self._buffer_bounds.append(obj_bounds)
+        self._buffer_centers.append((center[0], center[1]))
+        if len(self._buffer) >= self.buffer_capacity:
+            self._flush_buffer()
+    
+    def remove(self, obj_id: Any) -> bool:
+        """
+        按对象的 id 字段删除对象
+        
+        Args:
+            obj_id: 对象的 id 字段
+        
+        Returns:
+            bool: 是否找到并删除
+        """
+        obj = self._by_id.pop(obj_id, None)
+        if obj is None:
+            return False
+        self._detach(obj)
+        if sum(self._tree_removed) > self._count():
+            self._reload([], np.empty((0, 4)), np.empty((0, 2)))
+        return True
+    
+    def update(self, obj_id: Any, new_bounds: Tuple[float, float, float, float],
+               obj: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        把对象移动到新边界：从原位置删除后重新插入缓冲区
+        
+        KD树叶节点按对象的 bounds 字段筛选，新边界会写回（新）对象的 bounds 字段。
+        
+        Args:
+            obj_id: 对象的 id 字段
+            new_bounds: 新边界 (min_x, min_y, max_x, max_y)
+            obj: 替换保存的对象（如位置更新后的新记录），省略时保留原对象并同步其 bounds 和 center 字段
+        
+        Returns:
+            bool: 是否找到并更新
+        """
+        old = self._by_id.pop(obj_id, None)
+        if old is None:
+            return False
+        self._detach(old)
+        new_bounds = tuple(float(v) for v in new_bounds)
+        if obj is None:
+            obj = old
+            move_object_bounds(obj, KDTreeNode._get_object_bounds(obj), new_bounds)
+        obj['bounds'] = new_bounds
+        self._append(obj, obj['bounds'])
+        return True
+    
+    def _detach(self, obj: Dict[str, Any]) -> None:
+        """
+        从缓冲区或所在静态树的叶节点中移除对象
+        """
+        for position, buffered in enumerate(self._buffer):
+            if buffered is obj:
+                del self._buffer[position]
+                del self._buffer_bounds[position]
+                del self._buffer_centers[position]
+                return
+        obj_bounds = KDTreeNode._get_object_bounds(obj)
+        for level, tree in enumerate(self._trees):
+            if tree is not None and tree.remove(obj, obj_bounds):
+                self._tree_removed[level] += 1
+                return
+    
+    def _count(self) -> int:
+        """
+        存活对象数
+        """
+        stored = sum(len(data[0]) for data in self._tree_data if data is not None)
+        return stored - sum(self._tree_removed) + len(self._buffer)
     
     def insert_batch(self, objects: List[Dict[str, Any]]) -> int:
         """
         批量插入对象
         
+        新对象不少于已有对象时批量装载：已有对象与新对象一起按 Morton 序排列，
+        按对象总数的二进制分解切分为连续的若干段，每段直接构建一棵静态树，
+        余数留在缓冲区，不经过逐个插入和逐级合并；批量较小时逐个插入。
+        
         Args:
             objects: 要插入的对象列表
         
         Returns:
             int: 成功插入的对象数
         """
-        count = 0
-        for obj in objects:
-            if self.insert(obj):
-                count += 1
-        return count
+        if len(objects) < max(self._count(), 1):
+            count = 0
+            for obj in objects:
+                if self.insert(obj):
+                    count += 1
+            return count
+        
+        new_objects, new_bounds = collect_object_bounds(objects)
+        if not new_objects:
+            return 0
+        new_centers = (new_bounds[:, :2] + new_bounds[:, 2:]) / 2
+        for i, obj in enumerate(new_objects):
+            if 'bounds' not in obj:
+                obj['bounds'] = tuple(new_bounds[i].tolist())
+            center = obj.get('center')
+            if center is not None:
+                new_centers[i] = (center[0], center[1])
+        self._reload(new_objects, new_bounds, new_centers)
+        return len(new_objects)
+        
+    def _reload(self, new_objects: List[Dict[str, Any]], new_bounds: np.ndarray, new_centers: np.ndarray) -> None:
+        """
+        存活对象与新对象一起按 Morton 序排列，按总数的二进制分解批量装载为若干静态树，
+        余数留在缓冲区；同时剔除全部墓碑
+        """
+        all_objects: List[Dict[str, Any]] = []
+        bounds_parts = []
+        center_parts = []
+        for level, data in enumerate(self._tree_data):
+            if data is not None:
+                tree_objects, tree_bounds, tree_centers = self._live_data(level)
+                all_objects.extend(tree_objects)
+                bounds_parts.append(tree_bounds)
+                center_parts.append(tree_centers)
+        all_objects.extend(self._buffer)
+        bounds_parts.append(np.asarray(self._buffer_bounds, dtype=float).reshape(-1, 4))
+        center_parts.append(np.asarray(self._buffer_centers, dtype=float).reshape(-1, 2))
+        all_objects.extend(new_objects)
+        bounds_parts.append(new_bounds)
+        center_parts.append(new_centers)
+        bounds_array = np.concatenate(bounds_parts)
+        centers = np.concatenate(center_parts)
+        
+        order = morton_order(centers, self.bounds)
+        all_objects = [all_objects[i] for i in order.tolist()]
+        bounds_array = bounds_array[order]
+        centers = centers[order]
+        
+        self.clear()
+        blocks = len(all_objects) // self.buffer_capacity
+        start = 0
+        for level in range(blocks.bit_length() - 1, -1, -1):
+            if level >= len(self._trees):
+                self._trees.extend([None] * (level + 1 - len(self._trees)))
+                self._tree_data.extend([None] * (level + 1 - len(self._tree_data)))
+                self._tree_removed.extend([0] * (level + 1 - len(self._tree_removed)))
+            if not blocks >> level & 1:
+                continue
+            end = start + self.buffer_capacity * (1 << level)
+            tree_objects = all_objects[start:end]
+            self._trees[level] = self._build_tree(tree_objects, bounds_array[start:end], centers[start:end])
+            self._tree_data[level] = (tree_objects, bounds_array[start:end], centers[start:end])
+            start = end
+        self._buffer = all_objects[start:]
+        self._buffer_bounds = [tuple(b) for b in bounds_array[start:].tolist()]
+        self._buffer_centers = [tuple(c) for c in centers[start:].tolist()]
+        self._by_id = {obj['id']: obj for obj in all_objects if obj.get('id') is not None}
     
     def query_range(self, bounds: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
         """
@@ -286,7 +605,16 @@ class KDTree:
         Returns:
             List[Dict[str, Any]]: 查询到的对象列表
         """
-        return self.root.query_range(bounds)
+        results: List[Dict[str, Any]] = []
+        for tree in self._trees:
+            if tree is not None:
+                results.extend(tree.query_range(bounds))
+        
+        q_min_x, q_min_y, q_max_x, q_max_y = bounds
+        for obj, (min_x, min_y, max_x, max_y) in zip(self._buffer, self._buffer_bounds):
+            if not (max_x < q_min_x or min_x > q_max_x or max_y < q_min_y or min_y > q_max_y):
+                results.append(obj)
+        return results
     
     def query_shapely(self, shapely_obj: Any, min_distance: float = 0.0) -> List[Dict[str, Any]]:
         """
@@ -312,11 +640,68 @@ class KDTree:
         )
         return self.query_range(expanded_bounds)
     
+    def query_knn(self, point: Tuple[float, float], k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离最近的 k 个对象（最佳优先遍历）
+        
+        Args:
+            point: 查询点 (x, y)
+            k: 返回的对象数
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        return self._best_first(point, k=k)
+    
+    def query_radius(self, point: Tuple[float, float], radius: float) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离不超过 radius 的所有对象（最佳优先遍历）
+        
+        Args:
+            point: 查询点 (x, y)
+            radius: 查询半径
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        return self._best_first(point, radius=radius)
+    
+    def _best_first(self, point: Tuple[float, float], k: Optional[int] = None,
+                    radius: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        对森林中所有静态树和插入缓冲区统一做最佳优先遍历（缓冲区作为距离下界为0的节点）
+        """
+        px, py = point
+        
+        def measure(obj: Dict[str, Any], obj_bounds: Tuple[float, float, float, float]) -> tuple:
+            center_x, center_y = get_object_center(obj, obj_bounds)
+            return (math.hypot(center_x - px, center_y - py), id(obj), obj)
+        
+        def expand(node: Optional[KDTreeNode]) -> Tuple[list, list]:
+            if node is None:
+                return [], [measure(obj, obj_bounds) for obj, obj_bounds in zip(self._buffer, self._buffer_bounds)]
+            children = [(point_bounds_distance(point, child.bounds), child)
+                        for child in (node.left, node.right) if child is not None and child.bounds is not None]
+            return children, [measure(obj, KDTreeNode._get_object_bounds(obj)) for obj in node.objects]
+        
+        entries = [(0.0, None)] + [(point_bounds_distance(point, tree.bounds), tree)
+                                   for tree in self._trees if tree is not None and tree.bounds is not None]
+        return best_first_search(entries, expand, k, radius)
+    
     def clear(self) -> None:
         """
         清除KD树中的所有对象
         """
-        self.root.clear()
+        for tree in self._trees:
+            if tree is not None:
+                tree.clear()
+        self._trees = []
+        self._tree_data = []
+        self._tree_removed = []
+        self._by_id = {}
+        self._buffer = []
+        self._buffer_bounds = []
+        self._buffer_centers = []
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -345,10 +730,21 @@ class KDTree:
             
             return node_count, obj_count, max_depth
         
-        total_nodes, total_objects, max_depth = _count_nodes(self.root)
+        total_nodes = 0
+        total_objects = len(self._buffer)
+        max_depth = 0
+        for tree in self._trees:
+            if tree is not None:
+                nodes, objs, depth = _count_nodes(tree)
+                total_nodes += nodes
+                total_objects += objs
+                max_depth = max(max_depth, depth)
         return {
             'total_nodes': total_nodes,
             'total_objects': total_objects,
             'max_depth': max_depth,
-            'max_objects_per_node': self.max_objects
+            'max_objects_per_node': self.max_objects,
+            'tree_count': sum(1 for tree in self._trees if tree is not None),
+            'buffer_size': len(self._buffer),
+            'rebuild_count': self.rebuild_count
         }
@@ -0,0 +1,426 @@
+# core/parallel_engine.py
+
+import os
+import math
+import random
+import logging
+from concurrent.futures import ProcessPoolExecutor, Future
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+
+from .shapes import generate_shape_from_config
+from .grid_index import GridIndex
+from ..utils import adjust_aggregate_to_boundary
+
+try:
+    import shapely
+    from shapely.geometry import Polygon as ShapelyPolygon
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logging.warning("Shapely未安装，多进程候选生成功能将受限")
+
+
+def _build_candidate(shape_config: Dict[str, Any], itz_thickness: float,
+                     region: Tuple[float, float, float, float], max_possible_radius: float,
+                     min_distance: float, boundary_adjust: bool,
+                     sample_region: Optional[Tuple[float, float, float, float]] = None) -> Optional[Dict[str, Any]]:
+    """
+    生成一个候选骨料并完成几何预校验（不做碰撞检测）
+    
+    Args:
+        sample_region: 中心点采样范围，默认为 region 内缩半个最大半径
+    
+    Returns:
+        Optional[Dict[str, Any]]: 候选数据，几何无效时返回None
+    """
+    min_x, min_y, max_x, max_y = region
+    if sample_region is None:
+        buffer = max_possible_radius * 0.5
+        sample_region = (min_x + buffer, min_y + buffer, max_x - buffer, max_y - buffer)
+    center = (random.uniform(sample_region[0], sample_region[2]),
+              random.uniform(sample_region[1], sample_region[3]))
+    
+    shape_data = generate_shape_from_config(shape_config, center)
+    if not shape_data:
+        return None
+    points, actual_radius, area, shape_info, _ = shape_data
+    
+    adjusted = False
+    if boundary_adjust:
+        result = adjust_aggregate_to_boundary(
+            center, points, actual_radius + itz_thickness,
+            (min_x, min_y), (max_x, max_y), min_distance
+        )
+        if result is not None:
+            center, points, actual_radius = result
+            adjusted = True
+    
+    if len(points) < 3:
+        return None
+    polygon = ShapelyPolygon(points)
+    if polygon.is_empty or not polygon.is_valid or polygon.area <= 0:
+        return None
+    if adjusted:
+        area = polygon.area
+    
+    itz_coords = None
+    if itz_thickness > 0:
+        itz_polygon = polygon.buffer(itz_thickness)
+        itz_coords = np.asarray(itz_polygon.exterior.coords, dtype=float)
+    
+    return {
+        "center": center,
+        "radius": actual_radius,
+        "area": area,
+        "points": np.asarray(points, dtype=float),
+        "itz_points": itz_coords,
+        "shape_info": shape_info,
+        "adjusted": adjusted
+    }
+
+
+def pack_candidates(candidates: List[Dict[str, Any]], group_id: int, itz_thickness: float,
+                    attempts: int) -> Dict[str, Any]:
+    """
+    把候选骨料打包为紧凑的数组结构（坐标扁平存储 + 偏移量），便于跨进程传输
+    
+    Args:
+        candidates: _build_candidate 返回的候选列表
+        group_id: 所属组ID
+        itz_thickness: ITZ厚度
+        attempts: 生成尝试次数（含预校验失败的）
+    
+    Returns:
+        Dict[str, Any]: 打包后的候选批次
+    """
+    n = len(candidates)
+    point_counts = [len(c["points"]) for c in candidates]
+    itz_counts = [len(c["itz_points"]) if c["itz_points"] is not None else 0 for c in candidates]
+    
+    return {
+        "group_id": group_id,
+        "itz_thickness": itz_thickness,
+        "attempts": attempts,
+        "centers": np.asarray([c["center"] for c in candidates], dtype=float).reshape(n, 2),
+        "radii": np.asarray([c["radius"] for c in candidates], dtype=float),
+        "areas": np.asarray([c["area"] for c in candidates], dtype=float),
+        "adjusted": np.asarray([c["adjusted"] for c in candidates], dtype=bool),
+        "coords": (np.concatenate([c["points"] for c in candidates])
+                   if n else np.empty((0, 2), dtype=float)),
+        "offsets": np.concatenate([[0], np.cumsum(point_counts)]).astype(np.int64),
+        "itz_coords": (np.concatenate([c["itz_points"] for c in candidates if c["itz_points"] is not None])
+                       if any(itz_counts) else np.empty((0, 2), dtype=float)),
+        "itz_offsets": np.concatenate([[0], np.cumsum(itz_counts)]).astype(np.int64),
+        "shape_info": [c["shape_info"] for c in candidates]
+    }
+
+
+def pack_aggregates(aggregates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    把已接受的骨料按组打包为候选批次，用于向分块工作进程传递光晕区内的已有骨料
+    
+    Args:
+        aggregates: 骨料数据列表（需包含 shapely_itz 或 itz_thickness 为0）
+    
+    Returns:
+        List[Dict[str, Any]]: 每个组一个候选批次
+    """
+    by_group: Dict[Tuple[int, float], List[Dict[str, Any]]] = {}
+    for agg in aggregates:
+        itz_thickness = agg.get("itz_thickness", 0.0)
+        itz_polygon = agg.get("shapely_itz")
+        by_group.setdefault((agg["group_id"], itz_thickness), []).append({
+            "center": agg["center"],
+            "radius": agg["radius"],
+            "area": agg["area"],
+            "points": np.asarray(agg["points"], dtype=float),
+            "itz_points": (np.asarray(itz_polygon.exterior.coords, dtype=float)
+                           if itz_polygon is not None else None),
+            "shape_info": agg["shape_info"],
+            "adjusted": agg.get("primitive") is None
+        })
+    return [pack_candidates(candidates, group_id, itz_thickness, 0)
+            for (group_id, itz_thickness), candidates in by_group.items()]
+
+
+def plan_tiles(region: Tuple[float, float, float, float], halo: float,
+               target_tiles: int) -> List[Tuple[Tuple[float, float, float, float], int]]:
+    """
+    把区域划分为规则分块，并按 2×2 奇偶性分为4个相位
+    
+    同一相位的分块之间至少隔开一个分块宽度；分块边长不小于两倍光晕宽度，
+    因此同一相位内各分块的骨料互不干涉，可以并行填充。
+    
+    Args:
+        region: 区域 (min_x, min_y, max_x, max_y)
+        halo: 光晕宽度（最大半径 + ITZ + 最小间距）
+        target_tiles: 期望的分块数
+    
+    Returns:
+        List[Tuple[Tuple[float, float, float, float], int]]: (分块边界, 相位) 列表，按相位排序
+    """
+    min_x, min_y, max_x, max_y = region
+    width = max_x - min_x
+    height = max_y - min_y
+    
+    nx = max(1, int(round(math.sqrt(target_tiles * width / height))))
+    ny = max(1, int(round(target_tiles / nx)))
+    if halo > 0:
+        nx = max(1, min(nx, int(width // (2 * halo))))
+        ny = max(1, min(ny, int(height // (2 * halo))))
+    
+    tile_w = width / nx
+    tile_h = height / ny
+    tiles = []
+    for iy in range(ny):
+        for ix in range(nx):
+            bounds = (min_x + ix * tile_w, min_y + iy * tile_h,
+                      min_x + (ix + 1) * tile_w, min_y + (iy + 1) * tile_h)
+            tiles.append((bounds, (iy % 2) * 2 + ix % 2))
+    tiles.sort(key=lambda t: t[1])
+    return tiles
+
+
+def pack_tile(task: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    工作进程入口：在一个分块内独立完成随机顺序填充
+    
+    中心点只在分块内采样；光晕区内由先前相位接受的骨料作为障碍物预先插入
+    本地网格索引，候选按与主进程相同的碰撞规则判定。
+    
+    Args:
+        task: 任务描述，包含 seed、tile、region、existing（光晕区已有骨料批次）、
+              groups（id、shapes、itz_thickness 及本分块的 max_count、target_area 配额）、
+              target_area（孔隙度模式下的分块总面积配额，0表示不限）、max_possible_radius、
+              min_distance、allow_touching、boundary_adjust、cell_size、max_failures
+    
+    Returns:
+        List[Dict[str, Any]]: 本分块接受的骨料，每个组一个候选批次
+    """
+    from .collision import check_aggregate_collision
+    
+    random.seed(task["seed"])
+    tile = task["tile"]
+    region = task["region"]
+    max_possible_radius = task["max_possible_radius"]
+    min_distance = task["min_distance"]
+    
+    buffer = max_possible_radius * 0.5
+    sample_region = (max(tile[0], region[0] + buffer), max(tile[1], region[1] + buffer),
+                     min(tile[2], region[2] - buffer), min(tile[3], region[3] - buffer))
+    if sample_region[0] >= sample_region[2] or sample_region[1] >= sample_region[3]:
+        return []
+    
+    local_index = GridIndex(region, cell_size=task["cell_size"])
+    for batch in task["existing"]:
+        local_index.insert_batch(unpack_candidate_batch(batch))
+    
+    groups = task["groups"]
+    counts = {g["id"]: 0 for g in groups}
+    areas = {g["id"]: 0.0 for g in groups}
+    accepted: Dict[int, List[Dict[str, Any]]] = {g["id"]: [] for g in groups}
+    total_area = 0.0
+    failures = 0
+    
+    while failures < task["max_failures"]:
+        if task["target_area"] > 0 and total_area >= task["target_area"]:
+            break
+        available = [g for g in groups if counts[g["id"]] < g["max_count"]]
+        if not available:
+            break
+        group = min(available, key=lambda g: areas[g["id"]] / g["target_area"] if g["target_area"] > 0 else 0)
+        
+        shapes = group["shapes"]
+        shape_config = random.choices(shapes, weights=[s["weight"] for s in shapes], k=1)[0]
+        itz_thickness = group["itz_thickness"]
+        try:
+            candidate = _build_candidate(
+                shape_config, itz_thickness, region, max_possible_radius,
+                min_distance, task["boundary_adjust"], sample_region
+            )
+        except Exception as e:
+            logging.warning(f"分块工作进程生成候选失败: {str(e)}")
+            candidate = None
+        if candidate is None:
+            failures += 1
+            continue
+        
+        agg_data = unpack_candidate_batch(pack_candidates([candidate], group["id"], itz_thickness, 1))[0]
+        if check_aggregate_collision(agg_data, local_index, min_distance, task["allow_touching"]):
+            failures += 1
+            continue
+        
+        local_index.insert(agg_data)
+        accepted[group["id"]].append(candidate)
+        counts[group["id"]] += 1
+        areas[group["id"]] += candidate["area"]
+        total_area += candidate["area"]
+        failures = 0
+    
+    return [pack_candidates(accepted[g["id"]], g["id"], g["itz_thickness"], counts[g["id"]])
+            for g in groups if accepted[g["id"]]]
+
+
+def generate_candidate_batch(task: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    工作进程入口：为一个组批量生成并预校验候选骨料
+    
+    Args:
+        task: 任务描述，包含 seed、group_id、shapes、itz_thickness、region、
+              max_possible_radius、min_distance、boundary_adjust、batch_size
+    
+    Returns:
+        Dict[str, Any]: pack_candidates 打包的候选批次
+    """
+    random.seed(task["seed"])
+    shapes = task["shapes"]
+    weights = [s["weight"] for s in shapes]
+    itz_thickness = task["itz_thickness"]
+    
+    candidates = []
+    for _ in range(task["batch_size"]):
+        shape_config = random.choices(shapes, weights=weights, k=1)[0]
+        try:
+            candidate = _build_candidate(
+                shape_config, itz_thickness, task["region"], task["max_possible_radius"],
+                task["min_distance"], task["boundary_adjust"]
+            )
+        except Exception as e:
+            logging.warning(f"工作进程生成候选失败: {str(e)}")
+            candidate = None
+        if candidate is not None:
+            candidates.append(candidate)
+    
+    return pack_candidates(candidates, task["group_id"], itz_thickness, task["batch_size"])
+
+
+def unpack_candidate_batch(batch: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    在主进程中把候选批次还原为骨料数据字典
+    
+    多边形和ITZ通过 shapely.linearrings/polygons 向量化一次构建，无需重新 buffer()。
+    圆/椭圆（未经贴边裁剪）附带解析图元，可直接走解析碰撞路径。
+    
+    Args:
+        batch: generate_candidate_batch 返回的候选批次
+    
+    Returns:
+        List[Dict[str, Any]]: 骨料数据列表
+    """
+    from .collision import make_primitive
+    
+    n = len(batch["radii"])
+    if n == 0:
+        return []
+    
+    offsets = batch["offsets"]
+    ring_ids = np.repeat(np.arange(n), np.diff(offsets))
+    polygons = shapely.polygons(shapely.linearrings(batch["coords"], indices=ring_ids))
+    
+    itz_polygons = [None] * n
+    itz_offsets = batch["itz_offsets"]
+    itz_counts = np.diff(itz_offsets)
+    if itz_counts.any():
+        has_itz = np.flatnonzero(itz_counts)
+        itz_ring_ids = np.repeat(np.arange(len(has_itz)), itz_counts[has_itz])
+        built = shapely.polygons(shapely.linearrings(batch["itz_coords"], indices=itz_ring_ids))
+        for k, i in enumerate(has_itz):
+            itz_polygons[i] = built[k]
+    
+    itz_thickness = batch["itz_thickness"]
+    aggregates = []
+    for i in range(n):
+        center = (float(batch["centers"][i, 0]), float(batch["centers"][i, 1]))
+        shape_info = batch["shape_info"][i]
+        points = [(float(x), float(y)) for x, y in batch["coords"][offsets[i]:offsets[i + 1]]]
+        aggregates.append({
+            "center": center,
+            "radius": float(batch["radii"][i]),
+            "area": float(batch["areas"][i]),
+            "points": points,
+            "shape_info": shape_info,
+            "group_id": batch["group_id"],
+            "itz_thickness": itz_thickness,
+            "shapely_obj": polygons[i],
+            "shapely_itz": itz_polygons[i],
+            "primitive": None if batch["adjusted"][i] else make_primitive(shape_info, center, itz_thickness)
+        })
+    return aggregates
+
+
+class ProcessCandidateEngine:
+    """
+    多进程候选生成引擎
+    
+    工作进程负责形状构造、贴边优化、几何校验和ITZ缓冲等受 GIL 限制的计算，
+    以紧凑数组返回候选批次；主进程只需对照空间索引做最终接受判定。
+    """
+    
+    def __init__(self, max_workers: Optional[int] = None, batch_size: int = 64):
+        """
+        Args:
+            max_workers: 工作进程数，默认使用全部 CPU 核心
+            batch_size: 每个任务生成的候选数
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.batch_size = batch_size
+        self.max_in_flight = self.max_workers * 2
+        self.executor: Optional[ProcessPoolExecutor] = None
+    
+    def start(self) -> None:
+        """
+        启动进程池
+        """
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            logging.info(f"创建进程池，工作进程数: {self.max_workers}，批大小: {self.batch_size}")
+    
+    def submit(self, group: Dict[str, Any], region: Tuple[float, float, float, float],
+               max_possible_radius: float, min_distance: float, boundary_adjust: bool) -> Future:
+        """
+        为指定组提交一个候选批次任务
+        
+        只传递形状配置等轻量数据，组内已生成的 Shapely 对象不会被序列化。
+        """
+        if self.executor is None:
+            self.start()
+        task = {
+            "seed": random.getrandbits(63),
+            "group_id": group['id'],
+            "shapes": group['shapes'],
+            "itz_thickness": group.get('itz_thickness', 0.0),
+            "region": region,
+            "max_possible_radius": max_possible_radius,
+            "min_distance": min_distance,
+            "boundary_adjust": boundary_adjust,
+            "batch_size": self.batch_size
+        }
+        return self.executor.submit(generate_candidate_batch, task)
+    
+    def submit_tile(self, task: Dict[str, Any]) -> Future:
+        """
+        提交一个分块填充任务（任务格式见 pack_tile）
+        """
+        if self.executor is None:
+            self.start()
+        task = dict(task, seed=random.getrandbits(63))
+        return self.executor.submit(pack_tile, task)
+    
+    def shutdown(self) -> None:
+        """
+        关闭进程池，取消尚未开始的任务
+        """
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+            logging.info("进程池已关闭")
+    
+    def __enter__(self):
+        self.start()
+        return self
+    
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.shutdown()
+        return False
@@ -1,8 +1,14 @@
 # core/quadtree.py
 
+import math
 import logging
 from typing import List, Tuple, Dict, Any, Optional, Union
 
+import numpy as np
+
+from .spatial_index import (get_object_bounds, collect_object_bounds, get_object_center, move_object_bounds,
+                            point_bounds_distance, best_first_search)
+
 try:
     from shapely.geometry import Polygon  # noqa: F401
     SHAPELY_AVAILABLE = True
@@ -11,7 +17,8 @@ except ImportError:
     logging.warning("Shapely未安装，四叉树空间查询功能将受限")
 
 class QuadtreeNode:
-    def __init__(self, bounds: Tuple[float, float, float, float], depth: int = 0, max_depth: int = 5, max_objects: int = 10):
+    def __init__(self, bounds: Tuple[float, float, float, float], depth: int = 0, max_depth: int = 5, max_objects: int = 10,
+                 loose: bool = False, looseness: float = 2.0):
         """
         四叉树节点初始化
         
@@ -20,12 +27,27 @@ class QuadtreeNode:
             depth: 当前节点深度
             max_depth: 最大深度
             max_objects: 节点内最大对象数，超过则分裂
+            loose: 是否为松散四叉树节点（每个对象按中心只存放一次）
+            looseness: 松散系数，松散边界边长为节点边长的倍数
         """
         self.bounds = bounds
         self.depth = depth
         self.max_depth = max_depth
         self.max_objects = max_objects
+        self.loose = loose
+        self.looseness = looseness
+        # 查询时使用的节点边界：松散模式下按松散系数向四周扩展，否则与 bounds 相同
+        if loose:
+            min_x, min_y, max_x, max_y = bounds
+            pad_x = (max_x - min_x) * (looseness - 1.0) / 2
+            pad_y = (max_y - min_y) * (looseness - 1.0) / 2
+            self.loose_bounds = (min_x - pad_x, min_y - pad_y, max_x + pad_x, max_y + pad_y)
+        else:
+            self.loose_bounds = bounds
         self.objects: List[Dict[str, Any]] = []
+        # 与 objects 一一对应：插入时取得的边界和对象编号，查询时不再访问几何体
+        self.object_bounds: List[Tuple[float, float, float, float]] = []
+        self.object_ids: List[int] = []
         self.children: List[Optional[QuadtreeNode]] = [None, None, None, None]  # 四个子节点：NW, NE, SW, SE
         self.is_divided = False
     
@@ -41,35 +63,68 @@ class QuadtreeNode:
         mid_y = (min_y + max_y) / 2
         
         # 创建四个子节点
-        self.children[0] = QuadtreeNode((min_x, mid_y, mid_x, max_y), self.depth + 1, self.max_depth, self.max_objects)  # NW
-        self.children[1] = QuadtreeNode((mid_x, mid_y, max_x, max_y), self.depth + 1, self.max_depth, self.max_objects)  # NE
-        self.children[2] = QuadtreeNode((min_x, min_y, mid_x, mid_y), self.depth + 1, self.max_depth, self.max_objects)  # SW
-        self.children[3] = QuadtreeNode((mid_x, min_y, max_x, mid_y), self.depth + 1, self.max_depth, self.max_objects)  # SE
+        args = (self.depth + 1, self.max_depth, self.max_objects, self.loose, self.looseness)
+        self.children[0] = QuadtreeNode((min_x, mid_y, mid_x, max_y), *args)  # NW
+        self.children[1] = QuadtreeNode((mid_x, mid_y, max_x, max_y), *args)  # NE
+        self.children[2] = QuadtreeNode((min_x, min_y, mid_x, mid_y), *args)  # SW
+        self.children[3] = QuadtreeNode((mid_x, min_y, max_x, mid_y), *args)  # SE
         
         self.is_divided = True
+        
+        if self.loose:
+            # 松散模式下把已有对象下移到能容纳它们的子节点
+            objects, object_bounds, object_ids = self.objects, self.object_bounds, self.object_ids
+            self.objects, self.object_bounds, self.object_ids = [], [], []
+            for obj, obj_bounds, obj_id in zip(objects, object_bounds, object_ids):
+                child = self._loose_child(obj_bounds)
+                (child or self)._append(obj, obj_bounds, obj_id)
     
-    def insert(self, obj: Dict[str, Any]) -> bool:
+    def _loose_child(self, obj_bounds: Tuple[float, float, float, float]) -> Optional['QuadtreeNode']:
+        """
+        松散模式：返回对象中心所在的子节点，其松散边界不能完整容纳对象时返回None
+        """
+        min_x, min_y, max_x, max_y = self.bounds
+        center_x = (obj_bounds[0] + obj_bounds[2]) / 2
+        center_y = (obj_bounds[1] + obj_bounds[3]) / 2
+        quadrant = (0 if center_x < (min_x + max_x) / 2 else 1) + (0 if center_y >= (min_y + max_y) / 2 else 2)
+        child = self.children[quadrant]
+        child_min_x, child_min_y, child_max_x, child_max_y = child.loose_bounds
+        if (obj_bounds[0] >= child_min_x and obj_bounds[1] >= child_min_y
+                and obj_bounds[2] <= child_max_x and obj_bounds[3] <= child_max_y):
+            return child
+        return None
+    
+    def insert(self, obj: Dict[str, Any], obj_bounds: Optional[Tuple[float, float, float, float]] = None,
+               obj_id: int = -1) -> bool:
         """
         插入对象到四叉树
         
         Args:
-            obj: 要插入的对象，必须包含shapely_obj或shapely_itz属性
+            obj: 要插入的对象，必须包含bounds、shapely_obj或shapely_itz属性
+            obj_bounds: 已知的对象边界，省略时从对象获取（只获取一次，向子节点传递）
+            obj_id: 对象编号，供 query_ids 返回
         
         Returns:
             bool: 是否成功插入
         """
         # 检查对象是否在当前节点边界内
-        shapely_obj = obj.get('shapely_obj') or obj.get('shapely_itz')
-        if not shapely_obj or not SHAPELY_AVAILABLE:
+        if not SHAPELY_AVAILABLE:
             return False
+        if obj_bounds is None:
+            obj_bounds = get_object_bounds(obj)
+            if obj_bounds is None:
+                return False
         
-        obj_bounds = shapely_obj.bounds
         if not self._intersects_bounds(obj_bounds):
             return False
         
+        if self.loose:
+            self._insert_loose(obj, obj_bounds, obj_id)
+            return True
+        
         # 如果当前节点未分裂且对象数量未达上限，直接插入
         if not self.is_divided and len(self.objects) < self.max_objects:
-            self.objects.append(obj)
+            self._append(obj, obj_bounds, obj_id)
             return True
         
         # 如果未分裂且达到上限，分裂节点
@@ -79,15 +134,69 @@ class QuadtreeNode:
         # 尝试插入到子节点
         inserted = False
         for child in self.children:
-            if child and child.insert(obj):
+            if child and child.insert(obj, obj_bounds, obj_id):
                 inserted = True
         
         # 如果无法插入到任何子节点，保留在当前节点
         if not inserted:
-            self.objects.append(obj)
+            self._append(obj, obj_bounds, obj_id)
         
         return True
     
+    def _insert_loose(self, obj: Dict[str, Any], obj_bounds: Tuple[float, float, float, float], obj_id: int) -> None:
+        """
+        松散模式插入：沿对象中心所在的子节点逐级下降，放入能完整容纳对象的最深节点
+        """
+        node = self
+        while True:
+            if not node.is_divided:
+                if len(node.objects) < node.max_objects or node.depth >= node.max_depth:
+                    break
+                node._divide()
+            child = node._loose_child(obj_bounds)
+            if child is None:
+                break
+            node = child
+        node._append(obj, obj_bounds, obj_id)
+    
+    def _append(self, obj: Dict[str, Any], obj_bounds: Tuple[float, float, float, float], obj_id: int) -> None:
+        """
+        把对象及其边界、编号保存到本节点
+        """
+        self.objects.append(obj)
+        self.object_bounds.append(obj_bounds)
+        self.object_ids.append(obj_id)
+    
+    def remove(self, obj_id: int, obj_bounds: Tuple[float, float, float, float]) -> bool:
+        """
+        从与对象边界相交的节点中删除编号为 obj_id 的对象（默认模式下删除全部副本），
+        子节点全部变为空叶节点时撤销分裂
+        
+        Args:
+            obj_id: 对象编号
+            obj_bounds: 插入时的对象边界
+        
+        Returns:
+            bool: 是否找到并删除
+        """
+        if not self._intersects_bounds(obj_bounds, self.loose_bounds):
+            return False
+        removed = False
+        if obj_id in self.object_ids:
+            position = self.object_ids.index(obj_id)
+            del self.objects[position]
+            del self.object_bounds[position]
+            del self.object_ids[position]
+            removed = True
+        if self.is_divided and not (removed and self.loose):
+            for child in self.children:
+                if child and child.remove(obj_id, obj_bounds):
+                    removed = True
+            if removed and all(not child.is_divided and not child.objects for child in self.children):
+                self.children = [None, None, None, None]
+                self.is_divided = False
+        return removed
+    
     def query_range(self, bounds: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
         """
         查询指定边界内的所有对象
@@ -100,16 +209,12 @@ class QuadtreeNode:
         """
         results: List[Dict[str, Any]] = []
         
-        # 如果查询边界与当前节点边界不相交，返回空列表
-        if not self._intersects_bounds(bounds):
+        # 如果查询边界与当前节点（松散）边界不相交，返回空列表
+        if not self._intersects_bounds(bounds, self.loose_bounds):
             return results
         
-        # 检查当前节点中的对象
-        for obj in self.objects:
-            shapely_obj = obj.get('shapely_obj') or obj.get('shapely_itz')
-            if not shapely_obj or not SHAPELY_AVAILABLE:
-                continue
-            obj_bounds = shapely_obj.bounds
+        # 检查当前节点中的对象（使用插入时取得的边界）
+        for obj, obj_bounds in zip(self.objects, self.object_bounds):
             if self._intersects_bounds(obj_bounds, bounds):
                 results.append(obj)
         
@@ -121,6 +226,24 @@ class QuadtreeNode:
         
         return results
     
+    def collect_ids(self, bounds: Tuple[float, float, float, float], out: List[int]) -> None:
+        """
+        单个查询：收集边界与查询范围相交的对象编号（可能重复）
+        
+        Args:
+            bounds: 查询边界 (min_x, min_y, max_x, max_y)
+            out: 输出编号列表
+        """
+        if not self._intersects_bounds(bounds, self.loose_bounds):
+            return
+        for obj_id, obj_bounds in zip(self.object_ids, self.object_bounds):
+            if self._intersects_bounds(obj_bounds, bounds):
+                out.append(obj_id)
+        if self.is_divided:
+            for child in self.children:
+                if child:
+                    child.collect_ids(bounds, out)
+    
     def _intersects_bounds(self, bounds1: Tuple[float, float, float, float], 
                           bounds2: Optional[Tuple[float, float, float, float]] = None) -> bool:
         """
@@ -150,6 +273,8 @@ class QuadtreeNode:
         清除节点及其子节点中的所有对象
         """
         self.objects.clear()
+        self.object_bounds.clear()
+        self.object_ids.clear()
         
         if self.is_divided:
             for child in self.children:
@@ -159,17 +284,63 @@ class QuadtreeNode:
             self.is_divided = False
 
 class Quadtree:
-    def __init__(self, bounds: Tuple[float, float, float, float], max_depth: int = 5, max_objects: int = 10):
+    def __init__(self, bounds: Tuple[float, float, float, float], max_depth: int = 5, max_objects: int = 10,
+                 loose: bool = False, looseness: float = 2.0):
         """
         四叉树初始化
         
+        默认模式下跨越多个子节点的对象会复制到每个子节点中；松散模式下子节点
+        边界按松散系数扩展，每个对象按中心只存放在一个节点中，查询结果天然不重复，
+        分裂时已有对象随之下移，不会在根节点堆积。
+        
+        删除只访问与对象边界相交的节点；对象的内部编号留作墓碑，墓碑超过
+        编号总数的一半时压缩重建。更新时从原节点删除后按新边界重新插入。
+        
         Args:
             bounds: 四叉树边界 (min_x, min_y, max_x, max_y)
             max_depth: 最大深度
             max_objects: 节点内最大对象数
+            loose: 是否使用松散四叉树模式
+            looseness: 松散系数（大于1），松散边界边长为节点边长的倍数
         """
-        self.root = QuadtreeNode(bounds, max_depth=max_depth, max_objects=max_objects)
+        if looseness <= 1.0:
+            raise ValueError("松散系数必须大于1")
+        self.root = QuadtreeNode(bounds, max_depth=max_depth, max_objects=max_objects,
+                                 loose=loose, looseness=looseness)
         self.bounds = bounds
+        self.loose = loose
+        self._reset_cache()
+    
+    def _reset_cache(self, capacity: int = 256) -> None:
+        """
+        重置按对象编号保存的边界缓存
+        
+        对象在插入时取得一次边界，按内部编号保存在 (N, 4) 数组中；对象带有
+        id 字段（骨料编号）时以其作为键，否则以内部编号作为键。
+        """
+        self._objects: List[Optional[Dict[str, Any]]] = []
+        self._bounds_array = np.empty((capacity, 4), dtype=float)
+        self._keys = np.empty(capacity, dtype=np.int64)
+        self._flat: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None
+        # 对象 id 字段 -> 内部编号；已删除的内部编号在 _objects 中为 None
+        self._slots: Dict[Any, int] = {}
+        self._removed = 0
+    
+    def _ensure_capacity(self, size: int) -> None:
+        """
+        边界缓存容量不足时按倍数扩容
+        """
+        capacity = self._bounds_array.shape[0]
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        count = len(self._objects)
+        bounds_array = np.empty((capacity, 4), dtype=float)
+        bounds_array[:count] = self._bounds_array[:count]
+        keys = np.empty(capacity, dtype=np.int64)
+        keys[:count] = self._keys[:count]
+        self._bounds_array, self._keys = bounds_array, keys
     
     def insert(self, obj: Dict[str, Any]) -> bool:
         """
@@ -181,23 +352,245 @@ class Quadtree:
         Returns:
             bool: 是否成功插入
         """
-        return self.root.insert(obj)
+        obj_bounds = get_object_bounds(obj)
+        if obj_bounds is None:
+            return False
+        slot = len(self._objects)
+        if not self.root.insert(obj, obj_bounds, slot):
+            return False
+        
+        self._ensure_capacity(slot + 1)
+        self._bounds_array[slot] = obj_bounds
+        key = obj.get('id')
+        self._keys[slot] = slot if key is None else key
+        if key is not None:
+            self._slots[key] = slot
+        self._objects.append(obj)
+        self._flat = None
+        return True
+    
+    def remove(self, obj_id: Any) -> bool:
+        """
+        按对象的 id 字段删除对象
+        
+        Args:
+            obj_id: 对象的 id 字段
+        
+        Returns:
+            bool: 是否找到并删除
+        """
+        slot = self._slots.pop(obj_id, None)
+        if slot is None:
+            return False
+        self.root.remove(slot, tuple(self._bounds_array[slot].tolist()))
+        self._objects[slot] = None
+        self._removed += 1
+        self._flat = None
+        if self._removed > len(self._objects) // 2:
+            self._compact_slots()
+            self.root.clear()
+            self._bulk_build(np.arange(len(self._objects)))
+        return True
+    
+    def update(self, obj_id: Any, new_bounds: Tuple[float, float, float, float],
+               obj: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        把对象移动到新边界：从原节点删除后按新边界重新插入，内部编号不变
+        
+        Args:
+            obj_id: 对象的 id 字段
+            new_bounds: 新边界 (min_x, min_y, max_x, max_y)
+            obj: 替换保存的对象（如位置更新后的新记录），省略时保留原对象并同步其 bounds 和 center 字段
+        
+        Returns:
+            bool: 是否找到并更新；新边界与四叉树边界不相交时对象被删除，返回False
+        """
+        slot = self._slots.get(obj_id)
+        if slot is None:
+            return False
+        new_bounds = tuple(float(v) for v in new_bounds)
+        if not self.root._intersects_bounds(new_bounds):
+            self.remove(obj_id)
+            return False
+        old_bounds = tuple(self._bounds_array[slot].tolist())
+        self.root.remove(slot, old_bounds)
+        if obj is None:
+            move_object_bounds(self._objects[slot], old_bounds, new_bounds)
+        else:
+            self._objects[slot] = obj
+        self.root.insert(self._objects[slot], new_bounds, slot)
+        self._bounds_array[slot] = new_bounds
+        self._flat = None
+        return True
+    
+    def _compact_slots(self) -> None:
+        """
+        丢弃墓碑，存活对象按原顺序重新编号（节点中的编号随之失效，需重建树）
+        """
+        live = [slot for slot, obj in enumerate(self._objects) if obj is not None]
+        count = len(live)
+        self._objects = [self._objects[slot] for slot in live]
+        self._bounds_array[:count] = self._bounds_array[live]
+        self._keys[:count] = self._keys[live]
+        self._slots = {obj['id']: slot for slot, obj in enumerate(self._objects) if obj.get('id') is not None}
+        self._removed = 0
+    
+    def _flatten(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        把节点结构展开为数组快照，供批量查询使用（插入后失效，下次批量查询时重建）
+        
+        Returns:
+            Tuple: 节点边界 (M, 4)、首个子节点编号（四个子节点连续，-1 表示叶节点）、
+            节点对象偏移 (M + 1) 和按节点排列的对象编号
+        """
+        if self._flat is not None:
+            return self._flat
+        nodes = [self.root]
+        first_child: List[int] = []
+        position = 0
+        while position < len(nodes):
+            node = nodes[position]
+            position += 1
+            if node.is_divided:
+                first_child.append(len(nodes))
+                nodes.extend(node.children)
+            else:
+                first_child.append(-1)
+        counts = np.fromiter((len(node.object_ids) for node in nodes), dtype=np.intp, count=len(nodes))
+        offsets = np.zeros(len(nodes) + 1, dtype=np.intp)
+        np.cumsum(counts, out=offsets[1:])
+        self._flat = (
+            np.asarray([node.loose_bounds for node in nodes], dtype=float),
+            np.asarray(first_child, dtype=np.intp),
+            offsets,
+            np.fromiter((obj_id for node in nodes for obj_id in node.object_ids), dtype=np.intp, count=int(offsets[-1]))
+        )
+        return self._flat
     
     def insert_batch(self, objects: List[Dict[str, Any]]) -> int:
         """
         批量插入对象
         
+        新对象不少于已有对象时批量装载：一次取得全部边界，连同已有对象自顶向下
+        重建整棵树，每个节点用一次向量化判定把对象分配到子节点；批量较小时逐个插入。
+        
         Args:
             objects: 要插入的对象列表
         
         Returns:
             int: 成功插入的对象数
         """
-        count = 0
-        for obj in objects:
-            if self.insert(obj):
-                count += 1
-        return count
+        if len(objects) < max(len(self._objects) - self._removed, 1):
+            count = 0
+            for obj in objects:
+                if self.insert(obj):
+                    count += 1
+            return count
+        if not SHAPELY_AVAILABLE:
+            return 0
+        
+        new_objects, new_bounds = collect_object_bounds(objects)
+        min_x, min_y, max_x, max_y = self.bounds
+        inside = ~((new_bounds[:, 2] < min_x) | (new_bounds[:, 0] > max_x) |
+                   (new_bounds[:, 3] < min_y) | (new_bounds[:, 1] > max_y))
+        if not inside.any():
+            return 0
+        new_objects = [obj for obj, keep in zip(new_objects, inside.tolist()) if keep]
+        new_bounds = new_bounds[inside]
+        
+        if self._removed:
+            self._compact_slots()
+        start = len(self._objects)
+        total = start + len(new_objects)
+        self._ensure_capacity(total)
+        self._bounds_array[start:total] = new_bounds
+        self._keys[start:total] = [slot if obj.get('id') is None else obj['id']
+                                   for slot, obj in enumerate(new_objects, start)]
+        self._slots.update((obj['id'], slot) for slot, obj in enumerate(new_objects, start)
+                           if obj.get('id') is not None)
+        self._objects.extend(new_objects)
+        self._flat = None
+        
+        self.root.clear()
+        self._bulk_build(np.arange(total))
+        return len(new_objects)
+    
+    def _bulk_build(self, slots: np.ndarray) -> None:
+        """
+        从根节点自顶向下逐层构建树，把编号为 slots 的对象分配到各节点
+        
+        同一层的所有 (节点, 对象) 对一次向量化处理。超过 max_objects 且未达最大深度
+        的节点分裂：默认模式下对象分配到所有相交的子节点（副本总数超过对象数两倍、
+        即对象相对节点过大时不再分裂）；松散模式下按中心所在子节点分配，子节点
+        松散边界容纳不下的对象留在本节点。
+        """
+        bounds_array = self._bounds_array[:len(self._objects)]
+        bounds_list = [tuple(b) for b in bounds_array.tolist()]
+        objects = self._objects
+        root = self.root
+        
+        nodes = [root]
+        pair_node = np.zeros(len(slots), dtype=np.intp)
+        pair_slot = np.asarray(slots, dtype=np.intp)
+        while nodes:
+            counts = np.bincount(pair_node, minlength=len(nodes))
+            split = counts > root.max_objects
+            if nodes[0].depth >= root.max_depth:
+                split[:] = False
+            
+            node_rect = np.asarray([node.bounds for node in nodes], dtype=float)
+            mids = (node_rect[:, :2] + node_rect[:, 2:]) / 2
+            obj_bounds = bounds_array[pair_slot]
+            pair_mid = mids[pair_node]
+            if self.loose:
+                centers = (obj_bounds[:, :2] + obj_bounds[:, 2:]) / 2
+                east = centers[:, 0] >= pair_mid[:, 0]
+                south = centers[:, 1] < pair_mid[:, 1]
+                quadrant = east.astype(np.intp) + 2 * south
+                # 子节点的紧边界与松散边界
+                rect = node_rect[pair_node]
+                child_min = np.column_stack((np.where(east, pair_mid[:, 0], rect[:, 0]),
+                                             np.where(south, rect[:, 1], pair_mid[:, 1])))
+                child_max = np.column_stack((np.where(east, rect[:, 2], pair_mid[:, 0]),
+                                             np.where(south, pair_mid[:, 1], rect[:, 3])))
+                pad = (child_max - child_min) * (root.looseness - 1.0) / 2
+                fits = ((obj_bounds[:, :2] >= child_min - pad) & (obj_bounds[:, 2:] <= child_max + pad)).all(axis=1)
+                move = split[pair_node] & fits
+            else:
+                west = obj_bounds[:, 0] <= pair_mid[:, 0]
+                east = obj_bounds[:, 2] >= pair_mid[:, 0]
+                north = obj_bounds[:, 3] >= pair_mid[:, 1]
+                south = obj_bounds[:, 1] <= pair_mid[:, 1]
+                masks = np.column_stack((west & north, east & north, west & south, east & south))
+                copies = np.bincount(pair_node, weights=masks.sum(axis=1), minlength=len(nodes))
+                split &= copies <= 2 * counts
+                move = split[pair_node]
+            
+            split_nodes = np.flatnonzero(split).tolist()
+            for index in split_nodes:
+                nodes[index]._divide()
+            
+            # 留在本层的对象按节点分组，新建节点的对象列表为空，直接整体赋值
+            stay_node = pair_node[~move]
+            stay_slot = pair_slot[~move]
+            order = np.argsort(stay_node, kind='stable')
+            stay_node, stay_slot = stay_node[order], stay_slot[order]
+            starts = np.flatnonzero(np.r_[True, stay_node[1:] != stay_node[:-1]]) if stay_node.size else []
+            for index, group in zip(stay_node[starts].tolist(), np.split(stay_slot, starts[1:])):
+                node = nodes[index]
+                node.object_ids = group.tolist()
+                node.objects = [objects[slot] for slot in node.object_ids]
+                node.object_bounds = [bounds_list[slot] for slot in node.object_ids]
+            
+            rank = np.cumsum(split) - 1
+            if self.loose:
+                pair_node = 4 * rank[pair_node[move]] + quadrant[move]
+                pair_slot = pair_slot[move]
+            else:
+                rows, quadrants = np.nonzero(masks & move[:, None])
+                pair_node = 4 * rank[pair_node[rows]] + quadrants
+                pair_slot = pair_slot[rows]
+            nodes = [child for index in split_nodes for child in nodes[index].children]
     
     def query_range(self, bounds: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
         """
@@ -207,9 +600,78 @@ class Quadtree:
             bounds: 查询边界 (min_x, min_y, max_x, max_y)
         
         Returns:
-            List[Dict[str, Any]]: 查询到的对象列表
+            List[Dict[str, Any]]: 查询到的对象列表（不重复）
+        """
+        results = self.root.query_range(bounds)
+        if self.loose:
+            return results
+        # 默认模式下跨越多个子节点的对象会被重复找到，按对象去重并保持顺序
+        return list({id(obj): obj for obj in results}.values())
+    
+    def query_ids(self, bounds_array: Any) -> Union[np.ndarray, List[np.ndarray]]:
+        """
+        批量查询与各查询范围相交的对象编号
+        
+        多个查询时把节点结构展开为数组，按层同步处理所有 (节点, 查询) 对；单个查询逐节点标量比较。
+        对象边界均取自插入时的缓存，不访问几何体。
+        
+        Args:
+            bounds_array: 单个查询边界 (4,) 或多个查询边界 (Q, 4)
+        
+        Returns:
+            Union[np.ndarray, List[np.ndarray]]: 单个查询时返回对象编号数组，
+            多个查询时返回每个查询对应的数组；编号升序且不重复
         """
-        return self.root.query_range(bounds)
+        queries = np.asarray(bounds_array, dtype=float)
+        if queries.ndim == 1:
+            # 单个查询逐节点标量比较更快
+            slots: List[int] = []
+            self.root.collect_ids(tuple(queries.tolist()), slots)
+            return np.unique(self._keys[np.asarray(slots, dtype=np.intp)])
+        queries = queries.reshape(-1, 4)
+        
+        pairs: List[Tuple[np.ndarray, np.ndarray]] = []
+        if self._objects and len(queries):
+            node_bounds, first_child, offsets, node_slots = self._flatten()
+            # 按层同步遍历 (节点, 查询) 对，每层只做一次向量化的相交判定
+            nodes = np.zeros(len(queries), dtype=np.intp)
+            query_pos = np.arange(len(queries))
+            while nodes.size:
+                nb = node_bounds[nodes]
+                qb = queries[query_pos]
+                mask = ~((nb[:, 2] < qb[:, 0]) | (nb[:, 0] > qb[:, 2]) | (nb[:, 3] < qb[:, 1]) | (nb[:, 1] > qb[:, 3]))
+                nodes, query_pos = nodes[mask], query_pos[mask]
+                
+                counts = offsets[nodes + 1] - offsets[nodes]
+                total = int(counts.sum())
+                if total:
+                    starts = np.repeat(offsets[nodes] - np.cumsum(counts) + counts, counts)
+                    pairs.append((np.repeat(query_pos, counts), node_slots[starts + np.arange(total)]))
+                
+                children = first_child[nodes]
+                internal = children >= 0
+                nodes = (children[internal][:, None] + np.arange(4)).ravel()
+                query_pos = np.repeat(query_pos[internal], 4)
+        
+        if pairs:
+            query_pos = np.concatenate([q for q, _ in pairs])
+            slots = np.concatenate([ids for _, ids in pairs])
+            obj_bounds = self._bounds_array[slots]
+            qb = queries[query_pos]
+            hit = ~((obj_bounds[:, 2] < qb[:, 0]) | (obj_bounds[:, 0] > qb[:, 2]) |
+                    (obj_bounds[:, 3] < qb[:, 1]) | (obj_bounds[:, 1] > qb[:, 3]))
+            query_pos, keys = query_pos[hit], self._keys[slots[hit]]
+            # 默认模式下跨越多个子节点的对象会被重复找到，按 (查询, 编号) 去重
+            order = np.lexsort((keys, query_pos))
+            query_pos, keys = query_pos[order], keys[order]
+            keep = np.ones(len(keys), dtype=bool)
+            keep[1:] = (query_pos[1:] != query_pos[:-1]) | (keys[1:] != keys[:-1])
+            query_pos, keys = query_pos[keep], keys[keep]
+            splits = np.searchsorted(query_pos, np.arange(1, len(queries)))
+            results = np.split(keys, splits)
+        else:
+            results = [np.empty(0, dtype=np.int64) for _ in range(len(queries))]
+        return results
     
     def query_shapely(self, shapely_obj: Any, min_distance: float = 0.0) -> List[Dict[str, Any]]:
         """
@@ -235,11 +697,58 @@ class Quadtree:
         )
         return self.query_range(expanded_bounds)
     
+    def query_knn(self, point: Tuple[float, float], k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离最近的 k 个对象（最佳优先遍历）
+        
+        Args:
+            point: 查询点 (x, y)
+            k: 返回的对象数
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        return self._best_first(point, k=k)
+    
+    def query_radius(self, point: Tuple[float, float], radius: float) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离不超过 radius 的所有对象（最佳优先遍历）
+        
+        Args:
+            point: 查询点 (x, y)
+            radius: 查询半径
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        return self._best_first(point, radius=radius)
+    
+    def _best_first(self, point: Tuple[float, float], k: Optional[int] = None,
+                    radius: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        按节点（松散）边界到查询点的距离做最佳优先遍历，对象按内部编号去重
+        """
+        px, py = point
+        
+        def expand(node: QuadtreeNode) -> Tuple[list, list]:
+            children = []
+            if node.is_divided:
+                children = [(point_bounds_distance(point, child.loose_bounds), child)
+                            for child in node.children if child]
+            objects = []
+            for obj, obj_bounds, slot in zip(node.objects, node.object_bounds, node.object_ids):
+                center_x, center_y = get_object_center(obj, obj_bounds)
+                objects.append((math.hypot(center_x - px, center_y - py), slot, obj))
+            return children, objects
+        
+        return best_first_search([(0.0, self.root)], expand, k, radius)
+    
     def clear(self) -> None:
         """
         清除四叉树中的所有对象
         """
         self.root.clear()
+        self._reset_cache()
     
     def get_stats(self) -> Dict[str, Any]:
         """
@@ -249,7 +758,7 @@ class Quadtree:
             Dict[str, Any]: 统计信息
         """
         def _count_nodes(node: QuadtreeNode) -> Tuple[int, int]:
-            """递归计算节点数和对象数"""
+            """递归计算节点数和对象数（默认模式下跨越子节点的对象按副本计数）"""
             node_count = 1
             obj_count = len(node.objects)
             
@@ -267,5 +776,7 @@ class Quadtree:
             'total_nodes': total_nodes,
             'total_objects': total_objects,
             'max_depth': self.root.max_depth,
-            'max_objects_per_node': self.root.max_objects
+            'max_objects_per_node': self.root.max_objects,
+            'root_objects': len(self.root.objects),
+            'loose': self.loose
         }
@@ -0,0 +1,166 @@
+# core/relaxation.py
+
+import math
+import random
+import logging
+from typing import Tuple, Dict, Any, Optional, Callable
+
+import numpy as np
+
+from .collision import check_collision_hierarchical
+
+try:
+    import shapely
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logging.warning("Shapely未安装，蒙特卡洛松弛功能将受限")
+
+
+class MonteCarloRelaxer:
+    """
+    蒙特卡洛松弛（随机游走）
+    
+    随机选取已放置的骨料，施加小幅随机平移和绕中心的旋转（圆形只平移），
+    只有不越出区域且不与其他骨料冲突的扰动才被接受。堆积接近饱和时，
+    松弛让分散的细小空隙重新分布、合并，使后续投放能继续找到位置。
+    步长按接受率自适应：接受率高于目标时放大，低于目标时缩小。
+    被接受的扰动立即用 update 更新骨料在空间索引中的位置。
+    """
+    
+    TARGET_ACCEPTANCE = 0.4
+    
+    def __init__(self, store: Any, spatial_index: Any, region: Tuple[float, float, float, float],
+                 min_distance: float = 0.0, allow_touching: bool = True,
+                 step: Optional[float] = None, max_rotation: float = math.radians(15),
+                 first_index: int = 0):
+        """
+        Args:
+            store: 骨料存储（AggregateStore），松弛直接修改其中的坐标
+            spatial_index: 包含存储中全部骨料的空间索引，记录的 id 为存储编号
+            region: 区域边界 (min_x, min_y, max_x, max_y)，骨料不得移出区域
+            min_distance: 骨料（含ITZ）之间的最小间距
+            allow_touching: 是否允许恰好接触
+            step: 初始最大平移距离，默认取可移动骨料半径中位数的 1/4，自适应调整时不超过该值
+            max_rotation: 单次最大旋转角度（弧度）
+            first_index: 只移动编号不小于该值的骨料，之前的骨料作为固定障碍
+        """
+        self.store = store
+        self.spatial_index = spatial_index
+        self.region = region
+        self.min_distance = min_distance
+        self.allow_touching = allow_touching
+        self.max_rotation = max_rotation
+        self.first_index = max(0, first_index)
+        
+        if step is None:
+            radii = store.radii[self.first_index:]
+            step = 0.25 * float(np.median(radii)) if len(radii) else 0.0
+        self.max_step = step
+        self.step = step
+    
+    def relax(self, moves: int, cancel_check: Optional[Callable[[], bool]] = None) -> Dict[str, Any]:
+        """
+        执行给定次数的随机扰动尝试
+        
+        Args:
+            moves: 尝试次数
+            cancel_check: 每 100 次尝试调用一次，返回True时提前结束
+        
+        Returns:
+            Dict[str, Any]: 统计信息（尝试次数、接受次数、最终步长）
+        """
+        stats = {'attempts': 0, 'accepted': 0, 'step': self.step}
+        count = len(self.store) - self.first_index
+        if not SHAPELY_AVAILABLE or count <= 0 or self.max_step <= 0:
+            return stats
+        
+        window_accepted = 0
+        for attempt in range(moves):
+            if attempt % 100 == 0 and attempt:
+                if cancel_check is not None and cancel_check():
+                    break
+                # 接受率自适应步长
+                scale = 1.1 if window_accepted > self.TARGET_ACCEPTANCE * 100 else 0.9
+                self.step = min(self.max_step, max(self.max_step / 64.0, self.step * scale))
+                window_accepted = 0
+            index = self.first_index + random.randrange(count)
+            stats['attempts'] += 1
+            if self._perturb(index):
+                stats['accepted'] += 1
+                window_accepted += 1
+        
+        stats['step'] = self.step
+        logging.info(f"蒙特卡洛松弛: 尝试 {stats['attempts']} 次，接受 {stats['accepted']} 次，"
+                     f"步长 {self.step:.3f}")
+        return stats
+    
+    def _perturb(self, index: int) -> bool:
+        """
+        对一个骨料施加随机扰动，无冲突时更新存储
+        
+        Returns:
+            bool: 是否接受
+        """
+        radius = self.step * math.sqrt(random.random())
+        theta = random.uniform(0, 2 * math.pi)
+        dx, dy = radius * math.cos(theta), radius * math.sin(theta)
+        is_circle = self.store.shape_info(index).get('shape') == 'circle'
+        angle = 0.0 if is_circle else random.uniform(-self.max_rotation, self.max_rotation)
+        
+        polygon, itz_polygon = self.store.geometry(index)
+        center = self.store.centers[index].copy()
+        cos_a, sin_a = math.cos(angle), math.sin(angle)
+        
+        def move(coords: np.ndarray) -> np.ndarray:
+            relative = coords - center
+            moved = np.empty_like(coords)
+            moved[:, 0] = center[0] + relative[:, 0] * cos_a - relative[:, 1] * sin_a
+            moved[:, 1] = center[1] + relative[:, 0] * sin_a + relative[:, 1] * cos_a
+            moved += (dx, dy)
+            return moved
+        
+        moved_polygon = shapely.transform(polygon, move)
+        if not self._inside(polygon.bounds, moved_polygon.bounds):
+            return False
+        moved_itz = shapely.transform(itz_polygon, move) if itz_polygon is not None else None
+        footprint = moved_itz if moved_itz is not None else moved_polygon
+        if self._collides(index, moved_polygon, moved_itz, footprint.bounds):
+            return False
+        
+        if angle:
+            min_x, min_y, max_x, max_y = footprint.bounds
+            self.store.rotate(index, angle, (min_x - dx, min_y - dy, max_x - dx, max_y - dy))
+        self.store.translate(index, dx, dy)
+        self.store.cache_geometry(index, moved_polygon, moved_itz)
+        new_bounds = tuple(self.store.bounds[index].tolist())
+        self.spatial_index.update(index, new_bounds, self.store.record(index, self.store.primitive(index)))
+        return True
+    
+    def _inside(self, bounds: Tuple[float, float, float, float],
+                moved_bounds: Tuple[float, float, float, float]) -> bool:
+        """
+        扰动后骨料是否仍在区域内（原本越界的一侧不得进一步越界）
+        """
+        min_x, min_y, max_x, max_y = self.region
+        return (moved_bounds[0] >= min(min_x, bounds[0]) and moved_bounds[1] >= min(min_y, bounds[1]) and
+                moved_bounds[2] <= max(max_x, bounds[2]) and moved_bounds[3] <= max(max_y, bounds[3]))
+    
+    def _collides(self, index: int, polygon: Any, itz_polygon: Any,
+                  bounds: Tuple[float, float, float, float]) -> bool:
+        """
+        扰动后的骨料是否与其他骨料冲突
+        """
+        reach = self.min_distance
+        shapes = []
+        for record in self.spatial_index.query_range((bounds[0] - reach, bounds[1] - reach,
+                                                      bounds[2] + reach, bounds[3] + reach)):
+            other = record['id']
+            if other == index:
+                continue
+            other_polygon, other_itz = self.store.geometry(other)
+            shapes.append(other_polygon)
+            if other_itz is not None:
+                shapes.append(other_itz)
+        return check_collision_hierarchical(polygon, itz_polygon, shapes, self.min_distance,
+                                            None, False, self.allow_touching)
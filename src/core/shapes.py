@@ -2,9 +2,13 @@
 
 import random
 import math
-from typing import List, Tuple
+import logging
+from typing import List, Tuple, Dict, Any, Optional
 import numpy as np
-from ..utils import clip
+from ..utils import (
+    clip, calculate_polygon_area, calculate_circle_area, calculate_ellipse_area,
+    calculate_bounding_circle
+)
 from ..utils.helpers import calculate_distance
 
 def optimize_polygon_sides(points: List[Tuple[float, float]], min_edge_length: float) -> List[Tuple[float, float]]:
@@ -187,3 +191,390 @@ def generate_ellipse(center: Tuple[float, float],
         
         points.append((center[0] + x, center[1] + y))
     return points
+
+def optimize_polygon_sides_batch(points: np.ndarray, sides: np.ndarray, min_edge_length: np.ndarray) -> np.ndarray:
+    """
+    批量优化多边形，避免出现过小的边（optimize_polygon_sides 的向量化版本）
+    
+    逐条边顺序处理以保持与单个版本相同的结果，每一步在所有候选上同时计算。
+    
+    Args:
+        points: 填充后的点数组 (N, max_sides + 1, 2)，第 i 行前 sides[i] + 1 个点有效
+        sides: 每个多边形的边数 (N,)
+        min_edge_length: 每个多边形的最小允许边长度 (N,)
+    
+    Returns:
+        np.ndarray: 优化后的点数组（新数组）
+    """
+    optimized = np.array(points, dtype=float, copy=True)
+    n = optimized.shape[0]
+    if n == 0:
+        return optimized
+    
+    sides = np.asarray(sides, dtype=np.int64)
+    min_edge_length = np.broadcast_to(np.asarray(min_edge_length, dtype=float), (n,))
+    rows = np.arange(n)
+    
+    for i in range(int(sides.max())):
+        active = rows[(sides >= 3) & (i < sides)]
+        if active.size == 0:
+            continue
+        active_sides = sides[active]
+        current = optimized[active, i]
+        next_point = optimized[active, i + 1]
+        edge_length = np.hypot(*(next_point - current).T)
+        
+        short = edge_length < min_edge_length[active]
+        if not short.any():
+            continue
+        active = active[short]
+        active_sides = active_sides[short]
+        current = current[short]
+        next_point = next_point[short]
+        edge_length = edge_length[short]
+        
+        prev_point = optimized[active, (i - 1) % active_sides]
+        next_next_point = optimized[active, (i + 2) % (active_sides + 1)]
+        
+        prev_vector = prev_point - current
+        next_vector = next_next_point - next_point
+        prev_length = np.hypot(*prev_vector.T)[:, None]
+        next_length = np.hypot(*next_vector.T)[:, None]
+        prev_vector = np.divide(prev_vector, prev_length, out=np.zeros_like(prev_vector), where=prev_length > 0)
+        next_vector = np.divide(next_vector, next_length, out=np.zeros_like(next_vector), where=next_length > 0)
+        
+        adjustment = ((min_edge_length[active] - edge_length) / 2)[:, None]
+        optimized[active, i] = current - prev_vector * adjustment
+        optimized[active, i + 1] = next_point + next_vector * adjustment
+    
+    return optimized
+
+def generate_random_polygons_batch(centers: np.ndarray,
+                                   radii: np.ndarray,
+                                   sides: np.ndarray,
+                                   irregularity: float = 0.3,
+                                   spikiness: float = 0.2,
+                                   optimize_sides: bool = True,
+                                   min_edge_length: Optional[float] = None,
+                                   rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """
+    批量生成随机多边形（generate_random_polygon 的向量化版本）
+    
+    不同边数的多边形填充到同一数组中：第 i 行前 sides[i] + 1 个点有效（含闭合点），
+    其后的填充位置重复最后一个有效点，因此鞋带公式等计算无需特殊处理。
+    
+    Args:
+        centers: 中心点数组 (N, 2)
+        radii: 平均半径 (N,)
+        sides: 边数 (N,)，必须≥3
+        irregularity: 不规则程度，范围0-1
+        spikiness: 尖锐程度，范围0-1
+        optimize_sides: 是否优化多边形，避免出现小边
+        min_edge_length: 最小允许边长度，默认值为各自半径的1/10
+        rng: NumPy 随机数生成器，默认由 random 模块派生种子
+    
+    Returns:
+        np.ndarray: 点数组 (N, max(sides) + 1, 2)
+    """
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    n = centers.shape[0]
+    radii = np.broadcast_to(np.asarray(radii, dtype=float), (n,))
+    sides = np.broadcast_to(np.asarray(sides, dtype=np.int64), (n,))
+    if n == 0:
+        return np.empty((0, 4, 2), dtype=float)
+    if (sides < 3).any():
+        raise ValueError("边数必须≥3")
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(63))
+    
+    irregularity = clip(irregularity, 0.0, 1.0)
+    spikiness = clip(spikiness, 0.0, 1.0)
+    
+    max_sides = int(sides.max())
+    valid = np.arange(max_sides)[None, :] < sides[:, None]
+    
+    base_angle = 2 * math.pi / sides
+    angle_variation = irregularity * base_angle
+    angle_steps = rng.uniform(base_angle - angle_variation, base_angle + angle_variation,
+                              size=(max_sides, n)).T
+    angle_steps = np.where(valid, angle_steps, 0.0)
+    angle_steps *= (2 * math.pi / angle_steps.sum(axis=1))[:, None]
+    
+    start_angle = rng.uniform(0, 2 * math.pi, size=n)
+    angles = start_angle[:, None] + np.concatenate(
+        [np.zeros((n, 1)), np.cumsum(angle_steps, axis=1)[:, :-1]], axis=1
+    )
+    point_radii = np.clip(rng.normal(radii[:, None], spikiness * radii[:, None], size=(n, max_sides)),
+                          0.3 * radii[:, None], 1.8 * radii[:, None])
+    
+    points = np.empty((n, max_sides + 1, 2), dtype=float)
+    points[:, :max_sides, 0] = centers[:, :1] + point_radii * np.cos(angles)
+    points[:, :max_sides, 1] = centers[:, 1:] + point_radii * np.sin(angles)
+    
+    # 闭合点及其后的填充位置都取第一个点
+    tail = ~np.concatenate([valid, np.zeros((n, 1), dtype=bool)], axis=1)
+    points[tail] = np.repeat(points[:, 0], max_sides + 1 - sides, axis=0)
+    
+    if optimize_sides:
+        if min_edge_length is None:
+            min_edge_length = radii / 10
+        points = optimize_polygon_sides_batch(points, sides, min_edge_length)
+        # 优化可能移动闭合点，填充位置与之保持一致
+        last = points[np.arange(n), sides]
+        points[tail & (np.arange(max_sides + 1)[None, :] > sides[:, None])] = np.repeat(
+            last, max_sides - sides, axis=0
+        )
+    
+    return points
+
+def generate_circles_batch(centers: np.ndarray, radii: np.ndarray, segments: int = 36) -> np.ndarray:
+    """
+    批量生成圆形（generate_circle 的向量化版本）
+    
+    Args:
+        centers: 中心点数组 (N, 2)
+        radii: 半径 (N,)
+        segments: 分段数，控制圆形的平滑度
+    
+    Returns:
+        np.ndarray: 点数组 (N, segments + 1, 2)，包含闭合点
+    """
+    if segments < 8:
+        segments = 8
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    radii = np.broadcast_to(np.asarray(radii, dtype=float), (centers.shape[0],))
+    
+    angles = 2 * math.pi * np.arange(segments + 1) / segments
+    unit = np.stack([np.cos(angles), np.sin(angles)], axis=-1)
+    return centers[:, None, :] + radii[:, None, None] * unit[None, :, :]
+
+def generate_ellipses_batch(centers: np.ndarray,
+                            major_axes: np.ndarray,
+                            minor_axes: np.ndarray,
+                            rotations: np.ndarray,
+                            segments: int = 36) -> np.ndarray:
+    """
+    批量生成椭圆形（generate_ellipse 的向量化版本）
+    
+    Args:
+        centers: 中心点数组 (N, 2)
+        major_axes: 长轴长度 (N,)
+        minor_axes: 短轴长度 (N,)
+        rotations: 旋转角度（弧度）(N,)
+        segments: 分段数，控制椭圆形的平滑度
+    
+    Returns:
+        np.ndarray: 点数组 (N, segments + 1, 2)，包含闭合点
+    """
+    if segments < 8:
+        segments = 8
+    centers = np.asarray(centers, dtype=float).reshape(-1, 2)
+    n = centers.shape[0]
+    major_axes = np.broadcast_to(np.asarray(major_axes, dtype=float), (n,))[:, None]
+    minor_axes = np.broadcast_to(np.asarray(minor_axes, dtype=float), (n,))[:, None]
+    rotations = np.broadcast_to(np.asarray(rotations, dtype=float), (n,))[:, None]
+    
+    angles = 2 * math.pi * np.arange(segments + 1)[None, :] / segments
+    cos_a, sin_a = np.cos(angles), np.sin(angles)
+    cos_r, sin_r = np.cos(rotations), np.sin(rotations)
+    
+    points = np.empty((n, segments + 1, 2), dtype=float)
+    points[:, :, 0] = centers[:, :1] + major_axes * cos_a * cos_r - minor_axes * sin_a * sin_r
+    points[:, :, 1] = centers[:, 1:] + major_axes * cos_a * sin_r + minor_axes * sin_a * cos_r
+    return points
+
+def center_clearance_batch(points: np.ndarray) -> np.ndarray:
+    """
+    批量计算原点到形状边界的距离（原点不在形状内部时为0）
+    
+    即以原点为圆心、完全落在形状内的最大圆半径，可用于在放置前判断
+    候选中心周围至少需要多少空隙。
+    
+    Args:
+        points: 以原点为中心的闭合点数组 (N, k, 2)，允许以重复末点填充
+    
+    Returns:
+        np.ndarray: 每个形状的中心间隙半径 (N,)
+    """
+    points = np.asarray(points, dtype=float)
+    if points.shape[0] == 0:
+        return np.empty(0, dtype=float)
+    
+    start = points[:, :-1]
+    edge = points[:, 1:] - start
+    length_sq = (edge ** 2).sum(axis=2)
+    t = np.divide(-(start * edge).sum(axis=2), length_sq,
+                  out=np.zeros_like(length_sq), where=length_sq > 0)
+    nearest = start + np.clip(t, 0.0, 1.0)[:, :, None] * edge
+    distances = np.hypot(nearest[:, :, 0], nearest[:, :, 1]).min(axis=1)
+    
+    # 射线法判断原点是否在内部，退化的填充边不会产生交点
+    y0, y1 = start[:, :, 1], points[:, 1:, 1]
+    crosses = (y0 > 0) != (y1 > 0)
+    x_cross = start[:, :, 0] - y0 * np.divide(edge[:, :, 0], edge[:, :, 1],
+                                                out=np.zeros_like(y0), where=crosses)
+    inside = (crosses & (x_cross > 0)).sum(axis=1) % 2 == 1
+    return np.where(inside, distances, 0.0)
+
+def generate_shape_batch_from_config(shape_config: Dict[str, Any], count: int,
+                                     rng: Optional[np.random.Generator] = None) -> List[Tuple]:
+    """
+    按形状配置批量生成以原点为中心的骨料形状
+    
+    形状与中心位置无关，调用方只需把点坐标平移到采样得到的中心。
+    
+    Args:
+        shape_config: 形状配置，type 为 polygon、circle 或 ellipse
+        count: 生成数量
+        rng: NumPy 随机数生成器，默认由 random 模块派生种子
+    
+    Returns:
+        List[Tuple]: (点数组 (k, 2), 实际半径, 面积, 形状信息, 中心间隙半径) 列表，
+            点数组包含闭合点，中心间隙半径见 center_clearance_batch
+    """
+    if count <= 0:
+        return []
+    if rng is None:
+        rng = np.random.default_rng(random.getrandbits(63))
+    origins = np.zeros((count, 2))
+    
+    try:
+        if shape_config['type'] == 'polygon':
+            min_size = shape_config.get('min_size', 2.0)
+            max_size = shape_config.get('max_size', 8.0)
+            min_sides = shape_config.get('min_sides', 3)
+            max_sides = shape_config.get('max_sides', 7)
+            irregularity = shape_config.get('irregularity', 0.3)
+            spikiness = shape_config.get('spikiness', 0.2)
+            optimize_sides = shape_config.get('optimize_sides', True)
+            min_edge_length = shape_config.get('min_edge_length', None)
+            
+            sizes = rng.uniform(min_size, max_size, size=count)
+            sides = rng.integers(min_sides, max_sides, endpoint=True, size=count)
+            points = generate_random_polygons_batch(origins, sizes, sides, irregularity, spikiness,
+                                                    optimize_sides, min_edge_length, rng)
+            
+            # 填充位置重复最后一个点，对鞋带公式没有贡献
+            x, y = points[:, :, 0], points[:, :, 1]
+            areas = np.abs((x[:, :-1] * y[:, 1:] - x[:, 1:] * y[:, :-1]).sum(axis=1)) / 2.0
+            valid = np.arange(points.shape[1])[None, :] <= sides[:, None]
+            centroids = (points * valid[:, :, None]).sum(axis=1) / (sides + 1)[:, None]
+            distances = np.hypot(x - centroids[:, :1], y - centroids[:, 1:])
+            radii = np.where(valid, distances, 0.0).max(axis=1)
+            clearances = center_clearance_batch(points)
+            
+            return [(points[i, :sides[i] + 1], float(radii[i]), float(areas[i]),
+                     {"shape": "polygon", "size": float(sizes[i]), "sides": int(sides[i]),
+                      "irregularity": irregularity, "spikiness": spikiness},
+                     float(clearances[i]))
+                    for i in range(count)]
+        
+        elif shape_config['type'] == 'circle':
+            min_radius = shape_config.get('min_radius', 2.0)
+            max_radius = shape_config.get('max_radius', 8.0)
+            segments = shape_config.get('segments', 36)
+            
+            radii = rng.uniform(min_radius, max_radius, size=count)
+            points = generate_circles_batch(origins, radii, segments)
+            return [(points[i], float(radii[i]), calculate_circle_area(float(radii[i])),
+                     {"shape": "circle", "radius": float(radii[i]), "segments": segments},
+                     float(radii[i]))
+                    for i in range(count)]
+        
+        elif shape_config['type'] == 'ellipse':
+            min_major = shape_config.get('min_major', 3.0)
+            max_major = shape_config.get('max_major', 10.0)
+            min_minor = shape_config.get('min_minor', 2.0)
+            max_minor = shape_config.get('max_minor', 8.0)
+            segments = shape_config.get('segments', 36)
+            
+            major_axes = rng.uniform(min_major, max_major, size=count)
+            minor_axes = rng.uniform(min_minor, max_minor, size=count)
+            rotations = rng.uniform(0, 2 * math.pi, size=count)
+            points = generate_ellipses_batch(origins, major_axes, minor_axes, rotations, segments)
+            return [(points[i], float(max(major_axes[i], minor_axes[i])),
+                     calculate_ellipse_area(float(major_axes[i]), float(minor_axes[i])),
+                     {"shape": "ellipse", "major_axis": float(major_axes[i]), "minor_axis": float(minor_axes[i]),
+                      "rotation": float(rotations[i]), "segments": segments},
+                     float(min(major_axes[i], minor_axes[i])))
+                    for i in range(count)]
+        
+        else:
+            logging.warning(f"未知的形状类型: {shape_config['type']}")
+            return []
+    
+    except Exception as e:
+        logging.warning(f"批量生成形状时出错: {str(e)}")
+        return []
+
+def generate_shape_from_config(shape_config: Dict[str, Any], center: Tuple[float, float]) -> Optional[Tuple]:
+    """
+    按形状配置在指定中心生成一个骨料形状
+    
+    Args:
+        shape_config: 形状配置，type 为 polygon、circle 或 ellipse
+        center: 中心点坐标 (x, y)
+    
+    Returns:
+        Optional[Tuple]: (点列表, 实际半径, 面积, 形状信息, 坐标列表)
+    """
+    points = []
+    actual_radius = 0.0
+    area = 0.0
+    shape_info = {}
+    
+    try:
+        if shape_config['type'] == 'polygon':
+            min_size = shape_config.get('min_size', 2.0)
+            max_size = shape_config.get('max_size', 8.0)
+            min_sides = shape_config.get('min_sides', 3)
+            max_sides = shape_config.get('max_sides', 7)
+            irregularity = shape_config.get('irregularity', 0.3)
+            spikiness = shape_config.get('spikiness', 0.2)
+            optimize_sides = shape_config.get('optimize_sides', True)
+            min_edge_length = shape_config.get('min_edge_length', None)
+            
+            size = random.uniform(min_size, max_size)
+            sides = random.randint(min_sides, max_sides)
+            points = generate_random_polygon(center, size, sides, irregularity, spikiness, optimize_sides, min_edge_length)
+            _, actual_radius = calculate_bounding_circle(points)
+            area = calculate_polygon_area(points)
+            shape_info = {"shape": "polygon", "size": size, "sides": sides, "irregularity": irregularity, "spikiness": spikiness}
+        
+        elif shape_config['type'] == 'circle':
+            min_radius = shape_config.get('min_radius', 2.0)
+            max_radius = shape_config.get('max_radius', 8.0)
+            segments = shape_config.get('segments', 36)
+            
+            radius = random.uniform(min_radius, max_radius)
+            actual_radius = radius
+            area = calculate_circle_area(radius)
+            points = generate_circle(center, radius, segments)
+            shape_info = {"shape": "circle", "radius": radius, "segments": segments}
+        
+        elif shape_config['type'] == 'ellipse':
+            min_major = shape_config.get('min_major', 3.0)
+            max_major = shape_config.get('max_major', 10.0)
+            min_minor = shape_config.get('min_minor', 2.0)
+            max_minor = shape_config.get('max_minor', 8.0)
+            segments = shape_config.get('segments', 36)
+            
+            major_axis = random.uniform(min_major, max_major)
+            minor_axis = random.uniform(min_minor, max_minor)
+            rotation = random.uniform(0, 2 * math.pi)
+            actual_radius = max(major_axis, minor_axis)
+            area = calculate_ellipse_area(major_axis, minor_axis)
+            points = generate_ellipse(center, major_axis, minor_axis, rotation, segments)
+            shape_info = {"shape": "ellipse", "major_axis": major_axis, "minor_axis": minor_axis, "rotation": rotation, "segments": segments}
+        
+        else:
+            logging.warning(f"未知的形状类型: {shape_config['type']}")
+            return None
+        
+        coords = [(p[0], p[1]) for p in points]
+        
+        return points, actual_radius, area, shape_info, coords
+    
+    except Exception as e:
+        logging.warning(f"生成形状时出错: {str(e)}")
+        return None
@@ -1,7 +1,12 @@
 # spatial_index.py
 # 空间索引统一接口定义
 
-from typing import List, Tuple, Dict, Any, Protocol, runtime_checkable
+import heapq
+import itertools
+import math
+from typing import List, Tuple, Dict, Any, Optional, Protocol, Callable, Iterable, runtime_checkable
+
+import numpy as np
 
 
 @runtime_checkable
@@ -9,7 +14,8 @@ class SpatialIndex(Protocol):
     """
     空间索引统一接口
     
-    Quadtree 和 KDTree 都实现此协议，可互换使用。
+    Quadtree、KDTree、STRtreeIndex 和 GridIndex 都实现此协议，可互换使用。
+    remove / update 按对象的 id 字段定位对象，没有 id 字段的对象只能随 clear 清除。
     """
     
     def insert(self, obj: Dict[str, Any]) -> bool:
@@ -17,7 +23,7 @@ class SpatialIndex(Protocol):
         ...
     
     def insert_batch(self, objects: List[Dict[str, Any]]) -> int:
-        """批量插入对象"""
+        """批量插入对象（批量较大时一次性装载构建）"""
         ...
     
     def query_range(self, bounds: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
@@ -28,6 +34,23 @@ class SpatialIndex(Protocol):
         """按 Shapely 对象查询"""
         ...
     
+    def query_knn(self, point: Tuple[float, float], k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """查询中心距离最近的 k 个对象，返回 (对象, 距离) 列表"""
+        ...
+    
+    def query_radius(self, point: Tuple[float, float], radius: float) -> List[Tuple[Dict[str, Any], float]]:
+        """查询中心距离不超过 radius 的对象，返回 (对象, 距离) 列表"""
+        ...
+    
+    def remove(self, obj_id: Any) -> bool:
+        """按 id 删除对象，未找到时返回False"""
+        ...
+    
+    def update(self, obj_id: Any, new_bounds: Tuple[float, float, float, float],
+               obj: Optional[Dict[str, Any]] = None) -> bool:
+        """把对象移动到新边界（给出 obj 时同时替换保存的对象），未找到时返回False"""
+        ...
+    
     def clear(self) -> None:
         """清空索引"""
         ...
@@ -35,3 +58,172 @@ class SpatialIndex(Protocol):
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
         ...
+
+
+def get_object_bounds(obj: Dict[str, Any]) -> Optional[Tuple[float, float, float, float]]:
+    """
+    获取索引对象的外包边界框
+    
+    对象自带 bounds 字段（如 AggregateRecord）时直接使用，无需访问几何体；
+    否则存在ITZ时使用ITZ边界（ITZ包含骨料本体），再否则使用骨料本体边界。
+    
+    Args:
+        obj: 索引对象，包含bounds、shapely_obj和/或shapely_itz属性
+        
+    Returns:
+        Optional[Tuple[float, float, float, float]]: 边界框，无几何体时返回None
+    """
+    bounds = obj.get('bounds')
+    if bounds is not None:
+        return tuple(bounds)
+    shapely_obj = obj.get('shapely_itz') or obj.get('shapely_obj')
+    if not shapely_obj:
+        return None
+    return tuple(shapely_obj.bounds)
+
+
+def collect_object_bounds(objects: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], np.ndarray]:
+    """
+    批量获取对象边界，供批量装载一次性构建索引
+    
+    Args:
+        objects: 索引对象列表
+    
+    Returns:
+        Tuple[List[Dict[str, Any]], np.ndarray]: 能获得边界的对象及其边界数组 (N, 4)
+    """
+    valid: List[Dict[str, Any]] = []
+    bounds: List[Tuple[float, float, float, float]] = []
+    for obj in objects:
+        obj_bounds = get_object_bounds(obj)
+        if obj_bounds is not None:
+            valid.append(obj)
+            bounds.append(obj_bounds)
+    return valid, np.asarray(bounds, dtype=float).reshape(-1, 4)
+
+
+def _spread_bits(values: np.ndarray) -> np.ndarray:
+    """
+    把16位整数的各位间隔展开（第 i 位移到第 2i 位），用于Morton编码
+    """
+    values = values.astype(np.uint32)
+    values = (values | (values << 8)) & 0x00FF00FF
+    values = (values | (values << 4)) & 0x0F0F0F0F
+    values = (values | (values << 2)) & 0x33333333
+    values = (values | (values << 1)) & 0x55555555
+    return values
+
+
+def morton_order(points: np.ndarray, bounds: Tuple[float, float, float, float]) -> np.ndarray:
+    """
+    按Morton（Z序）编码对点排序，空间上相邻的点在结果中也相邻
+    
+    Args:
+        points: 点坐标数组 (N, 2)
+        bounds: 编码范围 (min_x, min_y, max_x, max_y)，范围外的点截断到边界
+    
+    Returns:
+        np.ndarray: 排序下标数组
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    min_x, min_y, max_x, max_y = bounds
+    scale = np.array([max(max_x - min_x, 1e-12), max(max_y - min_y, 1e-12)])
+    cells = np.clip((points - (min_x, min_y)) / scale, 0.0, 1.0) * 65535
+    cells = cells.astype(np.uint32)
+    codes = _spread_bits(cells[:, 0]) | (_spread_bits(cells[:, 1]) << 1)
+    return np.argsort(codes, kind='stable')
+
+
+def get_object_center(obj: Dict[str, Any], obj_bounds: Tuple[float, float, float, float]) -> Tuple[float, float]:
+    """
+    获取对象中心：对象带有 center 字段时直接使用，否则取边界框中心
+    
+    Args:
+        obj: 索引对象
+        obj_bounds: 对象边界框
+    
+    Returns:
+        Tuple[float, float]: 中心点坐标
+    """
+    center = obj.get('center')
+    if center is not None:
+        return (center[0], center[1])
+    return ((obj_bounds[0] + obj_bounds[2]) / 2, (obj_bounds[1] + obj_bounds[3]) / 2)
+
+
+def move_object_bounds(obj: Dict[str, Any], old_bounds: Tuple[float, float, float, float],
+                       new_bounds: Tuple[float, float, float, float]) -> None:
+    """
+    对象移动到新边界时，同步更新对象自带的 bounds 字段，并把 center 字段按边界框中心的位移平移
+    
+    update 省略替换对象时使用，保证 k 近邻和半径查询读到移动后的中心；
+    没有 center 字段的对象取边界框中心，随 bounds 一并更新。
+    
+    Args:
+        obj: 索引对象（原地修改）
+        old_bounds: 原边界框
+        new_bounds: 新边界框
+    """
+    if 'bounds' in obj:
+        obj['bounds'] = tuple(new_bounds)
+    center = obj.get('center')
+    if center is None:
+        return
+    dx = (new_bounds[0] + new_bounds[2] - old_bounds[0] - old_bounds[2]) / 2
+    dy = (new_bounds[1] + new_bounds[3] - old_bounds[1] - old_bounds[3]) / 2
+    obj['center'] = (center[0] + dx, center[1] + dy)
+
+
+def point_bounds_distance(point: Tuple[float, float], bounds: Tuple[float, float, float, float]) -> float:
+    """
+    点到矩形的最短距离（点在矩形内时为0）
+    """
+    dx = max(bounds[0] - point[0], 0.0, point[0] - bounds[2])
+    dy = max(bounds[1] - point[1], 0.0, point[1] - bounds[3])
+    return math.hypot(dx, dy)
+
+
+def best_first_search(entries: Iterable[Tuple[float, Any]],
+                      expand: Callable[[Any], Tuple[Iterable[Tuple[float, Any]], Iterable[Tuple[float, Any, Dict[str, Any]]]]],
+                      k: Optional[int] = None,
+                      radius: Optional[float] = None) -> List[Tuple[Dict[str, Any], float]]:
+    """
+    最佳优先遍历：节点和对象放在同一个按距离排序的优先队列中，
+    节点的距离是其内部所有对象距离的下界，因此对象按距离升序出队
+    
+    Args:
+        entries: 初始节点 [(距离下界, 节点)]
+        expand: 展开节点，返回子节点 [(距离下界, 子节点)] 和对象 [(距离, 去重键, 对象)]
+        k: 最多返回的对象数，None 表示不限
+        radius: 最大距离，None 表示不限
+    
+    Returns:
+        List[Tuple[Dict[str, Any], float]]: 按距离升序排列的 (对象, 距离) 列表，不重复
+    """
+    results: List[Tuple[Dict[str, Any], float]] = []
+    if k is not None and k <= 0:
+        return results
+    limit = math.inf if radius is None else radius
+    counter = itertools.count()
+    heap = [(distance, next(counter), True, node) for distance, node in entries if distance <= limit]
+    heapq.heapify(heap)
+    seen = set()
+    while heap:
+        distance, _, is_node, item = heapq.heappop(heap)
+        if is_node:
+            children, objects = expand(item)
+            for child_distance, child in children:
+                if child_distance <= limit:
+                    heapq.heappush(heap, (child_distance, next(counter), True, child))
+            for obj_distance, key, obj in objects:
+                if obj_distance <= limit and key not in seen:
+                    heapq.heappush(heap, (obj_distance, next(counter), False, (key, obj)))
+            continue
+        key, obj = item
+        if key in seen:
+            continue
+        seen.add(key)
+        results.append((obj, distance))
+        if k is not None and len(results) >= k:
+            break
+    return results
@@ -0,0 +1,330 @@
+# core/strtree_index.py
+
+import math
+import logging
+from typing import List, Tuple, Dict, Any, Optional
+
+import numpy as np
+
+from .spatial_index import get_object_bounds, get_object_center, move_object_bounds
+
+try:
+    import shapely
+    from shapely import STRtree
+    SHAPELY_AVAILABLE = True
+except ImportError:
+    SHAPELY_AVAILABLE = False
+    logging.warning("Shapely未安装，STR树空间查询功能将受限")
+
+
+class STRtreeIndex:
+    def __init__(self, bounds: Tuple[float, float, float, float], node_capacity: int = 10,
+                 min_rebuild_size: int = 64, growth_ratio: float = 0.25):
+        """
+        基于 Shapely STRtree 的空间索引
+        
+        STRtree 构建后不可修改，因此新插入的对象先放入待合并缓冲区，
+        缓冲区超过阈值（已建树对象数 × growth_ratio，且不少于 min_rebuild_size）
+        时整体重建。重建规模按几何级数增长，单次插入的摊销代价为 O(log n)。
+        
+        删除时对象在树或缓冲区中的位置留作墓碑（None），查询时跳过，重建时剔除；
+        墓碑超过存活对象数时立即重建。更新等同于删除后按新边界放入缓冲区。
+        
+        Args:
+            bounds: 索引边界 (min_x, min_y, max_x, max_y)
+            node_capacity: STRtree 节点容量
+            min_rebuild_size: 触发重建的最小缓冲区大小
+            growth_ratio: 触发重建的缓冲区相对大小
+        """
+        self.bounds = bounds
+        self.node_capacity = node_capacity
+        self.min_rebuild_size = min_rebuild_size
+        self.growth_ratio = growth_ratio
+        
+        self._tree: Optional[Any] = None
+        self._tree_objects: List[Optional[Dict[str, Any]]] = []
+        self._pending_objects: List[Optional[Dict[str, Any]]] = []
+        self._pending_bounds: List[Tuple[float, float, float, float]] = []
+        self._all_bounds: List[Tuple[float, float, float, float]] = []
+        # 对象 id 字段 -> 在 已建树对象 + 待合并对象 中的位置
+        self._positions: Dict[Any, int] = {}
+        self._removed = 0
+        self._pending_removed = 0
+        self.rebuild_count = 0
+    
+    def _needs_rebuild(self) -> bool:
+        """
+        判断待合并缓冲区是否需要并入 STRtree
+        """
+        threshold = max(self.min_rebuild_size, int(len(self._tree_objects) * self.growth_ratio))
+        return len(self._pending_objects) >= threshold
+    
+    def _rebuild(self) -> None:
+        """
+        将所有对象重建为新的 STRtree，同时剔除墓碑
+        """
+        self._tree_objects.extend(self._pending_objects)
+        self._pending_objects = []
+        self._pending_bounds = []
+        if self._removed:
+            keep = [i for i, obj in enumerate(self._tree_objects) if obj is not None]
+            self._tree_objects = [self._tree_objects[i] for i in keep]
+            self._all_bounds = [self._all_bounds[i] for i in keep]
+            self._positions = {obj['id']: i for i, obj in enumerate(self._tree_objects) if obj.get('id') is not None}
+            self._removed = 0
+        self._pending_removed = 0
+        
+        if not self._tree_objects:
+            self._tree = None
+            return
+        
+        bounds_array = np.asarray(self._all_bounds, dtype=float)
+        boxes = shapely.box(bounds_array[:, 0], bounds_array[:, 1], bounds_array[:, 2], bounds_array[:, 3])
+        self._tree = STRtree(boxes, node_capacity=self.node_capacity)
+        self.rebuild_count += 1
+    
+    def insert(self, obj: Dict[str, Any]) -> bool:
+        """
+        插入对象到索引
+        
+        Args:
+            obj: 要插入的对象，必须包含shapely_obj或shapely_itz属性
+        
+        Returns:
+            bool: 是否成功插入
+        """
+        if not SHAPELY_AVAILABLE:
+            return False
+        obj_bounds = get_object_bounds(obj)
+        if obj_bounds is None:
+            return False
+        
+        self._append(obj, obj_bounds)
+        if self._needs_rebuild():
+            self._rebuild()
+        return True
+    
+    def _append(self, obj: Dict[str, Any], obj_bounds: Tuple[float, float, float, float]) -> None:
+        """
+        把对象放入待合并缓冲区
+        """
+        key = obj.get('id')
+        if key is not None:
+            self._positions[key] = len(self._all_bounds)
+        self._pending_objects.append(obj)
+        self._pending_bounds.append(obj_bounds)
+        self._all_bounds.append(obj_bounds)
+        
+    def remove(self, obj_id: Any) -> bool:
+        """
+        按对象的 id 字段删除对象
+        
+        Args:
+            obj_id: 对象的 id 字段
+        
+        Returns:
+            bool: 是否找到并删除
+        """
+        if not self._detach(obj_id):
+            return False
+        if self._removed > len(self._all_bounds) - self._removed:
+            self._rebuild()
+        return True
+    
+    def update(self, obj_id: Any, new_bounds: Tuple[float, float, float, float],
+               obj: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        把对象移动到新边界：原位置留作墓碑，对象按新边界放入待合并缓冲区
+        
+        Args:
+            obj_id: 对象的 id 字段
+            new_bounds: 新边界 (min_x, min_y, max_x, max_y)
+            obj: 替换保存的对象（如位置更新后的新记录），省略时保留原对象并同步其 bounds 和 center 字段
+        
+        Returns:
+            bool: 是否找到并更新
+        """
+        position = self._positions.get(obj_id)
+        old = self._detach(obj_id)
+        if old is None:
+            return False
+        new_bounds = tuple(float(v) for v in new_bounds)
+        if obj is None:
+            obj = old
+            move_object_bounds(obj, self._all_bounds[position], new_bounds)
+        self._append(obj, new_bounds)
+        if self._needs_rebuild() or self._removed > len(self._all_bounds) - self._removed:
+            self._rebuild()
+        return True
+    
+    def _detach(self, obj_id: Any) -> Optional[Dict[str, Any]]:
+        """
+        把对象所在位置置为墓碑，返回原对象（未找到时返回None）
+        """
+        position = self._positions.pop(obj_id, None)
+        if position is None:
+            return None
+        tree_size = len(self._tree_objects)
+        if position < tree_size:
+            obj, self._tree_objects[position] = self._tree_objects[position], None
+        else:
+            obj, self._pending_objects[position - tree_size] = self._pending_objects[position - tree_size], None
+            self._pending_removed += 1
+        self._removed += 1
+        return obj
+    
+    def insert_batch(self, objects: List[Dict[str, Any]]) -> int:
+        """
+        批量插入对象，结束后统一重建一次
+        
+        Args:
+            objects: 要插入的对象列表
+        
+        Returns:
+            int: 成功插入的对象数
+        """
+        if not SHAPELY_AVAILABLE:
+            return 0
+        count = 0
+        for obj in objects:
+            obj_bounds = get_object_bounds(obj)
+            if obj_bounds is None:
+                continue
+            self._append(obj, obj_bounds)
+            count += 1
+        if count:
+            self._rebuild()
+        return count
+    
+    def query_range(self, bounds: Tuple[float, float, float, float]) -> List[Dict[str, Any]]:
+        """
+        查询指定边界内的所有对象
+        
+        Args:
+            bounds: 查询边界 (min_x, min_y, max_x, max_y)
+        
+        Returns:
+            List[Dict[str, Any]]: 查询到的对象列表
+        """
+        results: List[Dict[str, Any]] = []
+        if not SHAPELY_AVAILABLE:
+            return results
+        
+        if self._tree is not None:
+            indices = self._tree.query(shapely.box(*bounds))
+            indices.sort()
+            tree_objects = self._tree_objects
+            if self._removed:
+                results.extend(tree_objects[i] for i in indices if tree_objects[i] is not None)
+            else:
+                results.extend(tree_objects[i] for i in indices)
+        
+        q_min_x, q_min_y, q_max_x, q_max_y = bounds
+        for obj, (min_x, min_y, max_x, max_y) in zip(self._pending_objects, self._pending_bounds):
+            if obj is not None and not (max_x < q_min_x or min_x > q_max_x or max_y < q_min_y or min_y > q_max_y):
+                results.append(obj)
+        
+        return results
+    
+    def query_shapely(self, shapely_obj: Any, min_distance: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        查询与指定Shapely对象可能碰撞的所有对象
+        
+        Args:
+            shapely_obj: Shapely几何对象
+            min_distance: 最小距离，用于扩展查询边界
+        
+        Returns:
+            List[Dict[str, Any]]: 可能碰撞的对象列表
+        """
+        if not SHAPELY_AVAILABLE:
+            logging.warning("Shapely未安装，无法执行空间查询")
+            return []
+        obj_bounds = shapely_obj.bounds
+        expanded_bounds = (
+            obj_bounds[0] - min_distance,
+            obj_bounds[1] - min_distance,
+            obj_bounds[2] + min_distance,
+            obj_bounds[3] + min_distance
+        )
+        return self.query_range(expanded_bounds)
+    
+    def query_knn(self, point: Tuple[float, float], k: int) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离最近的 k 个对象（逐步扩大半径）
+        
+        Shapely STRtree 不开放节点遍历，因此按对象密度估计初始半径，
+        逐次加倍半径做范围查询，直到找到至少 k 个对象。
+        
+        Args:
+            point: 查询点 (x, y)
+            k: 返回的对象数
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        total = len(self._all_bounds) - self._removed
+        if k <= 0 or total == 0:
+            return []
+        if k >= total:
+            return self.query_radius(point, float('inf'))[:k]
+        min_x, min_y, max_x, max_y = self.bounds
+        radius = max(math.sqrt((max_x - min_x) * (max_y - min_y) * k / (math.pi * total)), 1e-9)
+        while True:
+            results = self.query_radius(point, radius)
+            if len(results) >= k:
+                return results[:k]
+            radius *= 2
+    
+    def query_radius(self, point: Tuple[float, float], radius: float) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        查询中心距离不超过 radius 的所有对象（边界框查询后按中心距离筛选）
+        
+        Args:
+            point: 查询点 (x, y)
+            radius: 查询半径
+        
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 按中心距离升序排列的 (对象, 距离) 列表
+        """
+        if math.isinf(radius):
+            candidates = [obj for obj in self._tree_objects + self._pending_objects if obj is not None]
+        else:
+            candidates = self.query_range((point[0] - radius, point[1] - radius,
+                                           point[0] + radius, point[1] + radius))
+        results = []
+        for obj in candidates:
+            center_x, center_y = get_object_center(obj, get_object_bounds(obj))
+            distance = math.hypot(center_x - point[0], center_y - point[1])
+            if distance <= radius:
+                results.append((obj, distance))
+        results.sort(key=lambda item: item[1])
+        return results
+    
+    def clear(self) -> None:
+        """
+        清除索引中的所有对象
+        """
+        self._tree = None
+        self._tree_objects = []
+        self._pending_objects = []
+        self._pending_bounds = []
+        self._all_bounds = []
+        self._positions = {}
+        self._removed = 0
+        self._pending_removed = 0
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取索引统计信息
+        
+        Returns:
+            Dict[str, Any]: 统计信息
+        """
+        return {
+            'total_objects': len(self._all_bounds) - self._removed,
+            'tree_objects': len(self._tree_objects) - (self._removed - self._pending_removed),
+            'pending_objects': len(self._pending_objects) - self._pending_removed,
+            'rebuild_count': self.rebuild_count,
+            'node_capacity': self.node_capacity
+        }
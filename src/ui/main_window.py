@@ -17,6 +17,7 @@ from .widgets.scrollable_frame import ScrollableFrame
 from .widgets.group_config_widget import GroupConfigWidget
 from .widgets.preview_widget import PreviewWidget
 from ..core.generator import RandomAggregateGenerator
+from ..core.aggregate_store import to_cad_point_array
 from ..configs.config import (
     CADColorMap, SpecimenType, DEFAULT_REGION, DEFAULT_MIN_DISTANCE,
     DEFAULT_TARGET_POROSITY, DEFAULT_MAX_ATTEMPTS, DEFAULT_BOUNDARY_COLOR,
@@ -911,37 +912,29 @@ class MainWindow(QMainWindow):
                 
             # 绘制每一个骨料和 ITZ
             color_map = CADColorMap.get_color_map()
-            for agg in self.generator.generated_aggregates:
-                group_id = agg["group_id"]
-                chosen_group = next((g for g in self.generator.groups.get_config() if g["id"] == group_id), None)
+            groups_by_id = {g["id"]: g for g in self.generator.groups.get_config()}
+            store = self.generator.generated_aggregates
+            itz_polygons = store.itz_polygons()
+            for i, group_id in enumerate(store.group_ids.tolist()):
+                chosen_group = groups_by_id.get(group_id)
                 if not chosen_group:
                     continue
                     
                 color_name = chosen_group.get('layer_color', "红色")
                 color = color_map.get(color_name, CADColorMap.RED)
                 
-                point_array = []
-                for p in agg["points"]:
-                    if hasattr(p, 'x') and hasattr(p, 'y'):
-                        point_array.extend([p.x, p.y, 0.0])
-                    else:
-                        point_array.extend([p[0], p[1], 0.0])
-                
                 # 绘制骨料
+                point_array = to_cad_point_array(store.points(i))
                 obj = self.generator.cad_connection.draw_aggregate(point_array, color, "RandomCAD-Aggregates")
                 if obj:
                     self.draw_objects.append(obj)
                     
                 # 绘制 ITZ
-                itz_thickness = agg.get('itz_thickness', 0.0)
-                if itz_thickness > 0 and agg.get('shapely_itz'):
+                itz_polygon = itz_polygons[i]
+                if itz_polygon is not None:
                     try:
-                        itz_polygon = agg['shapely_itz']
                         if hasattr(itz_polygon, 'exterior'):
-                            itz_points = list(itz_polygon.exterior.coords)
-                            itz_point_array = []
-                            for p in itz_points:
-                                itz_point_array.extend([p[0], p[1], 0.0])
+                            itz_point_array = to_cad_point_array(itz_polygon.exterior.coords)
                             
                             itz_color = (color % 7) + 1
                             itz_obj = self.generator.cad_connection.draw_aggregate(itz_point_array, itz_color, "RandomCAD-ITZ")
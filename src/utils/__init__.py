@@ -9,6 +9,7 @@ from .helpers import (
     is_near_boundary,
     move_toward_boundary,
     adjust_points_to_boundary,
+    adjust_aggregate_to_boundary,
     calculate_distance,
     normalize_angle,
     linear_interpolate,
@@ -210,6 +210,42 @@ def adjust_points_to_boundary(points: List[Any],
     return adjusted_points
 
 
+def adjust_aggregate_to_boundary(center: Tuple[float, float],
+                                 points: List[Any],
+                                 check_radius: float,
+                                 boundary_min: Tuple[float, float],
+                                 boundary_max: Tuple[float, float],
+                                 min_distance: float,
+                                 safe_distance: float = 0.1) -> Optional[Tuple[Tuple[float, float], List[Tuple[float, float]], float]]:
+    """
+    对靠近边界的骨料做贴边优化：中心移向最近边界，并把越界点收回区域内
+    
+    Args:
+        center: 骨料中心点坐标 (x, y)
+        points: 骨料点列表
+        check_radius: 判断是否靠近边界所用的半径（含ITZ）
+        boundary_min: 区域左下角坐标 (min_x, min_y)
+        boundary_max: 区域右上角坐标 (max_x, max_y)
+        min_distance: 最小距离阈值
+        safe_distance: 与边界保持的安全距离
+        
+    Returns:
+        Optional[Tuple]: (新中心, 新点列表, 新包围圆半径)，不靠近边界时返回None
+    """
+    if not is_near_boundary(center, check_radius, boundary_min, boundary_max, min_distance):
+        return None
+    
+    new_center = move_toward_boundary(center, boundary_min, boundary_max, safe_distance)
+    moved_points = []
+    for point in points:
+        px, py = _get_xy(point)
+        moved_points.append((new_center[0] + (px - center[0]), new_center[1] + (py - center[1])))
+    
+    adjusted_points = adjust_points_to_boundary(moved_points, safe_distance, boundary_min, boundary_max)
+    _, radius = calculate_bounding_circle(adjusted_points)
+    return new_center, adjusted_points, radius
+
+
 def calculate_distance(point1: Tuple[float, float], point2: Tuple[float, float]) -> float:
     """
     计算两点之间的距离
@@ -0,0 +1,46 @@
+# tests/conftest.py
+"""测试共用的骨料构造工具"""
+
+from shapely.geometry import Polygon
+from src.core.collision import make_primitive
+from src.core.shapes import generate_shape_from_config
+
+CONFIGS = [
+    {"type": "polygon", "min_size": 3, "max_size": 6, "min_sides": 5, "max_sides": 9},
+    {"type": "circle", "min_radius": 2, "max_radius": 4, "segments": 24},
+    {"type": "ellipse", "min_major": 4, "max_major": 6, "min_minor": 2, "max_minor": 3, "segments": 24},
+]
+
+
+def make_aggregate(config, center, group_id=1, itz_thickness=0.0):
+    """按形状配置生成骨料数据字典（含 Shapely 几何和圆/椭圆的解析图元）"""
+    points, radius, area, shape_info, _ = generate_shape_from_config(config, center)
+    polygon = Polygon(points)
+    return {
+        "center": center,
+        "radius": radius,
+        "area": area,
+        "points": points,
+        "shape_info": shape_info,
+        "group_id": group_id,
+        "itz_thickness": itz_thickness,
+        "shapely_obj": polygon,
+        "shapely_itz": polygon.buffer(itz_thickness) if itz_thickness > 0 else None,
+        "primitive": make_primitive(shape_info, center, itz_thickness)
+    }
+
+
+def pack_aggregates(store, index, candidate, count, min_distance=0.0):
+    """
+    逐个生成候选骨料，丢弃与已放置骨料（含ITZ）间距小于 min_distance 的候选，
+    直到存储中有 count 个骨料；接受的骨料同时以带解析图元的记录插入空间索引
+    """
+    footprints = []
+    while len(store) < count:
+        agg = candidate(len(store))
+        footprint = agg["shapely_itz"] if agg["shapely_itz"] is not None else agg["shapely_obj"]
+        if any(footprint.distance(other) < min_distance for other in footprints):
+            continue
+        footprints.append(footprint)
+        index.insert(store.record(store.append(agg), agg["primitive"]))
+    return store, index
@@ -0,0 +1,126 @@
+# tests/test_aggregate_store.py
+"""测试 src/core/aggregate_store.py 列式骨料存储"""
+
+import pytest
+import shapely.affinity
+from shapely.geometry import Polygon
+from src.core.aggregate_store import AggregateStore, to_cad_point_array
+from tests.conftest import CONFIGS, make_aggregate
+
+
+class TestAggregateStore:
+    def test_append_and_read_back(self):
+        store = AggregateStore(initial_capacity=2)
+        originals = [make_aggregate(CONFIGS[i % 3], (10.0 * i, 5.0), group_id=i % 2 + 1,
+                                    itz_thickness=0.5 * (i % 2))
+                     for i in range(9)]
+        for i, agg in enumerate(originals):
+            assert store.append(agg) == i
+        assert len(store) == 9
+
+        for i, agg in enumerate(originals):
+            restored = store[i]
+            assert restored["center"] == pytest.approx(agg["center"])
+            assert restored["radius"] == pytest.approx(agg["radius"])
+            assert restored["area"] == pytest.approx(agg["area"])
+            assert restored["group_id"] == agg["group_id"]
+            assert restored["shape_info"] == pytest.approx(agg["shape_info"])
+            assert restored["points"] == pytest.approx([tuple(p) for p in agg["points"]])
+            assert restored["shapely_obj"].equals(agg["shapely_obj"])
+            if agg["shapely_itz"] is None:
+                assert restored["shapely_itz"] is None
+            else:
+                assert restored["shapely_itz"].equals(agg["shapely_itz"])
+            assert tuple(store.bounds[i]) == pytest.approx(
+                (agg["shapely_itz"] or agg["shapely_obj"]).bounds)
+
+    def test_vectorized_polygons_match_points(self):
+        store = AggregateStore(initial_capacity=1)
+        for i in range(6):
+            store.append(make_aggregate(CONFIGS[i % 3], (3.0 * i, 1.0), itz_thickness=0.3))
+        polygons = store.polygons()
+        itz_polygons = store.itz_polygons(polygons=polygons)
+        assert len(polygons) == 6
+        for i in range(6):
+            assert polygons[i].equals(Polygon(store.points(i)))
+            assert itz_polygons[i].area > polygons[i].area
+        subset = store.polygons([4, 1])
+        assert subset[0].equals(polygons[4]) and subset[1].equals(polygons[1])
+
+    def test_clear_and_index_errors(self):
+        store = AggregateStore()
+        assert not store
+        store.append(make_aggregate(CONFIGS[1], (0.0, 0.0)))
+        assert store
+        assert store[-1]["id"] == 0
+        with pytest.raises(IndexError):
+            store[1]
+        store.clear()
+        assert len(store) == 0 and len(store.coords) == 0
+        assert len(store.polygons()) == 0
+
+    def test_translate_moves_columns_and_drops_cache(self):
+        store = AggregateStore()
+        agg = make_aggregate(CONFIGS[0], (5.0, 5.0), itz_thickness=0.4)
+        index = store.append(agg)
+        store.cache_geometry(index, agg["shapely_obj"], agg["shapely_itz"])
+        store.translate(index, 1.5, -2.0)
+        assert store.centers[index] == pytest.approx((6.5, 3.0))
+        assert tuple(store.bounds[index]) == pytest.approx(
+            shapely.affinity.translate(agg["shapely_itz"], 1.5, -2.0).bounds)
+        assert store.geometry(index)[0].equals(shapely.affinity.translate(agg["shapely_obj"], 1.5, -2.0))
+    
+    def test_primitive_follows_moves(self):
+        store = AggregateStore()
+        agg = make_aggregate(CONFIGS[2], (5.0, 5.0), itz_thickness=0.4)
+        index = store.append(agg)
+        assert store.primitive(index) == pytest.approx(agg["primitive"])
+        store.translate(index, 1.0, 2.0)
+        store.rotate(index, 0.5)
+        kind, x, y, a, b, rotation, itz_thickness = store.primitive(index)
+        assert (kind, x, y, a, b, itz_thickness) == ('ellipse', 6.0, 7.0, agg["primitive"][3], agg["primitive"][4], 0.4)
+        assert rotation == pytest.approx(agg["primitive"][5] + 0.5)
+        # 追加时没有解析图元（如贴边裁剪后）的骨料移动后仍走多边形检测
+        clipped = dict(make_aggregate(CONFIGS[1], (0.0, 0.0)), primitive=None)
+        assert store.primitive(store.append(clipped)) is None
+    
+    def test_cad_point_array(self):
+        assert to_cad_point_array([(1.0, 2.0), (3.0, 4.0)]) == [1.0, 2.0, 0.0, 3.0, 4.0, 0.0]
+
+
+class TestLazyGeometry:
+    def test_lru_cache_is_bounded(self):
+        store = AggregateStore(cache_size=3)
+        for i in range(6):
+            store.append(make_aggregate(CONFIGS[1], (10.0 * i, 0.0), itz_thickness=0.2))
+        for i in range(6):
+            polygon, itz_polygon = store.geometry(i)
+            assert polygon.equals(Polygon(store.points(i)))
+            assert itz_polygon.contains(polygon)
+        stats = store.get_cache_stats()
+        assert stats['cached'] == 3 and stats['misses'] == 6
+        store.geometry(5)
+        assert store.get_cache_stats()['hits'] == 1
+        # 全量遍历不冲掉缓存中的热点几何
+        list(store)
+        assert store.get_cache_stats()['cached'] == 3
+
+    def test_cache_geometry_reuses_objects(self):
+        store = AggregateStore(cache_size=2)
+        agg = make_aggregate(CONFIGS[0], (0.0, 0.0), itz_thickness=0.5)
+        index = store.append(agg)
+        store.cache_geometry(index, agg["shapely_obj"], agg["shapely_itz"])
+        assert store.geometry(index)[0] is agg["shapely_obj"]
+
+    def test_record_materialises_lazily(self):
+        store = AggregateStore(cache_size=0)
+        agg = make_aggregate(CONFIGS[2], (5.0, 5.0), group_id=2, itz_thickness=0.4)
+        record = store.record(store.append(agg), primitive=None)
+        assert 'shapely_obj' not in dict.keys(record)
+        assert 'shapely_itz' in record
+        assert record['group_id'] == 2
+        assert record['bounds'] == pytest.approx(agg["shapely_itz"].bounds)
+        assert record.get('shapely_obj').equals(agg["shapely_obj"])
+        assert record['shapely_itz'].equals(agg["shapely_itz"])
+        assert record['shape_info'] == pytest.approx(agg["shape_info"])
+        assert record.get('missing', 1) == 1
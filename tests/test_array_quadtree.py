@@ -0,0 +1,104 @@
+# tests/test_array_quadtree.py
+"""测试 src/core/array_quadtree.py 数组化四叉树"""
+
+import random
+from src.core.array_quadtree import ArrayQuadtree
+
+
+def _mock(bounds):
+    return {'bounds': bounds}
+
+
+def _brute_force(boxes, query):
+    return [i for i, b in enumerate(boxes)
+            if not (b[2] < query[0] or b[0] > query[2] or b[3] < query[1] or b[1] > query[3])]
+
+
+class TestArrayQuadtree:
+    def test_insert_and_query(self):
+        tree = ArrayQuadtree((0, 0, 100, 100))
+        assert tree.insert(_mock((10, 10, 20, 20)))
+        assert len(tree.query_range((0, 0, 50, 50))) == 1
+        assert len(tree.query_range((60, 60, 80, 80))) == 0
+
+    def test_reject_outside_root(self):
+        tree = ArrayQuadtree((0, 0, 100, 100))
+        assert not tree.insert(_mock((200, 200, 210, 210)))
+        assert not tree.insert({})
+        # 部分超出根边界的对象保留在根节点，仍可查询
+        assert tree.insert(_mock((95, 95, 105, 105)))
+        assert tree.query_ids((101, 101, 102, 102)).tolist() == [0]
+
+    def test_matches_brute_force_without_duplicates(self):
+        random.seed(3)
+        tree = ArrayQuadtree((0, 0, 200, 200), max_depth=6, max_objects=4, initial_capacity=2)
+        boxes = []
+        for _ in range(600):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(0.5, 8)
+            boxes.append((x - r, y - r, x + r, y + r))
+        assert tree.insert_batch([_mock(b) for b in boxes]) == 600
+        for _ in range(100):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(1, 30)
+            query = (x - r, y - r, x + r, y + r)
+            assert tree.query_ids(query).tolist() == _brute_force(boxes, query)
+        stats = tree.get_stats()
+        assert stats['total_nodes'] > 1 and stats['max_depth'] <= 6
+
+    def test_bulk_load_matches_brute_force(self):
+        random.seed(23)
+        tree = ArrayQuadtree((0, 0, 200, 200), max_depth=6, max_objects=4, initial_capacity=2)
+        boxes = []
+        for _ in range(900):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(0.5, 8)
+            boxes.append((x - r, y - r, x + r, y + r))
+        assert tree.insert_batch([_mock(b) for b in boxes[:300]]) == 300
+        assert tree.insert_batch([_mock(b) for b in boxes[300:800]] + [_mock((300, 300, 310, 310))]) == 500
+        for b in boxes[800:]:
+            assert tree.insert(_mock(b))
+        for _ in range(60):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(1, 30)
+            query = (x - r, y - r, x + r, y + r)
+            assert tree.query_ids(query).tolist() == _brute_force(boxes, query)
+        assert tree.get_stats()['max_depth'] <= 6
+    
+    def test_query_returns_objects_by_id(self):
+        tree = ArrayQuadtree((0, 0, 100, 100))
+        objects = [_mock((i, i, i + 1, i + 1)) for i in range(30)]
+        tree.insert_batch(objects)
+        assert tree.query_range((10.5, 10.5, 12, 12)) == objects[10:13]
+        assert tree.get_object(7) is objects[7]
+
+    def test_query_ids_return_object_ids(self):
+        """与 Quadtree 一样返回对象的 id 字段，而非内部编号"""
+        tree = ArrayQuadtree((0, 0, 100, 100), max_objects=2)
+        objects = [{'id': 100 + i, 'bounds': (i, i, i + 1, i + 1)} for i in range(30)]
+        tree.insert_batch(objects[:20])
+        for obj in objects[20:]:
+            tree.insert(obj)
+        assert tree.query_ids((10.5, 10.5, 12, 12)).tolist() == [110, 111, 112]
+        assert tree.query_ids((24.5, 24.5, 26, 26)).tolist() == [124, 125, 126]
+        assert tree.get_object(111) is objects[11]
+
+    def test_query_ids_after_remove_and_update(self):
+        """删除触发压缩重新编号、移动后，query_ids 仍返回对象的 id 字段"""
+        tree = ArrayQuadtree((0, 0, 100, 100), max_objects=2)
+        tree.insert_batch([{'id': 100 + i, 'bounds': (i * 5, 0, i * 5 + 1, 1)} for i in range(10)])
+        for i in range(100, 106):
+            assert tree.remove(i)
+        assert tree.query_ids((0, 0, 100, 10)).tolist() == [106, 107, 108, 109]
+        assert tree.update(107, (50, 50, 51, 51))
+        assert tree.query_ids((0, 0, 100, 10)).tolist() == [106, 108, 109]
+        assert tree.query_ids((45, 45, 60, 60)).tolist() == [107]
+        assert tree.get_object(107)['id'] == 107
+
+    def test_clear(self):
+        tree = ArrayQuadtree((0, 0, 100, 100), max_objects=2)
+        tree.insert_batch([_mock((i, i, i + 1, i + 1)) for i in range(20)])
+        tree.clear()
+        assert len(tree.query_range((0, 0, 100, 100))) == 0
+        assert tree.get_stats()['total_nodes'] == 1
+
+    def test_spatial_index_protocol(self):
+        """验证 ArrayQuadtree 符合 SpatialIndex 协议"""
+        from src.core.spatial_index import SpatialIndex
+        assert isinstance(ArrayQuadtree((0, 0, 100, 100)), SpatialIndex)
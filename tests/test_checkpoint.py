@@ -0,0 +1,95 @@
+# tests/test_checkpoint.py
+"""测试 src/core/checkpoint.py 生成检查点读写"""
+
+import os
+import random
+import numpy as np
+import pytest
+from src.core.aggregate_store import AggregateStore
+from src.core.checkpoint import save_checkpoint, load_checkpoint
+from src.core.grid_index import GridIndex
+from tests.conftest import CONFIGS, make_aggregate
+
+
+def make_store(count):
+    store = AggregateStore(initial_capacity=2)
+    for i in range(count):
+        store.append(make_aggregate(CONFIGS[i % 3], (12.0 * i, 6.0), group_id=i % 2 + 1,
+                                    itz_thickness=0.5 * (i % 2)))
+    return store
+
+
+STATE = {
+    "region": [0.0, 0.0, 100.0, 20.0],
+    "groups": [{"area_ratio": 0.5, "target_area": 1000.0, "generated_area": 123.4, "count": 5}],
+    "rounds_completed": 1
+}
+
+
+class TestCheckpoint:
+    def test_round_trip(self, tmp_path):
+        store = make_store(7)
+        random.seed(42)
+        filename = str(tmp_path / "run.npz")
+        save_checkpoint(filename, store, STATE, random.getstate())
+        expected = [random.random() for _ in range(5)]
+
+        arrays, state, rng_state = load_checkpoint(filename)
+        assert state == STATE
+        restored = AggregateStore()
+        restored.load_arrays(arrays)
+        assert len(restored) == len(store)
+        for i in range(len(store)):
+            assert restored[i]["group_id"] == store[i]["group_id"]
+            assert restored[i]["shape_info"] == store[i]["shape_info"]
+            np.testing.assert_allclose(restored[i]["points"], store[i]["points"])
+            assert restored.geometry(i)[0].equals(store.geometry(i)[0])
+        np.testing.assert_array_equal(restored.bounds, store.bounds)
+
+        random.setstate(rng_state)
+        assert [random.random() for _ in range(5)] == expected
+
+    def test_restored_store_loads_into_index_and_grows(self, tmp_path):
+        store = make_store(5)
+        filename = str(tmp_path / "run.npz")
+        save_checkpoint(filename, store, STATE, random.getstate())
+        restored = AggregateStore(initial_capacity=1)
+        restored.load_arrays(load_checkpoint(filename)[0])
+
+        index = GridIndex((-10.0, -10.0, 100.0, 20.0), cell_size=10.0)
+        index.insert_batch([restored.record(i, restored.primitive(i)) for i in range(len(restored))])
+        records = sorted(index.query_range((-10, -10, 100, 20)), key=lambda r: r["id"])
+        assert [r["id"] for r in records] == list(range(5))
+        # 圆/椭圆恢复后仍带解析图元，多边形没有
+        assert [r["primitive"] for r in records] == [store.primitive(i) for i in range(5)]
+        assert [r["primitive"] is None for r in records] == [True, False, False, True, False]
+        assert restored.append(make_aggregate(CONFIGS[0], (70.0, 6.0))) == 5
+        assert restored[4]["center"] == store[4]["center"]
+
+    def test_overwrite_is_atomic(self, tmp_path):
+        filename = str(tmp_path / "run.npz")
+        save_checkpoint(filename, make_store(2), STATE, random.getstate())
+        save_checkpoint(filename, make_store(4), STATE, random.getstate())
+        assert os.listdir(tmp_path) == ["run.npz"]
+        restored = AggregateStore()
+        restored.load_arrays(load_checkpoint(filename)[0])
+        assert len(restored) == 4
+
+    def test_empty_store(self, tmp_path):
+        filename = str(tmp_path / "run.npz")
+        save_checkpoint(filename, AggregateStore(), STATE, random.getstate())
+        restored = make_store(3)
+        restored.load_arrays(load_checkpoint(filename)[0])
+        assert len(restored) == 0
+
+    def test_rejects_other_files(self, tmp_path):
+        filename = str(tmp_path / "other.npz")
+        np.savez(filename, data=np.zeros(3))
+        with pytest.raises(ValueError):
+            load_checkpoint(filename)
+
+    def test_load_arrays_validates_offsets(self):
+        arrays = make_store(3).to_arrays()
+        arrays["offsets"] = arrays["offsets"][:-1]
+        with pytest.raises(ValueError):
+            AggregateStore().load_arrays(arrays)
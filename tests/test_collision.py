@@ -11,7 +11,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 import unittest
 from src.core.collision import (
     SHAPELY_AVAILABLE,
+    bbox_candidate_indices,
+    batch_collides,
+    batch_intersects,
+    check_collision_analytic,
     check_collision_hierarchical,
+    ellipse_contact_function,
+    make_primitive,
     GPUDistanceCalculator,
     gpu_calculator,
 )
@@ -93,6 +99,121 @@ class TestCollisionDetection(unittest.TestCase):
         )
         self.assertFalse(result, "远距离的ITZ不应检测到碰撞")
 
+    @unittest.skipIf(not SHAPELY_AVAILABLE, "Shapely未安装，跳过碰撞检测测试")
+    def test_batch_intersects_vectorized(self):
+        """batch_intersects 应一次返回每个候选的相交结果"""
+        query = self._make_circle_polygon(0, 0, 5)
+        candidates = [
+            self._make_circle_polygon(100, 0, 5),
+            self._make_circle_polygon(8, 0, 5),
+            self._make_circle_polygon(0, 100, 5),
+        ]
+        result = batch_intersects(query, candidates)
+        self.assertEqual(result.tolist(), [False, True, False])
+        self.assertEqual(len(batch_intersects(query, [])), 0)
+
+    @unittest.skipIf(not SHAPELY_AVAILABLE, "Shapely未安装，跳过碰撞检测测试")
+    def test_min_distance_enforced(self):
+        """间隙小于最小间距时应检测到碰撞，大于时不应碰撞"""
+        from shapely.geometry import box
+        shape = box(0, 0, 10, 10)
+        neighbour = box(11, 0, 20, 10)  # 间隙 1.0
+
+        self.assertTrue(check_collision_hierarchical(shape, None, [neighbour], min_distance=1.5))
+        self.assertFalse(check_collision_hierarchical(shape, None, [neighbour], min_distance=0.5))
+
+    @unittest.skipIf(not SHAPELY_AVAILABLE, "Shapely未安装，跳过碰撞检测测试")
+    def test_allow_touching(self):
+        """恰好接触时由 allow_touching 决定是否视为碰撞"""
+        from shapely.geometry import box
+        shape = box(0, 0, 10, 10)
+        touching = box(10, 0, 20, 10)
+        gap_exact = box(12, 0, 20, 10)  # 间隙恰好 2.0
+
+        self.assertFalse(check_collision_hierarchical(shape, None, [touching], 0.0, allow_touching=True))
+        self.assertTrue(check_collision_hierarchical(shape, None, [touching], 0.0, allow_touching=False))
+        self.assertFalse(check_collision_hierarchical(shape, None, [gap_exact], 2.0, allow_touching=True))
+        self.assertTrue(check_collision_hierarchical(shape, None, [gap_exact], 2.0, allow_touching=False))
+
+    @unittest.skipIf(not SHAPELY_AVAILABLE, "Shapely未安装，跳过碰撞检测测试")
+    def test_batch_collides_with_gap(self):
+        """batch_collides 应逐个返回间距检测结果"""
+        from shapely.geometry import box
+        query = box(0, 0, 10, 10)
+        candidates = [box(10.5, 0, 20, 10), box(13, 0, 20, 10), box(5, 5, 15, 15)]
+        result = batch_collides(query, candidates, min_distance=1.0)
+        self.assertEqual(result.tolist(), [True, False, True])
+
+    @unittest.skipIf(not SHAPELY_AVAILABLE, "Shapely未安装，跳过碰撞检测测试")
+    def test_many_candidates_single_collision(self):
+        """大批候选中只有一个重叠时也应检测到碰撞"""
+        existing = [self._make_circle_polygon(i * 20, 50, 5) for i in range(200)]
+        existing.append(self._make_circle_polygon(3, 3, 5))
+        shape = self._make_circle_polygon(0, 0, 5)
+
+        result = check_collision_hierarchical(shape, None, existing, min_distance=0.0)
+        self.assertTrue(result)
+
+    @unittest.skipIf(not SHAPELY_AVAILABLE, "Shapely未安装，跳过碰撞检测测试")
+    def test_spatial_index_empty_result_means_no_collision(self):
+        """空间索引未返回候选时不应回退到全量列表"""
+        from src.core.quadtree import Quadtree
+        index = Quadtree((0, 0, 100, 100))
+        shape = self._make_circle_polygon(50, 50, 5)
+        overlapping = self._make_circle_polygon(52, 50, 5)
+
+        result = check_collision_hierarchical(shape, None, [overlapping], 0.0, quadtree=index)
+        self.assertFalse(result)
+
+        index.insert({'shapely_obj': overlapping, 'shapely_itz': None})
+        result = check_collision_hierarchical(shape, None, [], 0.0, quadtree=index)
+        self.assertTrue(result)
+
+
+class TestAnalyticCollision(unittest.TestCase):
+    """圆/椭圆解析碰撞检测测试类"""
+
+    def _circle(self, x, y, r, itz=0.0):
+        return {'primitive': make_primitive({'shape': 'circle', 'radius': r}, (x, y), itz)}
+
+    def _ellipse(self, x, y, a, b, rotation, itz=0.0):
+        info = {'shape': 'ellipse', 'major_axis': a, 'minor_axis': b, 'rotation': rotation}
+        return {'primitive': make_primitive(info, (x, y), itz)}
+
+    def test_polygon_has_no_primitive(self):
+        self.assertIsNone(make_primitive({'shape': 'polygon'}, (0, 0)))
+
+    def test_circle_pair_uses_centre_distance(self):
+        new = self._circle(0, 0, 2, itz=0.5)['primitive']
+        collision, undecided = check_collision_analytic(new, [self._circle(5.5, 0, 2, itz=0.5)])
+        self.assertFalse(collision)
+        self.assertEqual(undecided, [])
+        collision, _ = check_collision_analytic(new, [self._circle(5.5, 0, 2, itz=0.5)], min_distance=0.6)
+        self.assertTrue(collision)
+
+    def test_contact_function_circles(self):
+        """两圆的接触函数等于 (d / (r1 + r2))²"""
+        p1 = make_primitive({'shape': 'circle', 'radius': 2}, (0, 0))
+        p2 = make_primitive({'shape': 'circle', 'radius': 3}, (10, 0))
+        self.assertAlmostEqual(ellipse_contact_function(p1, p2), 4.0, places=6)
+
+    def test_crossed_ellipses(self):
+        """十字交叉的椭圆外接圆远大于间距，应由接触函数判定碰撞"""
+        import math
+        new = self._ellipse(0, 0, 5, 1, 0.0)['primitive']
+        collision, _ = check_collision_analytic(new, [self._ellipse(3, 0, 5, 1, math.pi / 2)])
+        self.assertTrue(collision)
+        collision, undecided = check_collision_analytic(new, [self._ellipse(0, 3, 5, 1, 0.0)])
+        self.assertFalse(collision)
+        self.assertEqual(undecided, [])
+
+    def test_polygon_candidates_left_undecided(self):
+        new = self._circle(0, 0, 2)['primitive']
+        polygon_obj = {'primitive': None, 'shapely_obj': None}
+        collision, undecided = check_collision_analytic(new, [polygon_obj])
+        self.assertFalse(collision)
+        self.assertEqual(undecided, [polygon_obj])
+
 
 class TestGPUDistanceCalculator(unittest.TestCase):
     """GPU距离计算器测试类"""
@@ -128,6 +249,47 @@ class TestGPUDistanceCalculator(unittest.TestCase):
         # 第二个在远处
         self.assertFalse(result[1])
 
+    def test_cpu_fallback_matches_min_distance(self):
+        """CPU回退按最小间距扩展边界框，接受 NumPy 边界数组"""
+        import numpy as np
+        calc = GPUDistanceCalculator()
+        bounds = np.array([(11, 0, 12, 1), (13, 0, 14, 1), (-3, -3, -2.5, -2.5)])
+        result = calc._calculate_distances_cpu((0, 0, 10, 10), bounds, 2.0)
+        self.assertEqual(result, [True, False, False])
+    
+    def test_bbox_candidate_indices(self):
+        """NumPy 预筛选返回与扩展边界框相交的行号"""
+        import numpy as np
+        bounds = np.array([(0, 0, 1, 1), (5, 5, 6, 6), (1.4, 0, 2, 1), (20, 20, 21, 21)])
+        self.assertEqual(bbox_candidate_indices(bounds, (0.5, 0.5, 1.0, 1.0)).tolist(), [0])
+        self.assertEqual(bbox_candidate_indices(bounds, (0.5, 0.5, 1.0, 1.0), 0.5).tolist(), [0, 2])
+        self.assertEqual(bbox_candidate_indices(np.empty((0, 4)), (0, 0, 1, 1)).tolist(), [])
+    
+    def test_persistent_bounds_buffer(self):
+        """常驻边界缓冲区只追加、按倍数扩容，一次回答多个查询框"""
+        import random
+        import numpy as np
+        random.seed(4)
+        calc = GPUDistanceCalculator()
+        calc.reset_bounds(initial_capacity=2)
+        boxes = []
+        for _ in range(50):
+            x, y = random.uniform(0, 100), random.uniform(0, 100)
+            boxes.append((x, y, x + 3, y + 2))
+        self.assertEqual(calc.append_bounds(boxes[0]), 0)
+        self.assertEqual(calc.extend_bounds(np.array(boxes[1:])), 49)
+        self.assertEqual(calc.buffer_size, 50)
+        queries = [(10, 10, 30, 30), (50, 0, 52, 100), (200, 200, 201, 201)]
+        masks = calc.query_masks(queries, 1.0)
+        self.assertEqual(masks.shape, (3, 50))
+        candidates = calc.query_candidates(queries, 1.0)
+        for query, mask, ids in zip(queries, masks, candidates):
+            expected = bbox_candidate_indices(np.array(boxes), query, 1.0)
+            self.assertEqual(np.flatnonzero(mask).tolist(), expected.tolist())
+            self.assertEqual(ids.tolist(), expected.tolist())
+        calc.reset_bounds()
+        self.assertEqual(calc.query_masks((0, 0, 1, 1)).shape, (1, 0))
+    
     def test_global_gpu_calculator_instance(self):
         """全局 gpu_calculator 实例应存在"""
         self.assertIsNotNone(gpu_calculator)
@@ -0,0 +1,67 @@
+# tests/test_densification.py
+"""测试 src/core/densification.py 重力沉降密实化"""
+
+import random
+import numpy as np
+import pytest
+import shapely
+from src.core.aggregate_store import AggregateStore
+from src.core.densification import GravityDensifier
+from src.core.quadtree import Quadtree
+from tests.conftest import make_aggregate, pack_aggregates
+
+REGION = (0.0, 0.0, 60.0, 60.0)
+
+
+def _scatter(count, seed, itz_thickness=0.3, min_distance=0.2):
+    random.seed(seed)
+
+    def candidate(_):
+        radius = random.uniform(1.0, 3.0)
+        center = (random.uniform(radius, 60 - radius), random.uniform(radius, 60 - radius))
+        config = {"type": "circle", "min_radius": radius, "max_radius": radius, "segments": 32}
+        return make_aggregate(config, center, itz_thickness=itz_thickness)
+
+    return pack_aggregates(AggregateStore(initial_capacity=8), Quadtree(REGION, max_depth=6, max_objects=4),
+                           candidate, count, min_distance)
+
+
+def _min_gap(store):
+    polygons = store.polygons()
+    itz_polygons = store.itz_polygons(polygons=polygons)
+    footprints = [itz if itz is not None else p for p, itz in zip(polygons, itz_polygons)]
+    return min(footprints[i].distance(footprints[j])
+               for i in range(len(footprints)) for j in range(i + 1, len(footprints)))
+
+
+class TestGravityDensifier:
+    def test_settle_down_keeps_gaps_and_region(self):
+        store, index = _scatter(60, seed=7)
+        mean_y = store.centers[:, 1].mean()
+        stats = GravityDensifier(store, index, REGION, min_distance=0.2).settle()
+        assert stats['moves'] > 0
+        assert store.centers[:, 1].mean() < mean_y - 5.0
+        assert _min_gap(store) >= 0.2 - 1e-9
+        assert store.coords.min() >= 0.0 and store.coords.max() <= 60.0
+        # 索引按新位置重建，且缓存的几何与坐标一致
+        for i in range(len(store)):
+            records = [r for r in index.query_range(tuple(store.bounds[i])) if r['id'] == i]
+            assert len(records) == 1
+            # 解析图元随骨料一起移动，沉降后仍走解析碰撞检测
+            assert records[0]['primitive'][1:3] == pytest.approx(tuple(store.centers[i]))
+            assert store.geometry(i)[0].equals(shapely.Polygon(store.points(i)))
+
+    def test_inward_and_fixed_aggregates(self):
+        store, index = _scatter(40, seed=11, itz_thickness=0.0, min_distance=0.0)
+        fixed = store.centers[:10].copy()
+        center = np.array([30.0, 30.0])
+        spread = np.hypot(*(store.centers[10:] - center).T).mean()
+        GravityDensifier(store, index, REGION, direction="inward", first_index=10).settle()
+        assert np.array_equal(store.centers[:10], fixed)
+        assert np.hypot(*(store.centers[10:] - center).T).mean() < spread
+        assert _min_gap(store) >= 0.0
+
+    def test_invalid_direction(self):
+        store, index = _scatter(1, seed=1)
+        with pytest.raises(ValueError):
+            GravityDensifier(store, index, REGION, direction="up")
@@ -0,0 +1,117 @@
+# tests/test_free_space.py
+"""测试 src/core/free_space.py 空隙感知采样"""
+
+import random
+import threading
+import numpy as np
+import pytest
+from shapely.geometry import Point, box
+from src.core.free_space import FreeSpaceSampler
+
+
+class TestFreeSpaceSampler:
+    def test_invalid_cell_size(self):
+        with pytest.raises(ValueError):
+            FreeSpaceSampler((0, 0, 100, 100), cell_size=0, max_clearance=5)
+
+    def test_empty_sampler_samples_in_bounds(self):
+        random.seed(0)
+        sampler = FreeSpaceSampler((10, 20, 50, 40), cell_size=3, max_clearance=5)
+        for _ in range(200):
+            x, y = sampler.sample(2.0)
+            assert 10 <= x <= 50 and 20 <= y <= 40
+        assert sampler.free_fraction(2.0) == 1.0
+
+    def test_samples_avoid_occupied_space(self):
+        random.seed(1)
+        sampler = FreeSpaceSampler((0, 0, 100, 100), cell_size=1, max_clearance=5)
+        disc = Point(50, 50).buffer(30)
+        sampler.mark_occupied(disc)
+        for _ in range(500):
+            center = sampler.sample(3.0)
+            assert center is not None
+            # 单元格半对角线约0.71，所需间隙超过其两倍时采样点不会落在骨料内
+            assert disc.distance(Point(center)) > 0
+
+    def test_never_excludes_feasible_space(self):
+        sampler = FreeSpaceSampler((0, 0, 100, 100), cell_size=2, max_clearance=5)
+        sampler.mark_occupied(box(0, 0, 60, 100))
+        # x >= 64 处的点与骨料距离不小于4，其所在单元格必须可采样
+        cells = set(sampler._eligible_cells(4.0).tolist())
+        for iy in range(sampler.ny):
+            for ix in range(sampler.nx):
+                if sampler._xs[ix] - 1 >= 64:
+                    assert iy * sampler.nx + ix in cells
+
+    def test_full_region_returns_none(self):
+        sampler = FreeSpaceSampler((0, 0, 20, 20), cell_size=1, max_clearance=5)
+        sampler.mark_occupied(box(-5, -5, 25, 25))
+        assert sampler.sample(1.0) is None
+        assert sampler.free_fraction(1.0) == 0.0
+
+    def test_free_fraction_and_clear(self):
+        sampler = FreeSpaceSampler((0, 0, 100, 100), cell_size=2, max_clearance=5)
+        sampler.mark_occupied(box(0, 0, 50, 100))
+        assert 0.4 < sampler.free_fraction(2.0) <= 0.5
+        sampler.clear()
+        assert sampler.free_fraction(2.0) == 1.0
+
+    def test_larger_clearance_is_stricter(self):
+        sampler = FreeSpaceSampler((0, 0, 100, 100), cell_size=1, max_clearance=10)
+        sampler.mark_occupied(Point(50, 50).buffer(10))
+        assert sampler.free_fraction(8.0) < sampler.free_fraction(2.0)
+
+    def test_incremental_eligible_cells_match_rescan(self):
+        """候选列表增量维护后，可采样单元格与按当前间隙重新扫描的结果一致"""
+        random.seed(4)
+        sampler = FreeSpaceSampler((0, 0, 100, 100), cell_size=1, max_clearance=6)
+        clearances = [0.5, 2.0, 4.5]
+        for _ in range(60):
+            for clearance in clearances:
+                sampler.sample(clearance)
+            sampler.mark_occupied(Point(random.uniform(0, 100), random.uniform(0, 100)).buffer(random.uniform(1, 4)))
+            for clearance in clearances:
+                threshold = sampler._threshold(sampler._level(clearance))
+                expected = set(np.flatnonzero(sampler._free.ravel() >= threshold).tolist())
+                cells = sampler._eligible_cells(clearance)
+                live = {c for c in cells.tolist() if sampler._free.ravel()[c] >= threshold}
+                assert live == expected and len(cells) == len(set(cells.tolist()))
+                assert sampler.free_fraction(clearance) == len(expected) / sampler._free.size
+
+    def test_concurrent_sampling_and_marking(self):
+        """多线程采样与 mark_occupied 并发时不出错，失效计数不丢失"""
+        random.seed(6)
+        sampler = FreeSpaceSampler((0, 0, 100, 100), cell_size=1, max_clearance=6)
+        discs = [Point(random.uniform(0, 100), random.uniform(0, 100)).buffer(random.uniform(1, 4))
+                 for _ in range(150)]
+        done = threading.Event()
+        errors = []
+
+        def worker(seed):
+            rng = random.Random(seed)
+            try:
+                while not done.is_set():
+                    clearance = rng.uniform(0.5, 5.0)
+                    sampler.sample(clearance)
+                    sampler.free_fraction(clearance)
+            except Exception as exc:
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker, args=(seed,)) for seed in range(4)]
+        for thread in threads:
+            thread.start()
+        for disc in discs:
+            sampler.mark_occupied(disc)
+        done.set()
+        for thread in threads:
+            thread.join()
+        assert not errors
+        for level in list(sampler._eligible_cache):
+            expected = np.count_nonzero(sampler._free >= sampler._threshold(level))
+            assert sampler._eligible_cache[level].size - sampler._stale[level] == expected
+
+    def test_get_stats(self):
+        sampler = FreeSpaceSampler((0, 0, 100, 50), cell_size=5, max_clearance=5)
+        stats = sampler.get_stats()
+        assert stats['grid_shape'] == (10, 20)
+        assert stats['free_fraction'] == 1.0
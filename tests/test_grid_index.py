@@ -0,0 +1,72 @@
+# tests/test_grid_index.py
+"""测试 src/core/grid_index.py 均匀网格空间索引"""
+
+import pytest
+from src.core.grid_index import GridIndex
+
+
+def _mock(bounds):
+    return {'shapely_obj': type('Mock', (), {'bounds': bounds})()}
+
+
+class TestGridIndex:
+    def test_init(self):
+        grid = GridIndex((0, 0, 100, 100), cell_size=10)
+        assert grid.bounds == (0, 0, 100, 100)
+        assert grid.cell_size == 10
+
+    def test_invalid_cell_size(self):
+        with pytest.raises(ValueError):
+            GridIndex((0, 0, 100, 100), cell_size=0)
+
+    def test_insert_and_query(self):
+        grid = GridIndex((0, 0, 100, 100), cell_size=10)
+        grid.insert(_mock((10, 10, 20, 20)))
+        assert len(grid.query_range((0, 0, 50, 50))) == 1
+        assert len(grid.query_range((60, 60, 80, 80))) == 0
+
+    def test_object_larger_than_cell(self):
+        """跨越多个单元格的对象也应被邻近查询找到"""
+        grid = GridIndex((0, 0, 100, 100), cell_size=5)
+        grid.insert(_mock((10, 10, 40, 40)))
+        assert len(grid.query_range((38, 38, 45, 45))) == 1
+
+    def test_capacity_growth(self):
+        grid = GridIndex((0, 0, 100, 100), cell_size=10, initial_capacity=2)
+        objects = [_mock((i, i, i + 1, i + 1)) for i in range(50)]
+        assert grid.insert_batch(objects) == 50
+        results = grid.query_range((0, 0, 100, 100))
+        assert len(results) == 50
+        assert len(grid.query_range((10.5, 10.5, 12, 12))) == 3
+
+    def test_clear(self):
+        grid = GridIndex((0, 0, 100, 100), cell_size=10)
+        grid.insert(_mock((10, 10, 20, 20)))
+        grid.clear()
+        assert len(grid.query_range((0, 0, 100, 100))) == 0
+
+    def test_get_stats(self):
+        grid = GridIndex((0, 0, 100, 100), cell_size=10)
+        grid.insert(_mock((1, 1, 2, 2)))
+        grid.insert(_mock((3, 3, 4, 4)))
+        stats = grid.get_stats()
+        assert stats['total_objects'] == 2
+        assert stats['occupied_cells'] == 1
+        assert stats['max_objects_per_cell'] == 2
+
+    def test_spatial_index_protocol(self):
+        """验证 GridIndex 符合 SpatialIndex 协议"""
+        from src.core.spatial_index import SpatialIndex
+        assert isinstance(GridIndex((0, 0, 100, 100), cell_size=10), SpatialIndex)
+
+    def test_insert_batch_matches_insert(self):
+        objects = [_mock((i * 3.7 % 97, i * 5.3 % 89, i * 3.7 % 97 + 2, i * 5.3 % 89 + 4)) for i in range(200)]
+        batch = GridIndex((0, 0, 100, 100), cell_size=7)
+        single = GridIndex((0, 0, 100, 100), cell_size=7)
+        assert batch.insert_batch(objects[:150]) == 150
+        assert batch.insert_batch(objects[150:] + [{}]) == 50
+        for obj in objects:
+            single.insert(obj)
+        assert batch._cells == single._cells
+        for query in [(0, 0, 10, 10), (20, 30, 60, 35), (90, 90, 100, 100)]:
+            assert batch.query_range(query) == single.query_range(query)
@@ -6,7 +6,7 @@ import pytest
 from src.utils.helpers import (
     clip, calculate_polygon_area, calculate_circle_area, calculate_ellipse_area,
     calculate_bounding_circle, is_near_boundary, move_toward_boundary,
-    adjust_points_to_boundary, calculate_distance, normalize_angle, linear_interpolate,
+    adjust_points_to_boundary, adjust_aggregate_to_boundary, calculate_distance, normalize_angle, linear_interpolate,
     _get_xy
 )
 
@@ -179,6 +179,19 @@ class TestAdjustPointsToBoundary:
         assert result[0] == (50, 50)
 
 
+class TestAdjustAggregateToBoundary:
+    def test_far_from_boundary_returns_none(self):
+        points = [(49, 50), (51, 50), (50, 51), (49, 50)]
+        assert adjust_aggregate_to_boundary((50, 50), points, 1.0, (0, 0), (100, 100), 0.0) is None
+
+    def test_near_boundary_moves_and_clips(self):
+        points = [(1, 5), (5, 5), (3, 8), (1, 5)]
+        center, adjusted, radius = adjust_aggregate_to_boundary((3, 6), points, 4.0, (0, 0), (100, 100), 0.0)
+        assert center == (0.1, 6)
+        assert all(x >= 0.1 for x, _ in adjusted)
+        assert radius > 0
+
+
 class TestCalculateDistance:
     def test_horizontal(self):
         assert calculate_distance((0, 0), (3, 0)) == 3.0
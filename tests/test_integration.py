@@ -109,6 +109,69 @@ class TestGroupManager(unittest.TestCase):
         self.assertEqual(configs[0]['generated_area'], 0.0)
         self.assertEqual(configs[0]['count'], 0)
 
+    def test_select_next_group_lowest_progress(self):
+        """select_next_group 应返回进度最低的组，进度相同时按组顺序"""
+        config = [dict(_make_valid_config()[0], area_ratio=ratio) for ratio in (10.0, 20.0, 30.0)]
+        self.manager.set_config(config)
+        self.manager.initialize_targets(1000.0)
+        self.assertEqual(self.manager.select_next_group("count")['id'], 1)
+
+        self.manager.record_aggregate(1, 50.0)   # 进度 0.5
+        self.manager.record_aggregate(2, 40.0)   # 进度 0.2
+        self.assertEqual(self.manager.select_next_group("count")['id'], 3)
+
+        self.manager.record_aggregate(3, 150.0)  # 进度 0.5
+        self.assertEqual(self.manager.select_next_group("porosity")['id'], 2)
+
+    def test_incremental_totals(self):
+        """record_aggregate 应增量维护剩余组数和平均进度"""
+        config = [dict(_make_valid_config()[0], max_count=1), dict(_make_valid_config()[0], max_count=2)]
+        self.manager.set_config(config)
+        self.manager.initialize_targets(100.0)
+        self.assertEqual(self.manager.total_max_count, 3)
+        self.assertEqual(self.manager.remaining_groups, 2)
+
+        self.manager.record_aggregate(1, 40.0)
+        self.assertEqual(self.manager.remaining_groups, 1)
+        self.assertAlmostEqual(self.manager.mean_progress(), 0.5)
+        self.assertEqual(self.manager.select_next_group("count")['id'], 2)
+
+        self.manager.record_aggregate(2, 10.0)
+        self.manager.record_aggregate(2, 10.0)
+        self.assertFalse(self.manager.has_remaining_groups())
+        self.assertIsNone(self.manager.select_next_group("count"))
+
+        self.manager.reset_group_stats()
+        self.assertEqual(self.manager.remaining_groups, 2)
+        self.assertAlmostEqual(self.manager.mean_progress(), 0.0)
+
+    def test_record_unknown_group(self):
+        """未知组ID不应改变统计"""
+        self.manager.set_config(_make_valid_config())
+        self.assertIsNone(self.manager.record_aggregate(99, 10.0))
+        self.assertFalse(self.manager.update_group_stats(99, 10.0))
+        self.assertEqual(self.manager.get_config()[0]['count'], 0)
+
+    def test_build_placement_queue_sorted_by_size(self):
+        """预抽样颗粒按半径降序排列，数量模式抽满剩余数量，面积模式达到目标即停止"""
+        config = [dict(_make_valid_config()[0], max_count=3), dict(_make_valid_config()[0], max_count=4)]
+        self.manager.set_config(config)
+        self.manager.initialize_targets(100.0)
+        self.manager.record_aggregate(1, 5.0)
+        radii = {1: iter([1.0, 3.0]), 2: iter([2.0, 4.0, 0.5, 2.5])}
+        
+        def sample(group):
+            radius = next(radii[group['id']])
+            return 0, (None, radius, radius * 10.0, {}, radius)
+        
+        queue = self.manager.build_placement_queue(sample)
+        self.assertEqual([shape[1] for _, _, shape in queue], [4.0, 3.0, 2.5, 2.0, 1.0, 0.5])
+        self.assertEqual([group['id'] for group, _, _ in queue], [2, 1, 2, 2, 1, 2])
+        
+        radii = {1: iter([1.0, 3.0]), 2: iter([2.0, 4.0, 0.5, 2.5])}
+        queue = self.manager.build_placement_queue(sample, {1: 15.0, 2: 50.0})
+        self.assertEqual([shape[1] for _, _, shape in queue], [4.0, 3.0, 2.0, 1.0])
+    
     def test_config_missing_required_field_raises(self):
         """缺少必填字段应抛出 ValueError"""
         config = [{
@@ -1,7 +1,7 @@
 # tests/test_kd_tree.py
 """测试 src/core/kd_tree.py KD树空间索引"""
 
-import pytest
+import random
 from src.core.kd_tree import KDTree
 
 
@@ -50,3 +50,52 @@ class TestKDTree:
         from src.core.spatial_index import SpatialIndex
         kdt = KDTree((0, 0, 100, 100))
         assert isinstance(kdt, SpatialIndex)
+
+    def test_incremental_inserts_match_brute_force(self):
+        """大量增量插入后查询结果与暴力筛选一致（含中心在中位线另一侧的跨线对象）"""
+        random.seed(7)
+        kdt = KDTree((0, 0, 200, 200), max_depth=4, max_objects=3)
+        boxes = []
+        for i in range(700):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(0.5, 10)
+            boxes.append((x - r, y - r, x + r, y + r))
+            assert kdt.insert({'id': i, 'center': (x, y), 'bounds': boxes[-1]})
+        for _ in range(100):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(1, 25)
+            query = (x - r, y - r, x + r, y + r)
+            expected = [i for i, b in enumerate(boxes)
+                        if not (b[2] < query[0] or b[0] > query[2] or b[3] < query[1] or b[1] > query[3])]
+            assert sorted(obj['id'] for obj in kdt.query_range(query)) == expected
+
+    def test_forest_stays_logarithmic(self):
+        kdt = KDTree((0, 0, 100, 100), max_objects=2)
+        kdt.insert_batch([{'bounds': (i % 100, i // 100, i % 100 + 1, i // 100 + 1)} for i in range(1000)])
+        stats = kdt.get_stats()
+        assert stats['total_objects'] == 1000
+        # 缓冲区容量为8，1000 = 8 × 125，125 的二进制有6个1
+        assert stats['tree_count'] == 6 and stats['buffer_size'] == 0
+        assert stats['max_depth'] <= 8
+
+    def test_bulk_load_matches_brute_force(self):
+        """批量装载（含与已有对象合并重建）后查询结果与暴力筛选一致"""
+        random.seed(17)
+        kdt = KDTree((0, 0, 200, 200), max_objects=3)
+        boxes = []
+        for i in range(1300):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(0.5, 10)
+            boxes.append((x - r, y - r, x + r, y + r))
+        objects = [{'id': i, 'bounds': b} for i, b in enumerate(boxes)]
+        assert kdt.insert_batch(objects[:500]) == 500
+        for obj in objects[500:530]:
+            kdt.insert(obj)
+        assert kdt.insert_batch(objects[530:]) == 770
+        stats = kdt.get_stats()
+        assert stats['total_objects'] == 1300
+        # 缓冲区容量为12，1300 = 12 × 108 + 4，108 的二进制有4个1
+        assert stats['tree_count'] == 4 and stats['buffer_size'] == 4
+        for _ in range(100):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(1, 25)
+            query = (x - r, y - r, x + r, y + r)
+            expected = [i for i, b in enumerate(boxes)
+                        if not (b[2] < query[0] or b[0] > query[2] or b[3] < query[1] or b[1] > query[3])]
+            assert sorted(obj['id'] for obj in kdt.query_range(query)) == expected
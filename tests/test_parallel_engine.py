@@ -0,0 +1,141 @@
+# tests/test_parallel_engine.py
+"""测试 src/core/parallel_engine.py 多进程候选生成"""
+
+from src.core.parallel_engine import (
+    ProcessCandidateEngine, generate_candidate_batch, unpack_candidate_batch,
+    pack_aggregates, plan_tiles, pack_tile
+)
+
+
+def _task(shapes, itz_thickness=0.5, batch_size=16, boundary_adjust=True):
+    return {
+        "seed": 42,
+        "group_id": 3,
+        "shapes": shapes,
+        "itz_thickness": itz_thickness,
+        "region": (0, 0, 100, 100),
+        "max_possible_radius": 6.0,
+        "min_distance": 0.0,
+        "boundary_adjust": boundary_adjust,
+        "batch_size": batch_size,
+    }
+
+
+class TestCandidateBatch:
+    def test_batch_is_compact_arrays(self):
+        batch = generate_candidate_batch(_task([{'type': 'polygon', 'weight': 1.0}]))
+        n = len(batch["radii"])
+        assert 0 < n <= 16
+        assert batch["centers"].shape == (n, 2)
+        assert batch["offsets"].shape == (n + 1,)
+        assert batch["coords"].shape == (batch["offsets"][-1], 2)
+        assert batch["itz_offsets"][-1] == len(batch["itz_coords"])
+
+    def test_same_seed_is_reproducible(self):
+        task = _task([{'type': 'polygon', 'weight': 1.0}])
+        first = generate_candidate_batch(task)
+        second = generate_candidate_batch(task)
+        assert (first["coords"] == second["coords"]).all()
+
+    def test_unpack_round_trip(self):
+        batch = generate_candidate_batch(_task([{'type': 'polygon', 'weight': 1.0}]))
+        aggregates = unpack_candidate_batch(batch)
+        assert len(aggregates) == len(batch["radii"])
+        for agg in aggregates:
+            assert agg["group_id"] == 3
+            assert agg["shapely_obj"].is_valid
+            assert agg["shapely_itz"].contains(agg["shapely_obj"])
+            assert agg["points"][0] == agg["points"][-1]
+            assert agg["primitive"] is None
+
+    def test_circles_keep_primitive(self):
+        shapes = [{'type': 'circle', 'weight': 1.0, 'min_radius': 1.0, 'max_radius': 2.0}]
+        batch = generate_candidate_batch(_task(shapes, itz_thickness=0.0, boundary_adjust=False))
+        aggregates = unpack_candidate_batch(batch)
+        assert aggregates
+        assert all(agg["primitive"][0] == 'circle' for agg in aggregates)
+        assert all(agg["shapely_itz"] is None for agg in aggregates)
+
+    def test_empty_batch(self):
+        batch = generate_candidate_batch(_task([{'type': 'polygon', 'weight': 1.0}], batch_size=0))
+        assert unpack_candidate_batch(batch) == []
+
+
+def _tile_task(existing=None, max_count=200):
+    return {
+        "seed": 7,
+        "tile": (0, 0, 50, 50),
+        "region": (0, 0, 100, 100),
+        "existing": existing or [],
+        "groups": [{'id': 1, 'shapes': [{'type': 'circle', 'weight': 1.0, 'min_radius': 1.0, 'max_radius': 2.0}],
+                    'itz_thickness': 0.2, 'max_count': max_count, 'target_area': 1000.0}],
+        "target_area": 0.0,
+        "max_possible_radius": 3.0,
+        "min_distance": 0.5,
+        "allow_touching": True,
+        "boundary_adjust": False,
+        "cell_size": 7.0,
+        "max_failures": 100,
+    }
+
+
+class TestTiledPacking:
+    def test_plan_tiles_phases(self):
+        tiles = plan_tiles((0, 0, 100, 100), 5.0, 16)
+        assert len(tiles) == 16
+        phases = [phase for _, phase in tiles]
+        assert phases == sorted(phases)
+        for bounds, phase in tiles:
+            for other, other_phase in tiles:
+                if other is bounds or other_phase != phase:
+                    continue
+                # 同相位分块互不相邻
+                gap_x = max(other[0] - bounds[2], bounds[0] - other[2])
+                gap_y = max(other[1] - bounds[3], bounds[1] - other[3])
+                assert max(gap_x, gap_y) > 0
+
+    def test_plan_tiles_respects_halo(self):
+        tiles = plan_tiles((0, 0, 100, 100), 20.0, 64)
+        for (min_x, min_y, max_x, max_y), _ in tiles:
+            assert max_x - min_x >= 40.0
+            assert max_y - min_y >= 40.0
+
+    def test_pack_tile_respects_clearance(self):
+        aggregates = [agg for batch in pack_tile(_tile_task()) for agg in unpack_candidate_batch(batch)]
+        assert aggregates
+        for agg in aggregates:
+            assert 0 <= agg["center"][0] <= 50 and 0 <= agg["center"][1] <= 50
+        for i, a in enumerate(aggregates):
+            for b in aggregates[i + 1:]:
+                assert a["shapely_itz"].distance(b["shapely_itz"]) >= 0.5 - 1e-9
+
+    def test_pack_tile_avoids_existing_halo(self):
+        first = [agg for batch in pack_tile(_tile_task()) for agg in unpack_candidate_batch(batch)]
+        task = _tile_task(existing=pack_aggregates(first))
+        task["seed"] = 8
+        second = [agg for batch in pack_tile(task) for agg in unpack_candidate_batch(batch)]
+        for a in second:
+            for b in first:
+                assert a["shapely_itz"].distance(b["shapely_itz"]) >= 0.5 - 1e-9
+
+    def test_pack_tile_quota(self):
+        aggregates = [agg for batch in pack_tile(_tile_task(max_count=5)) for agg in unpack_candidate_batch(batch)]
+        assert len(aggregates) == 5
+
+    def test_pack_aggregates_round_trip(self):
+        aggregates = [agg for batch in pack_tile(_tile_task(max_count=5)) for agg in unpack_candidate_batch(batch)]
+        restored = [agg for batch in pack_aggregates(aggregates) for agg in unpack_candidate_batch(batch)]
+        assert len(restored) == 5
+        for a, b in zip(aggregates, restored):
+            assert a["center"] == b["center"]
+            assert a["primitive"] == b["primitive"]
+            assert a["shapely_itz"].equals(b["shapely_itz"])
+
+
+class TestProcessCandidateEngine:
+    def test_submit_and_shutdown(self):
+        group = {'id': 1, 'shapes': [{'type': 'polygon', 'weight': 1.0}], 'itz_thickness': 0.0}
+        with ProcessCandidateEngine(max_workers=1, batch_size=4) as engine:
+            batch = engine.submit(group, (0, 0, 100, 100), 6.0, 0.0, False).result(timeout=60)
+        assert batch["group_id"] == 1
+        assert engine.executor is None
@@ -1,6 +1,7 @@
 # tests/test_quadtree.py
 """测试 src/core/quadtree.py 四叉树空间索引"""
 
+import random
 import pytest
 from src.core.quadtree import Quadtree, QuadtreeNode
 
@@ -72,3 +73,121 @@ class TestQuadtree:
         stats = qt.get_stats()
         assert 'total_objects' in stats
         assert stats['total_objects'] == 0
+
+    def test_bounds_read_once(self):
+        """对象边界只在插入时读取一次，查询不再访问几何体"""
+        calls = []
+
+        class Geometry:
+            @property
+            def bounds(self):
+                calls.append(1)
+                return (10, 10, 20, 20)
+
+        qt = Quadtree((0, 0, 100, 100), max_objects=1)
+        qt.insert({'shapely_obj': Geometry()})
+        qt.insert({'shapely_obj': Geometry()})
+        for _ in range(5):
+            qt.query_range((0, 0, 50, 50))
+        assert len(calls) == 2
+
+    def test_query_ids_single_and_bulk(self):
+        random.seed(5)
+        qt = Quadtree((0, 0, 200, 200), max_objects=4)
+        boxes = []
+        for i in range(300):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(0.5, 8)
+            boxes.append((x - r, y - r, x + r, y + r))
+            qt.insert({'id': 1000 + i, 'bounds': boxes[-1]})
+        queries = []
+        for _ in range(50):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(1, 30)
+            queries.append((x - r, y - r, x + r, y + r))
+        results = qt.query_ids(queries)
+        assert len(results) == 50
+        for query, ids in zip(queries, results):
+            expected = [1000 + i for i, b in enumerate(boxes)
+                        if not (b[2] < query[0] or b[0] > query[2] or b[3] < query[1] or b[1] > query[3])]
+            assert ids.tolist() == expected
+            assert qt.query_ids(query).tolist() == expected
+
+    def test_query_ids_empty(self):
+        qt = Quadtree((0, 0, 100, 100))
+        assert qt.query_ids((0, 0, 10, 10)).size == 0
+        assert [r.size for r in qt.query_ids([(0, 0, 1, 1), (2, 2, 3, 3)])] == [0, 0]
+
+    def test_query_range_no_duplicates(self):
+        qt = Quadtree((0, 0, 100, 100), max_objects=1)
+        for i in range(5):
+            qt.insert({'id': i, 'bounds': (40 + i, 40 + i, 60 + i, 60 + i)})
+        results = qt.query_range((0, 0, 100, 100))
+        assert sorted(obj['id'] for obj in results) == list(range(5))
+
+    @pytest.mark.parametrize("loose", [False, True])
+    def test_bulk_load_matches_brute_force(self, loose):
+        """批量装载（含与已有对象合并重建）后可继续逐个插入，查询结果与暴力筛选一致"""
+        random.seed(13)
+        qt = Quadtree((0, 0, 200, 200), max_depth=6, max_objects=4, loose=loose)
+        boxes = []
+        for i in range(900):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(0.5, 8)
+            boxes.append((x - r, y - r, x + r, y + r))
+        objects = [{'id': 1000 + i, 'bounds': b} for i, b in enumerate(boxes)]
+        assert qt.insert_batch(objects[:300]) == 300
+        assert qt.insert_batch(objects[300:800] + [{'bounds': (300, 300, 310, 310)}]) == 500
+        for obj in objects[800:]:
+            assert qt.insert(obj)
+        assert qt.root.is_divided
+        for _ in range(60):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(1, 30)
+            query = (x - r, y - r, x + r, y + r)
+            expected = [1000 + i for i, b in enumerate(boxes)
+                        if not (b[2] < query[0] or b[0] > query[2] or b[3] < query[1] or b[1] > query[3])]
+            assert sorted(obj['id'] for obj in qt.query_range(query)) == expected
+            assert qt.query_ids(query).tolist() == expected
+            assert qt.query_ids([query])[0].tolist() == expected
+
+    @pytest.mark.parametrize("loose", [False, True])
+    def test_query_ids_after_remove_and_update(self, loose):
+        """删除和移动后 query_ids 不使用过期的扁平缓存"""
+        qt = Quadtree((0, 0, 100, 100), max_depth=4, max_objects=2, loose=loose)
+        qt.insert_batch([{'id': i, 'bounds': (i * 10, 0, i * 10 + 5, 5)} for i in range(6)])
+        assert qt.query_ids((0, 0, 100, 10)).tolist() == list(range(6))
+        assert qt.remove(2)
+        assert qt.update(4, (50, 50, 55, 55))
+        assert qt.query_ids((0, 0, 100, 10)).tolist() == [0, 1, 3, 5]
+        assert qt.query_ids([(45, 45, 60, 60)])[0].tolist() == [4]
+
+
+class TestLooseQuadtree:
+    def test_each_object_stored_once(self):
+        random.seed(11)
+        qt = Quadtree((0, 0, 200, 200), max_depth=6, max_objects=4, loose=True)
+        boxes = []
+        for i in range(400):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(0.5, 8)
+            boxes.append((x - r, y - r, x + r, y + r))
+            assert qt.insert({'id': i, 'bounds': boxes[-1]})
+        stats = qt.get_stats()
+        assert stats['total_objects'] == 400
+        assert stats['root_objects'] < 20
+        for _ in range(50):
+            x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(1, 30)
+            query = (x - r, y - r, x + r, y + r)
+            expected = [i for i, b in enumerate(boxes)
+                        if not (b[2] < query[0] or b[0] > query[2] or b[3] < query[1] or b[1] > query[3])]
+            assert sorted(obj['id'] for obj in qt.query_range(query)) == expected
+            assert qt.query_ids(query).tolist() == expected
+            assert qt.query_ids([query])[0].tolist() == expected
+    
+    def test_straddling_object_moves_down(self):
+        qt = Quadtree((0, 0, 100, 100), max_objects=1, loose=True)
+        # 跨越根节点中线的小对象按中心放入子节点的松散边界内
+        qt.insert({'id': 0, 'bounds': (48, 48, 53, 53)})
+        qt.insert({'id': 1, 'bounds': (10, 10, 12, 12)})
+        assert qt.root.is_divided
+        assert qt.get_stats()['root_objects'] == 0
+    
+    def test_invalid_looseness(self):
+        with pytest.raises(ValueError):
+            Quadtree((0, 0, 100, 100), loose=True, looseness=1.0)
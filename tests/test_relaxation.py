@@ -0,0 +1,67 @@
+# tests/test_relaxation.py
+"""测试 src/core/relaxation.py 蒙特卡洛松弛"""
+
+import random
+import numpy as np
+import shapely
+from src.core.aggregate_store import AggregateStore
+from src.core.relaxation import MonteCarloRelaxer
+from src.core.grid_index import GridIndex
+from tests.conftest import make_aggregate, pack_aggregates
+from src.core.shapes import generate_ellipse
+
+REGION = (0.0, 0.0, 40.0, 40.0)
+CONFIGS = [
+    {"type": "polygon", "min_size": 1.5, "max_size": 2.5, "min_sides": 5, "max_sides": 8},
+    {"type": "ellipse", "min_major": 2, "max_major": 3, "min_minor": 1, "max_minor": 1.5, "segments": 24},
+]
+
+
+def _pack(count, seed, min_distance=0.2):
+    random.seed(seed)
+
+    def candidate(placed):
+        center = (random.uniform(3, 37), random.uniform(3, 37))
+        return make_aggregate(CONFIGS[placed % 2], center, itz_thickness=0.3)
+
+    return pack_aggregates(AggregateStore(initial_capacity=8), GridIndex(REGION, cell_size=7.0),
+                           candidate, count, min_distance)
+
+
+class TestMonteCarloRelaxer:
+    def test_relax_keeps_gaps_and_updates_index(self):
+        store, index = _pack(50, seed=3)
+        fixed = store.coords[:store.offsets[5]].copy()
+        rotations = [store.shape_info(i).get('rotation') for i in range(len(store))]
+        stats = MonteCarloRelaxer(store, index, REGION, min_distance=0.2, first_index=5).relax(500)
+        assert 0 < stats['accepted'] <= stats['attempts'] == 500
+        assert np.array_equal(store.coords[:store.offsets[5]], fixed)
+
+        polygons = store.polygons()
+        itz_polygons = store.itz_polygons(polygons=polygons)
+        for i in range(len(store)):
+            others = [itz_polygons[j] for j in range(len(store)) if j != i]
+            assert min(shapely.distance(itz_polygons[i], others)) >= 0.2 - 1e-9
+            assert polygons[i].within(shapely.box(*REGION))
+            assert store.geometry(i)[0].equals(polygons[i])
+            records = [r for r in index.query_range(tuple(store.bounds[i])) if r['id'] == i]
+            assert len(records) == 1
+            assert records[0]['primitive'] == store.primitive(i)
+            assert np.allclose(store.bounds[i], itz_polygons[i].bounds, atol=1e-6)
+        # 椭圆的旋转参数随几何同步更新
+        moved = [i for i in range(5, len(store)) if rotations[i] is not None
+                 and store.shape_info(i)['rotation'] != rotations[i]]
+        assert moved
+        for i in moved:
+            info = store.shape_info(i)
+            assert store.primitive(i)[1:3] == tuple(store.centers[i])
+            assert store.primitive(i)[5] == info['rotation']
+            expected = np.asarray(generate_ellipse(tuple(store.centers[i]), info['major_axis'], info['minor_axis'],
+                                                   info['rotation'], info['segments']))
+            count = min(len(expected), len(store.points(i)))
+            assert np.allclose(store.points(i)[:count], expected[:count], atol=1e-6)
+
+    def test_nothing_to_move(self):
+        store, index = _pack(3, seed=1)
+        stats = MonteCarloRelaxer(store, index, REGION, first_index=3).relax(50)
+        assert stats['attempts'] == 0
@@ -2,6 +2,7 @@
 形状生成测试
 
 测试形状生成的纯函数：generate_random_polygon, generate_circle, generate_ellipse
+及其批量版本
 """
 
 import sys
@@ -11,7 +12,13 @@ sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')
 
 import unittest
 import math
-from src.core.shapes import generate_random_polygon, generate_circle, generate_ellipse
+import numpy as np
+from src.core.shapes import (
+    generate_random_polygon, generate_circle, generate_ellipse, optimize_polygon_sides,
+    optimize_polygon_sides_batch, generate_random_polygons_batch, generate_circles_batch,
+    generate_ellipses_batch, generate_shape_batch_from_config
+)
+from src.utils import calculate_polygon_area
 
 
 class TestRandomPolygon(unittest.TestCase):
@@ -127,5 +134,66 @@ class TestEllipse(unittest.TestCase):
         self.assertNotEqual(points_no_rot, points_rot)
 
 
+
+class TestBatchShapes(unittest.TestCase):
+    """测试批量形状生成"""
+
+    def test_optimize_batch_matches_single(self):
+        """测试批量优化与逐个优化结果一致"""
+        rng = np.random.default_rng(0)
+        sides = np.array([3, 5, 8, 12])
+        points = np.zeros((4, 13, 2))
+        for i, k in enumerate(sides):
+            ring = rng.normal(size=(k, 2)) * 3
+            points[i, :k] = ring
+            points[i, k:] = ring[0]
+        min_edge = np.array([1.0, 1.5, 2.0, 2.5])
+        optimized = optimize_polygon_sides_batch(points, sides, min_edge)
+        for i, k in enumerate(sides):
+            expected = optimize_polygon_sides([tuple(p) for p in points[i, :k + 1]], min_edge[i])
+            np.testing.assert_allclose(optimized[i, :k + 1], np.array(expected), atol=1e-12)
+
+    def test_polygon_batch_padding(self):
+        """测试不同边数的多边形填充到同一数组"""
+        sides = np.array([3, 6, 9])
+        points = generate_random_polygons_batch(np.zeros((3, 2)), 5.0, sides,
+                                                rng=np.random.default_rng(1))
+        self.assertEqual(points.shape, (3, 10, 2))
+        for i, k in enumerate(sides):
+            np.testing.assert_array_equal(points[i, k:], np.repeat(points[i, k:k + 1], 10 - k, axis=0))
+
+    def test_polygon_batch_minimum_sides(self):
+        """测试边数<3时抛出异常"""
+        with self.assertRaises(ValueError):
+            generate_random_polygons_batch(np.zeros((2, 2)), 5.0, np.array([3, 2]))
+
+    def test_circle_batch_matches_single(self):
+        """测试批量圆形与逐个生成一致"""
+        centers = np.array([[0.0, 0.0], [3.0, 4.0]])
+        points = generate_circles_batch(centers, np.array([5.0, 7.0]), segments=20)
+        self.assertEqual(points.shape, (2, 21, 2))
+        np.testing.assert_allclose(points[1], np.array(generate_circle((3, 4), 7.0, segments=20)))
+
+    def test_ellipse_batch_matches_single(self):
+        """测试批量椭圆形与逐个生成一致"""
+        points = generate_ellipses_batch(np.array([[1.0, 2.0]]), 8.0, 4.0, 0.5)
+        np.testing.assert_allclose(points[0], np.array(generate_ellipse((1, 2), 8.0, 4.0, rotation=0.5)))
+
+    def test_shape_batch_from_config(self):
+        """测试按配置批量生成的形状数据"""
+        rng = np.random.default_rng(2)
+        shapes = generate_shape_batch_from_config({'type': 'polygon', 'min_sides': 4, 'max_sides': 6}, 20, rng)
+        self.assertEqual(len(shapes), 20)
+        for points, radius, area, info, clearance in shapes:
+            self.assertEqual(len(points), info['sides'] + 1)
+            self.assertAlmostEqual(area, calculate_polygon_area([tuple(p) for p in points]))
+            self.assertGreater(radius, 0)
+            self.assertLessEqual(clearance, radius * 2)
+
+    def test_shape_batch_unknown_type(self):
+        """测试未知形状类型返回空列表"""
+        self.assertEqual(generate_shape_batch_from_config({'type': 'star'}, 5), [])
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,111 @@
+# tests/test_spatial_index.py
+"""测试 src/core/spatial_index.py 协议：各空间索引后端的查询、删除和移动行为一致"""
+
+import math
+import random
+import pytest
+from src.core.quadtree import Quadtree
+from src.core.array_quadtree import ArrayQuadtree
+from src.core.kd_tree import KDTree
+from src.core.strtree_index import STRtreeIndex
+from src.core.grid_index import GridIndex
+
+
+BACKENDS = {
+    'quadtree': lambda: Quadtree((0, 0, 200, 200), max_depth=6, max_objects=4),
+    'loose_quadtree': lambda: Quadtree((0, 0, 200, 200), max_depth=6, max_objects=4, loose=True),
+    'array_quadtree': lambda: ArrayQuadtree((0, 0, 200, 200), max_depth=6, max_objects=4),
+    'kd_tree': lambda: KDTree((0, 0, 200, 200), max_objects=3),
+    'strtree': lambda: STRtreeIndex((0, 0, 200, 200), min_rebuild_size=16),
+    'grid': lambda: GridIndex((0, 0, 200, 200), cell_size=12),
+}
+
+
+@pytest.fixture(params=list(BACKENDS))
+def index(request):
+    return BACKENDS[request.param]()
+
+
+def _check_knn_and_radius(index, centers, queries=40):
+    """k 近邻和半径查询按中心距离升序返回，与暴力计算一致"""
+    for _ in range(queries):
+        point = (random.uniform(-20, 220), random.uniform(-20, 220))
+        expected = sorted((math.hypot(c[0] - point[0], c[1] - point[1]), i) for i, c in centers.items())
+        knn = index.query_knn(point, 5)
+        assert [o['id'] for o, _ in knn] == [i for _, i in expected[:5]]
+        assert [d for _, d in knn] == pytest.approx([d for d, _ in expected[:5]])
+        within = index.query_radius(point, 15.0)
+        assert [o['id'] for o, _ in within] == [i for d, i in expected if d <= 15.0]
+
+
+def test_knn_and_radius_match_brute_force(index):
+    """批量装载与逐个插入混合后，k 近邻和半径查询与暴力计算一致"""
+    random.seed(29)
+    objects = []
+    for i in range(400):
+        x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(0.5, 6)
+        objects.append({'id': i, 'center': (x + 0.2 * r, y), 'bounds': (x - r, y - r, x + r, y + r)})
+    index.insert_batch(objects[:250])
+    for obj in objects[250:]:
+        index.insert(obj)
+    _check_knn_and_radius(index, {o['id']: o['center'] for o in objects})
+    assert index.query_knn((0, 0), 0) == []
+
+
+def test_update_without_obj_moves_center(index):
+    """update 省略替换对象时，中心查询也读到移动后的位置"""
+    index.insert({'id': 1, 'center': (10, 10), 'bounds': (9, 9, 11, 11)})
+    index.insert({'id': 2, 'center': (50, 50), 'bounds': (49, 49, 51, 51)})
+    assert index.update(1, (89, 89, 91, 91))
+    assert [o['id'] for o in index.query_range((85, 85, 95, 95))] == [1]
+    knn = index.query_knn((90, 90), 1)
+    assert [o['id'] for o, _ in knn] == [1]
+    assert knn[0][1] == pytest.approx(0.0)
+    assert [o['id'] for o, _ in index.query_radius((90, 90), 5)] == [1]
+
+
+def test_remove_and_update_match_brute_force(index):
+    """删除、移动（含替换对象）、压缩后再批量插入，范围、k 近邻和半径查询与暴力计算一致"""
+    random.seed(41)
+    boxes = {}
+    centers = {}
+
+    def make(i):
+        x, y, r = random.uniform(10, 190), random.uniform(10, 190), random.uniform(0.5, 8)
+        boxes[i] = (x - r, y - r, x + r, y + r)
+        centers[i] = (x + 0.2 * r, y)
+        return {'id': i, 'center': centers[i], 'bounds': boxes[i]}
+
+    objects = [make(i) for i in range(600)]
+    index.insert_batch(objects[:400])
+    for obj in objects[400:]:
+        index.insert(obj)
+    for step in range(700):
+        i = random.choice(list(boxes))
+        if step % 3 == 0:
+            assert index.remove(i)
+            del boxes[i], centers[i]
+        elif step % 3 == 1:
+            obj = make(i)
+            assert index.update(i, obj['bounds'], obj)
+        else:
+            dx, dy = random.uniform(-3, 3), random.uniform(-3, 3)
+            b, c = boxes[i], centers[i]
+            boxes[i] = (b[0] + dx, b[1] + dy, b[2] + dx, b[3] + dy)
+            centers[i] = (c[0] + dx, c[1] + dy)
+            assert index.update(i, boxes[i])
+    _check_knn_and_radius(index, centers, queries=20)
+    for i in list(boxes)[:300]:
+        assert index.remove(i)
+        del boxes[i], centers[i]
+    assert not index.remove(-1)
+    assert not index.update(-1, (0, 0, 1, 1))
+    assert index.insert_batch([make(i) for i in range(600, 620)]) == 20
+    assert len(index.query_range((-10, -10, 210, 210))) == len(boxes)
+    for _ in range(60):
+        x, y, r = random.uniform(0, 200), random.uniform(0, 200), random.uniform(1, 30)
+        query = (x - r, y - r, x + r, y + r)
+        expected = sorted(i for i, b in boxes.items()
+                          if not (b[2] < query[0] or b[0] > query[2] or b[3] < query[1] or b[1] > query[3]))
+        assert sorted(obj['id'] for obj in index.query_range(query)) == expected
+    _check_knn_and_radius(index, centers, queries=20)
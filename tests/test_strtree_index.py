@@ -0,0 +1,61 @@
+# tests/test_strtree_index.py
+"""测试 src/core/strtree_index.py STR树空间索引"""
+
+from src.core.strtree_index import STRtreeIndex
+
+
+def _mock(bounds):
+    return {'shapely_obj': type('Mock', (), {'bounds': bounds})()}
+
+
+class TestSTRtreeIndex:
+    def test_init(self):
+        index = STRtreeIndex((0, 0, 100, 100))
+        assert index.bounds == (0, 0, 100, 100)
+
+    def test_insert_and_query(self):
+        index = STRtreeIndex((0, 0, 100, 100))
+        index.insert(_mock((10, 10, 20, 20)))
+        assert len(index.query_range((0, 0, 50, 50))) == 1
+        assert len(index.query_range((60, 60, 80, 80))) == 0
+
+    def test_query_spans_tree_and_pending(self):
+        index = STRtreeIndex((0, 0, 100, 100), min_rebuild_size=4)
+        objects = [_mock((i * 5, i * 5, i * 5 + 3, i * 5 + 3)) for i in range(10)]
+        for obj in objects:
+            index.insert(obj)
+        stats = index.get_stats()
+        assert stats['rebuild_count'] >= 1
+        assert stats['pending_objects'] > 0
+        results = index.query_range((0, 0, 100, 100))
+        assert len(results) == 10
+        assert all(any(r is o for o in objects) for r in results)
+
+    def test_itz_bounds_used(self):
+        index = STRtreeIndex((0, 0, 100, 100))
+        obj = {
+            'shapely_obj': type('Mock', (), {'bounds': (10, 10, 20, 20)})(),
+            'shapely_itz': type('Mock', (), {'bounds': (8, 8, 22, 22)})(),
+        }
+        index.insert(obj)
+        assert len(index.query_range((21, 21, 30, 30))) == 1
+
+    def test_insert_batch(self):
+        index = STRtreeIndex((0, 0, 100, 100))
+        objects = [_mock((i * 5, i * 5, i * 5 + 3, i * 5 + 3)) for i in range(10)]
+        assert index.insert_batch(objects) == 10
+        assert index.get_stats()['pending_objects'] == 0
+        assert len(index.query_range((0, 0, 12, 12))) == 3
+
+    def test_clear(self):
+        index = STRtreeIndex((0, 0, 100, 100))
+        index.insert_batch([_mock((10, 10, 20, 20))])
+        index.insert(_mock((30, 30, 40, 40)))
+        index.clear()
+        assert len(index.query_range((0, 0, 100, 100))) == 0
+        assert index.get_stats()['total_objects'] == 0
+
+    def test_spatial_index_protocol(self):
+        """验证 STRtreeIndex 符合 SpatialIndex 协议"""
+        from src.core.spatial_index import SpatialIndex
+        assert isinstance(STRtreeIndex((0, 0, 100, 100)), SpatialIndex)